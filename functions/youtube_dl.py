@@ -10,18 +10,32 @@ from kivy.clock import Clock
 from kivy.properties import StringProperty, ObjectProperty, NumericProperty, BooleanProperty
 from kivy.app import App
 from kivy.utils import platform
+import logging
 import os
 import re
 from threading import Thread
 
 # Try to import pytubefix
 try:
-    from pytubefix import YouTube
+    from pytubefix import YouTube, DownloadManager
     from pytubefix.cli import on_progress
     PYTUBE_AVAILABLE = True
 except ImportError:
     PYTUBE_AVAILABLE = False
 
+logger = logging.getLogger(__name__)
+
+_download_manager = None
+
+
+def get_download_manager():
+    """Shared download scheduler, so downloads started from any screen share one budget"""
+    global _download_manager
+    if _download_manager is None:
+        _download_manager = DownloadManager(max_workers=2, max_connections=4)
+    return _download_manager
+
+
 Builder.load_string('''
 <YouTubeDownloaderScreen>:
     canvas:
@@ -335,6 +349,7 @@ class YouTubeDownloaderScreen(Screen):
         super().__init__(**kwargs)
         self.yt = None
         self.selected_stream = None
+        self.download_job = None
         self.app = None
         self.video_streams = []
         self.audio_streams = []
@@ -417,10 +432,13 @@ class YouTubeDownloaderScreen(Screen):
     def _fetch_info_thread(self, url):
         """Background thread for fetching video info"""
         try:
-            self.yt = YouTube(url, on_progress_callback=self.on_download_progress)
+            # The info is shown from a single player request, the streams
+            # below resolve the rest
+            self.yt = YouTube(url, on_progress_callback=self.on_download_progress, metadata_only=True)
+            info = (self.yt.title, self.yt.author, self.yt.length, self.yt.views)
             
             # Update UI with video info
-            Clock.schedule_once(lambda dt: self._update_video_info(), 0)
+            Clock.schedule_once(lambda dt: self._update_video_info(*info), 0)
             
             # Get available video streams (progressive)
             self.video_streams = []
@@ -447,14 +465,14 @@ class YouTubeDownloaderScreen(Screen):
         except Exception as e:
             Clock.schedule_once(lambda dt: self._fetch_error(str(e)), 0)
     
-    def _update_video_info(self):
+    def _update_video_info(self, title, author, length, views):
         """Update video info display"""
-        self.video_title = self.yt.title
-        self.video_author = self.yt.author
-        minutes = self.yt.length // 60
-        seconds = self.yt.length % 60
+        self.video_title = title
+        self.video_author = author
+        minutes = length // 60
+        seconds = length % 60
         self.video_duration = f"{minutes}:{seconds:02d}"
-        self.video_views = f"{self.yt.views:,}"
+        self.video_views = f"{views:,}"
         
         # Update labels with language prefixes
         self.ids.video_title.text = f"{self.get_string('title')} {self.video_title}"
@@ -481,7 +499,7 @@ class YouTubeDownloaderScreen(Screen):
     
     def _fetch_error(self, error):
         """Handle fetch error"""
-        print(f"Fetch error: {error}")  # For debugging
+        logger.error(f"Fetch error: {error}")
         self.status_text = self.get_string('fetch_error')
         self.is_processing = False
         self.ids.fetch_btn.disabled = False
@@ -525,34 +543,45 @@ class YouTubeDownloaderScreen(Screen):
         self.progress_text = self.get_string('downloading')
         self.status_text = self.get_string('downloading')
         
-        # Start download in thread
-        Thread(target=self._download_thread).start()
-    
-    def _download_thread(self):
-        """Background download thread"""
+        # Queue the download on the shared scheduler
         try:
-            # Sanitize filename
-            safe_title = re.sub(r'[^\w\s-]', '', self.yt.title)
-            safe_title = re.sub(r'[-\s]+', '_', safe_title)
-            
-            # Set file extension based on download type
-            if self.download_type == 'video':
-                filename = f"{safe_title}.mp4"
-            else:
-                filename = f"{safe_title}.mp3"
-            
-            # Get download path
-            download_path = self.app.get_storage_path('downloads')
-            full_path = os.path.join(download_path, filename)
-            
-            # Download file
-            self.selected_stream.download(output_path=download_path, filename=filename)
-            
-            Clock.schedule_once(lambda dt: self._download_complete(filename), 0)
-            
+            self._submit_download()
         except Exception as e:
-            print(f"Download error: {e}")  # For debugging
-            Clock.schedule_once(lambda dt: self._download_error(str(e)), 0)
+            logger.exception(f"Download error: {e}")
+            self._download_error(str(e))
+    
+    def _submit_download(self):
+        """Queue the selected stream on the download manager"""
+        # Sanitize filename
+        safe_title = re.sub(r'[^\w\s-]', '', self.yt.title)
+        safe_title = re.sub(r'[-\s]+', '_', safe_title)
+        
+        # Set file extension based on download type
+        if self.download_type == 'video':
+            filename = f"{safe_title}.mp4"
+        else:
+            filename = f"{safe_title}.mp3"
+        
+        # Get download path
+        download_path = self.app.get_storage_path('downloads')
+        
+        self.download_job = get_download_manager().submit(
+            self.selected_stream,
+            output_path=download_path,
+            filename=filename,
+            callback=lambda job: self._on_download_done(job, filename)
+        )
+    
+    def _on_download_done(self, job, filename):
+        """Called from the download worker once the job is finished"""
+        if job.cancelled() or job.cancel_requested:
+            return
+        error = job.exception()
+        if error is None:
+            Clock.schedule_once(lambda dt: self._download_complete(filename), 0)
+        else:
+            logger.error(f"Download error: {error}", exc_info=error)
+            Clock.schedule_once(lambda dt: self._download_error(str(error)), 0)
     
     def _download_complete(self, filename):
         """Handle download completion with user-friendly message"""
@@ -576,6 +605,9 @@ class YouTubeDownloaderScreen(Screen):
     
     def clear_all(self):
         """Clear all fields"""
+        if self.download_job is not None:
+            self.download_job.cancel()
+            self.download_job = None
         self.ids.url_input.text = ''
         self.video_title = ''
         self.video_author = ''
@@ -22,3 +22,6 @@ from pytubefix.contrib.channel import Channel
 from pytubefix.contrib.search import Search
 from pytubefix.info import info
 from pytubefix.buffer import Buffer
+from pytubefix.file_sink import FileSink
+from pytubefix.bandwidth import TokenBucket
+from pytubefix.download_manager import DownloadJob, DownloadManager
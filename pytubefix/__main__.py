@@ -31,21 +31,51 @@ smaller peripheral modules and functions.
 """
 
 import logging
+import threading
+from concurrent.futures import FIRST_COMPLETED, CancelledError, Future, ThreadPoolExecutor, wait
 from subprocess import CalledProcessError
-from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.error import HTTPError
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
 import pytubefix
 import pytubefix.exceptions as exceptions
-from pytubefix import extract, request
+from pytubefix import client_stats, extract, player_store, request
 from pytubefix import Stream, StreamQuery
+from pytubefix.cipher import cipher_registry
 from pytubefix.helpers import install_proxy
 from pytubefix.innertube import InnerTube
 from pytubefix.metadata import YouTubeMetadata
 from pytubefix.monostate import Monostate
 from pytubefix.botGuard import bot_guard
+from pytubefix.visitor_data import visitor_data_from_response, visitor_data_provider
 
 logger = logging.getLogger(__name__)
 
+# Video ids YouTube answers for videos it can't serve.
+_invalid_video_ids = ('aQvGIIdgFDM',)
+
+
+class _SharedPlayer:
+    """Player js resolved once for all the videos of :meth:`YouTube.resolve_many`.
+
+    YouTube serves the same base.js to every video at a given time, so only
+    the first video needs its watch page to find it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._js_url: Optional[str] = None
+        self._js: Optional[str] = None
+
+    def attach(self, youtube: 'YouTube'):
+        """Give ``youtube`` the shared player js, resolving it through ``youtube`` if needed."""
+        with self._lock:
+            if self._js is None:
+                self._js = youtube.js
+                self._js_url = youtube.js_url
+        youtube._js_url = self._js_url
+        youtube._js = self._js
+
 
 class YouTube:
     """Core developer interface for pytubefix."""
@@ -63,6 +93,8 @@ class YouTube:
             oauth_verifier: Optional[Callable[[str, str], None]] = None,
             use_po_token: Optional[bool] = False,
             po_token_verifier: Optional[Callable[[None], Tuple[str, str]]] = None,
+            prefetch: bool = False,
+            metadata_only: bool = False,
     ):
         """Construct a :class:`YouTube <YouTube>`.
 
@@ -106,7 +138,19 @@ class YouTube:
             (Optional) Verified used to obtain the visitorData and po_token.
             The verifier will return the visitorData and po_token respectively.
             (if passed, else default verifier will be used)
+        :param bool prefetch:
+            (Optional) Start downloading the watch page, the player js, the
+            player response and the video details in the background right
+            away instead of one after the other when they are first needed.
+        :param bool metadata_only:
+            (Optional) Answer the title, author, length, views and the other
+            fields of the player response from a single player request,
+            without the watch page, the player js or a poToken. The full
+            resolution runs once the streams are asked for.
         """
+        # Background downloads started by `prefetch`, by attribute name.
+        self._prefetch: Dict[str, Future] = {}
+
         # js fetched by js_url
         self._js: Optional[str] = None
 
@@ -136,6 +180,10 @@ class YouTube:
         self.watch_url = f"https://youtube.com/watch?v={self.video_id}"
         self.embed_url = f"https://www.youtube.com/embed/{self.video_id}"
 
+        # An explicitly chosen client is always asked first.
+        self._client_chosen = client != InnerTube().client_name
+        self._traits = client_stats.url_traits(url)
+
         self.client = 'WEB' if use_po_token else client
 
         # oauth can only be used by the TV and TV_EMBED client.
@@ -143,6 +191,16 @@ class YouTube:
 
         self.fallback_clients = ['TV', 'IOS']
 
+        # Seconds to wait for the client before also asking the next fallback
+        # client, the first response with streams wins. A failed client hands
+        # over at once. None (the default) asks the clients one after the
+        # other, without the extra requests of a race.
+        self.hedge_delay: Optional[float] = None
+        self._clients_raced = False
+        # The clients are ranked once, the order never changes while they
+        # are being tried.
+        self._clients_ordered = False
+
         self._signature_timestamp: dict = {}
         self._visitor_data = None
 
@@ -170,6 +228,71 @@ class YouTube:
         self.po_token = None
         self._pot = None
 
+        self.metadata_only = metadata_only
+
+        if prefetch:
+            self._start_prefetch()
+
+    def _start_prefetch(self):
+        # The tasks only download, they never write to this object: the
+        # caller's thread takes their results when it needs them.
+        tasks = {}
+        if not self.metadata_only:
+            tasks['watch_html'] = lambda: request.get(url=self.watch_url)
+            tasks['js'] = self._fetch_js
+        # The innertube requests may prompt the user, which only makes sense
+        # on the caller's thread.
+        if not self.use_oauth and not self.use_po_token:
+            self._order_clients()
+            self._prefetched_player = (self.client, not self.metadata_only)
+            player = self._prefetched_player
+            tasks['player'] = lambda: self._prefetch_player(*player)
+            tasks['vid_details'] = self._fetch_vid_details
+
+        if not tasks:
+            return
+        executor = ThreadPoolExecutor(max_workers=len(tasks), thread_name_prefix='pytubefix-prefetch')
+        for name, task in tasks.items():
+            self._prefetch[name] = executor.submit(task)
+        # The threads exit once their download is done.
+        executor.shutdown(wait=False)
+
+    def _prefetched(self, name: str) -> Any:
+        """Result of the background download ``name``, None if it wasn't started.
+
+        Waits for it if it's still running, and raises its exception if it failed.
+        """
+        future = self._prefetch.get(name)
+        if future is None:
+            return None
+        return future.result()
+
+    def _prefetch_player(self, client: str, for_streams: bool) -> Tuple[Dict, InnerTube]:
+        innertube = InnerTube(client)
+        resolved = {'signature_timestamp': None, 'visitor_data': self._shared_visitor_data()}
+        if for_streams and innertube.require_js_player:
+            _, js = self._prefetched('js')
+            resolved['signature_timestamp'] = self._signature_timestamp_context(js)
+        if for_streams and innertube.require_po_token:
+            resolved['visitor_data'] = visitor_data_provider.get()
+        return self._player_request(client, for_streams=for_streams, resolved=resolved)
+
+    def _take_prefetched_player(self, client: str, for_streams: bool) -> Optional[Tuple[Dict, InnerTube]]:
+        """The prefetched player response, if it was requested the way ``client`` needs it now.
+
+        It is only used once, and kept for a later request if it doesn't fit this one.
+        """
+        if 'player' not in self._prefetch:
+            return None
+        prefetched_client, prefetched_for_streams = self._prefetched_player
+        innertube = InnerTube(client)
+        # A response requested without signature timestamp and poToken is
+        # the same for clients needing neither.
+        plain = not (innertube.require_js_player or innertube.require_po_token)
+        if prefetched_client != client or (prefetched_for_streams != for_streams and not plain):
+            return None
+        return self._prefetch.pop('player').result()
+
     def __repr__(self):
         return f'<pytubefix.__main__.YouTube object: videoId={self.video_id}>'
 
@@ -177,11 +300,71 @@ class YouTube:
         # Compare types and urls, if they're same return true, else return false.
         return type(o) == type(self) and o.watch_url == self.watch_url
 
+    @classmethod
+    def resolve_many(
+            cls,
+            urls: Iterable[str],
+            workers: int = 4,
+            **kwargs
+    ) -> Iterator[Tuple[str, Union['YouTube', Exception]]]:
+        """Resolve the streams of many videos on a pool of threads.
+
+        The videos share the visitorData, the player js and its cipher, so
+        only the first one downloads them. Results are yielded as soon as
+        they are ready, which isn't the order of ``urls``. A video that
+        can't be resolved yields its exception instead of a
+        :class:`YouTube <YouTube>` and doesn't stop the others.
+
+        :param urls:
+            The urls of the videos.
+        :param int workers:
+            (Optional) Number of videos resolved at the same time.
+        :param kwargs:
+            (Optional) Arguments of every :class:`YouTube <YouTube>`.
+        :rtype: Iterator[Tuple[str, Union[YouTube, Exception]]]
+        :returns: Pairs of url and either the resolved :class:`YouTube <YouTube>` or the exception.
+        """
+        player = _SharedPlayer()
+
+        def resolve(url: str) -> 'YouTube':
+            youtube = cls(url, **kwargs)
+            clients = [youtube.client, *youtube.fallback_clients]
+            if any(InnerTube(client).require_js_player for client in clients):
+                player.attach(youtube)
+            youtube.fmt_streams
+            return youtube
+
+        urls = iter(urls)
+        pending = {}
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='pytubefix-resolve')
+        try:
+            while True:
+                # Only a few videos are queued ahead so urls can be a long generator.
+                for url in urls:
+                    pending[executor.submit(resolve, url)] = url
+                    if len(pending) >= 2 * workers:
+                        break
+                if not pending:
+                    return
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    url = pending.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        logger.debug(f'unable to resolve {url}: {e}')
+                        result = e
+                    yield url, result
+        finally:
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=False)
+
     @property
     def watch_html(self):
         if self._watch_html:
             return self._watch_html
-        self._watch_html = request.get(url=self.watch_url)
+        self._watch_html = self._prefetched('watch_html') or request.get(url=self.watch_url)
         return self._watch_html
 
     @property
@@ -203,22 +386,54 @@ class YouTube:
         if self._js_url:
             return self._js_url
 
-        if self.age_restricted:
-            self._js_url = extract.js_url(self.embed_html)
-        else:
-            self._js_url = extract.js_url(self.watch_html)
+        prefetched = self._prefetched('js')
+        if prefetched:
+            self._js_url, self._js = prefetched
+            return self._js_url
+
+        self._js_url = self._find_js_url()
 
         return self._js_url
 
+    def _find_js_url(self) -> str:
+        if self.age_restricted:
+            return extract.js_url(self.embed_html)
+        return extract.js_url(self.watch_html)
+
+    def _fetch_js(self) -> Tuple[str, str]:
+        """The url and the content of the player js named by the watch page, for `prefetch`.
+
+        The player already loaded by this process is reused if it's the one
+        named, otherwise the player is fetched.
+
+        :rtype: Tuple[str, str]
+        """
+        watch_html = self._prefetched('watch_html')
+        if extract.is_age_restricted(watch_html):
+            js_url = extract.js_url(request.get(url=self.embed_url))
+        else:
+            js_url = extract.js_url(watch_html)
+        loaded_url, js = pytubefix.__js_url__, pytubefix.__js__
+        if loaded_url != js_url or not js:
+            js = player_store.get_player_js(js_url)
+            pytubefix.__js__ = js
+            pytubefix.__js_url__ = js_url
+        return js_url, js
+
     @property
     def js(self):
         if self._js:
             return self._js
 
+        prefetched = self._prefetched('js')
+        if prefetched:
+            self._js_url, self._js = prefetched
+            return self._js
+
         # If the js_url doesn't match the cached url, fetch the new js and update
         #  the cache; otherwise, load the cache.
         if pytubefix.__js_url__ != self.js_url:
-            self._js = request.get(self.js_url)
+            self._js = player_store.get_player_js(self.js_url)
             pytubefix.__js__ = self._js
             pytubefix.__js_url__ = self.js_url
         else:
@@ -234,10 +449,17 @@ class YouTube:
         if self._visitor_data:
             return self._visitor_data
 
+        try:
+            self._visitor_data = visitor_data_provider.get()
+            return self._visitor_data
+        except Exception as e:
+            logger.debug(f"Unable to obtain a shared visitorData, reason: {e}")
+
         if InnerTube(self.client).require_po_token:
             try:
                 logger.debug("Looking for visitorData in initial_data")
                 self._visitor_data = extract.visitor_data(str(self.initial_data['responseContext']))
+                visitor_data_provider.offer(self._visitor_data)
                 logger.debug('VisitorData obtained successfully')
                 return self._visitor_data
             except (KeyError, pytubefix.exceptions.RegexMatchError):
@@ -245,15 +467,26 @@ class YouTube:
 
         logger.debug("Looking for visitorData in InnerTube API")
         innertube_response = InnerTube('WEB').player(self.video_id)
-        try:
-            self._visitor_data = innertube_response['responseContext']['visitorData']
-        except KeyError:
-            p_dicts = innertube_response['responseContext']['serviceTrackingParams'][0]['params']
-            self._visitor_data = next(p for p in p_dicts if p['key'] == 'visitor_data')['value']
+        self._visitor_data = visitor_data_from_response(innertube_response)
+        visitor_data_provider.offer(self._visitor_data)
         logger.debug('VisitorData obtained successfully')
 
         return self._visitor_data
 
+    def _shared_visitor_data(self) -> Optional[str]:
+        """The visitorData sent by clients without a poToken.
+
+        The one shared by the process is used, fetched once per TTL, without
+        the fallbacks of :attr:`visitor_data`. This never writes to the object.
+        """
+        if self._visitor_data:
+            return self._visitor_data
+        try:
+            return visitor_data_provider.get()
+        except Exception as e:
+            logger.debug(f"Unable to obtain a shared visitorData, reason: {e}")
+            return None
+
     @property
     def pot(self) -> str:
         """
@@ -263,13 +496,19 @@ class YouTube:
         """
         if self._pot:
             return self._pot
+        self._pot = self._mint_pot(self.visitor_data)
+        return self._pot
+
+    @staticmethod
+    def _mint_pot(visitor_data: str) -> Optional[str]:
         logger.debug('Invoking botGuard')
         try:
-            self._pot = bot_guard.generate_po_token(visitor_data=self.visitor_data)
+            po_token = bot_guard.generate_po_token(visitor_data=visitor_data)
             logger.debug('PoToken generated successfully')
+            return po_token
         except Exception as e:
             logger.warning('Unable to run botGuard. Skipping poToken generation, reason: ' + e.__str__())
-        return self._pot
+            return None
 
     @property
     def initial_data(self):
@@ -281,15 +520,19 @@ class YouTube:
     @property
     def streaming_data(self):
         """Return streamingData from video info."""
-
-        # List of YouTube error video IDs
-        invalid_id_list = ['aQvGIIdgFDM']
+        self._leave_metadata_only()
 
         # If my previously valid video_info doesn't have the streamingData,
         #   or it is an invalid video,
         #   try to get a new video_info with a different client.
-        if 'streamingData' not in self.vid_info or self.vid_info['videoDetails']['videoId'] in invalid_id_list:
+        if not self._has_streams(self.vid_info):
             original_client = self.client
+            if self._clients_raced:
+                # Every client was already asked while resolving vid_info.
+                raise exceptions.UnknownVideoError(video_id=self.video_id,
+                                                   developer_message=f'Streaming data is missing, '
+                                                                     f'clients: {original_client}, '
+                                                                     f'{self.fallback_clients}')
 
             # for each fallback client set, revert videodata, and run check_availability, which
             #   will try to get a new video_info with a different client.
@@ -319,6 +562,7 @@ class YouTube:
         If the streams have not been initialized, finds all relevant
         streams and initializes them.
         """
+        self._leave_metadata_only()
         self.check_availability()
         if self._fmt_streams:
             return self._fmt_streams
@@ -337,6 +581,9 @@ class YouTube:
                 extract.apply_signature(stream_manifest, self.vid_info, self.js, self.js_url)
             except exceptions.ExtractError:
                 # To force an update to the js file, we clear the cache and retry
+                player_store.default_store.invalidate(self.js_url)
+                cipher_registry.evict(self.js_url)
+                self._prefetch.pop('js', None)
                 self._js = None
                 self._js_url = None
                 pytubefix.__js__ = None
@@ -359,6 +606,19 @@ class YouTube:
 
         return self._fmt_streams
 
+    def _leave_metadata_only(self):
+        """Resolve the video fully from now on, the streams are needed."""
+        if not self.metadata_only:
+            return
+        self.metadata_only = False
+        if self._vid_info is None:
+            return
+        # The metadata response was requested without signature timestamp
+        # and poToken, its streams only work for clients needing neither.
+        innertube = InnerTube(self.client)
+        if innertube.require_js_player or innertube.require_po_token or not self._has_streams(self.vid_info):
+            self.vid_info = None
+
     def check_availability(self):
         """Check whether the video is available.
 
@@ -447,17 +707,22 @@ class YouTube:
         :rtype: Dict
         """
         if not self._signature_timestamp:
-            self._signature_timestamp = {
-                'playbackContext': {
-                    'contentPlaybackContext': {
-                        'signatureTimestamp': extract.signature_timestamp(self.js)
-                    }
+            self._signature_timestamp = self._signature_timestamp_context(self.js)
+        return self._signature_timestamp
+
+    @staticmethod
+    def _signature_timestamp_context(js: str) -> dict:
+        return {
+            'playbackContext': {
+                'contentPlaybackContext': {
+                    'signatureTimestamp': extract.signature_timestamp(js)
                 }
             }
-        return self._signature_timestamp
+        }
 
     @property
     def video_playback_ustreamer_config(self):
+        self._leave_metadata_only()
         return self.vid_info[
             'playerConfig'][
             'mediaCommonConfig'][
@@ -469,6 +734,7 @@ class YouTube:
         """
         Extract the url for abr server and decrypt the `n` parameter
         """
+        self._leave_metadata_only()
         try:
             url = self.vid_info[
                 'streamingData'][
@@ -494,45 +760,232 @@ class YouTube:
 
     @vid_info.setter
     def vid_info(self, value):
+        # A reset asks for a new response, not the prefetched one.
+        self._prefetch.pop('player', None)
         self._vid_info = value
 
+    @staticmethod
+    def _has_streams(innertube_response) -> bool:
+        """Whether a player response has streams that can be downloaded."""
+        return (
+            'streamingData' in innertube_response
+            and innertube_response.get('videoDetails', {}).get('videoId') not in _invalid_video_ids
+        )
+
+    def _player_request(
+            self,
+            client,
+            for_streams: bool = True,
+            resolved: Optional[Dict[str, Any]] = None,
+            abandoned: Optional[threading.Event] = None
+    ):
+        """Request the player of this video as ``client``.
+
+        :param str client:
+            The client to request the player as.
+        :param bool for_streams:
+            (Optional) False for a response used for its metadata only,
+            which is requested without the signature timestamp and poToken.
+        :param dict resolved:
+            (Optional) The ``signature_timestamp`` and ``visitor_data``
+            resolved beforehand. The request then never writes to this
+            object, as on the threads of a race that may be abandoned.
+        :param threading.Event abandoned:
+            (Optional) Once set, the request is not sent anymore.
+        :rtype: Tuple[Dict, InnerTube]
+        :returns: The response and the :class:`InnerTube` that sent it.
+        """
+        innertube = InnerTube(
+            client=client,
+            use_oauth=self.use_oauth,
+            allow_cache=self.allow_oauth_cache,
+            token_file=self.token_file,
+            oauth_verifier=self.oauth_verifier,
+            use_po_token=self.use_po_token,
+            po_token_verifier=self.po_token_verifier
+        )
+        if innertube.require_js_player and for_streams:
+            innertube.innertube_context.update(
+                resolved['signature_timestamp'] if resolved else self.signature_timestamp
+            )
+
+        # Automatically generates a poToken
+        if innertube.require_po_token and not self.use_po_token and for_streams:
+            logger.debug(f"The {client} client requires poToken to obtain functional streams")
+            logger.debug("Automatically generating poToken")
+            if resolved:
+                visitor_data = resolved['visitor_data']
+                po_token = self._mint_pot(visitor_data)
+            else:
+                visitor_data, po_token = self.visitor_data, self.pot
+            innertube.insert_po_token(visitor_data=visitor_data, po_token=po_token)
+        elif not self.use_po_token:
+            # from 01/22/2025 all clients must send the visitorData in the API request
+            visitor_data = resolved['visitor_data'] if resolved else self._shared_visitor_data()
+            if visitor_data:
+                innertube.insert_visitor_data(visitor_data=visitor_data)
+
+        if abandoned is not None and abandoned.is_set():
+            raise CancelledError(f'{client} client abandoned')
+        return innertube.player(self.video_id), innertube
+
+    def _race_clients(self, clients):
+        """Ask ``clients`` for the player, each one ``hedge_delay`` after the previous.
+
+        A client that fails or has no streams hands over to the next one at
+        once. Requests still running once a client won are abandoned: they
+        don't write to this object, and aren't sent if they haven't been yet.
+
+        :rtype: Tuple[Optional[str], Dict]
+        :returns:
+            The winning client (or None) and the outcome of every client that
+            answered: its ``(response, innertube)`` or the exception raised.
+        """
+        # Resolved on this thread, the racing threads only read them.
+        resolved = {
+            'signature_timestamp': (
+                self.signature_timestamp
+                if any(InnerTube(client).require_js_player for client in clients) else None
+            ),
+            'visitor_data': (
+                self.visitor_data
+                if any(InnerTube(client).require_po_token for client in clients) else self._shared_visitor_data()
+            ),
+        }
+        abandoned = threading.Event()
+        executor = ThreadPoolExecutor(max_workers=len(clients), thread_name_prefix='pytubefix-client')
+        running = {}
+        waiting = list(clients)
+        outcomes = {}
+
+        def launch():
+            client = waiting.pop(0)
+            future = executor.submit(self._player_request, client, resolved=resolved, abandoned=abandoned)
+            running[future] = client
+
+        try:
+            launch()
+            while running:
+                done, _ = wait(running, timeout=self.hedge_delay if waiting else None, return_when=FIRST_COMPLETED)
+                if not done:
+                    logger.debug(f"{', '.join(running.values())} slow to answer, also asking {waiting[0]}")
+                    launch()
+                    continue
+                for future in done:
+                    client = running.pop(future)
+                    try:
+                        outcome = future.result()
+                    except Exception as e:
+                        logger.debug(f"{client} client failed: {e}")
+                        outcome = e
+                    outcomes[client] = outcome
+                    if not isinstance(outcome, Exception) and self._has_streams(outcome[0]):
+                        return client, outcomes
+                    if waiting and not running:
+                        launch()
+            return None, outcomes
+        finally:
+            abandoned.set()
+            for future in running:
+                future.cancel()
+            executor.shutdown(wait=False)
+
+    @staticmethod
+    def _sent_po_token(innertube: InnerTube) -> Optional[str]:
+        """The poToken ``innertube`` sent, minted on another thread or not."""
+        return (
+            innertube.access_po_token
+            or innertube.innertube_context.get('serviceIntegrityDimensions', {}).get('poToken')
+        )
+
+    def _order_clients(self):
+        """Start with the client most likely to serve this kind of video."""
+        if self._clients_ordered:
+            return
+        self._clients_ordered = True
+        if not client_stats.use_adaptive_clients or self._client_chosen or self.use_oauth or self.use_po_token:
+            return
+        ranked = client_stats.default_stats.rank(self._traits, [self.client, *self.fallback_clients])
+        if ranked[0] != self.client:
+            logger.debug(f"{ranked[0]} client served such videos best lately, starting with it")
+        self.client, self.fallback_clients = ranked[0], ranked[1:]
+
+    def _record_clients(self, responses: Dict[str, Any], winner: Optional[str]):
+        """Feed the outcome of every client asked for this video into the statistics."""
+        # A video no client serves (private, removed, ...) says nothing
+        # about the clients.
+        if winner is None:
+            return
+        for client, response in responses.items():
+            # A connection error says nothing about the client.
+            if isinstance(response, dict) or isinstance(response, HTTPError):
+                client_stats.default_stats.record(self._traits, client, client == winner)
+
+    def _vid_info_raced(self):
+        clients = list(dict.fromkeys([self.client, *self.fallback_clients]))
+        winner, outcomes = self._race_clients(clients)
+        self._clients_raced = True
+        # Clients abandoned in the race have no outcome to record.
+        self._record_clients({
+            client: result if isinstance(result, Exception) else result[0]
+            for client, result in outcomes.items()
+        }, winner)
+        if winner is None:
+            # No client has streams, the primary one explains why.
+            outcome = outcomes[self.client]
+            if isinstance(outcome, Exception):
+                raise outcome
+        else:
+            outcome = outcomes[winner]
+            if winner != self.client:
+                logger.warning(f"Switching to client: {winner}")
+                self.client = winner
+
+        innertube_response, innertube = outcome
+        # Retrieves the sent poToken
+        if self.use_po_token or innertube.require_po_token:
+            self.po_token = self._sent_po_token(innertube) or self.pot
+        return innertube_response
+
     def vid_info_client(self, optional_client=None):
 
         if optional_client is None:
             if self._vid_info:
                 return self._vid_info
+            if self.metadata_only:
+                innertube_response, _ = (
+                    self._take_prefetched_player(self.client, for_streams=False)
+                    or self._player_request(self.client, for_streams=False)
+                )
+                if not innertube_response:
+                    raise pytubefix.exceptions.InnerTubeResponseError(self.video_id, self.client)
+                return innertube_response
+            self._order_clients()
+            # Interactive verifiers and oauth token refreshes can't run concurrently.
+            if self.hedge_delay is not None and not (self.use_oauth or self.use_po_token):
+                innertube_response = self._vid_info_raced()
+                if not innertube_response:
+                    raise pytubefix.exceptions.InnerTubeResponseError(self.video_id, self.client)
+                return innertube_response
             optional_client = self.client
 
+        responses = {}
+
         def call_innertube(optional_client):
-            innertube = InnerTube(
-                client=optional_client,
-                use_oauth=self.use_oauth,
-                allow_cache=self.allow_oauth_cache,
-                token_file=self.token_file,
-                oauth_verifier=self.oauth_verifier,
-                use_po_token=self.use_po_token,
-                po_token_verifier=self.po_token_verifier
+            for_streams = not self.metadata_only
+            response, innertube = (
+                self._take_prefetched_player(optional_client, for_streams=for_streams)
+                or self._player_request(optional_client, for_streams=for_streams)
             )
-            if innertube.require_js_player:
-                innertube.innertube_context.update(self.signature_timestamp)
-
-            # Automatically generates a poToken
-            if innertube.require_po_token and not self.use_po_token:
-                logger.debug(f"The {optional_client} client requires poToken to obtain functional streams")
-                logger.debug("Automatically generating poToken")
-                innertube.insert_po_token(visitor_data=self.visitor_data, po_token=self.pot)
-            elif not self.use_po_token:
-                # from 01/22/2025 all clients must send the visitorData in the API request
-                innertube.insert_visitor_data(visitor_data=self.visitor_data)
-
-            response = innertube.player(self.video_id)
+            responses[optional_client] = response
 
             # Retrieves the sent poToken
-            if self.use_po_token or innertube.require_po_token:
-                self.po_token = innertube.access_po_token or self.pot
+            if for_streams and (self.use_po_token or innertube.require_po_token):
+                self.po_token = self._sent_po_token(innertube) or self.pot
             return response
 
         innertube_response = call_innertube(optional_client)
+        answered = optional_client
         for client in self.fallback_clients:
             # Some clients are unable to access certain types of videos
             # If the video is unavailable for the current client, attempts will be made with fallback clients
@@ -541,9 +994,11 @@ class YouTube:
                 logger.warning(f"{self.client} client returned: This video is not available")
                 self.client = client
                 logger.warning(f"Switching to client: {client}")
-                innertube_response = call_innertube()
+                innertube_response = call_innertube(client)
+                answered = client
             else:
                 break
+        self._record_clients(responses, answered if self._has_streams(innertube_response) else None)
 
         if not innertube_response:
             raise pytubefix.exceptions.InnerTubeResponseError(self.video_id, self.client)
@@ -561,6 +1016,10 @@ class YouTube:
         if self._vid_details:
             return self._vid_details
 
+        self._vid_details = self._prefetched('vid_details') or self._fetch_vid_details()
+        return self._vid_details
+
+    def _fetch_vid_details(self) -> dict:
         innertube = InnerTube(
             client='TV' if self.use_oauth else 'WEB',
             use_oauth=self.use_oauth,
@@ -570,12 +1029,11 @@ class YouTube:
             use_po_token=self.use_po_token,
             po_token_verifier=self.po_token_verifier
         )
-        innertube_response = innertube.next(self.video_id)
-        self._vid_details = innertube_response
-        return self._vid_details
+        return innertube.next(self.video_id)
 
     @vid_details.setter
     def vid_details(self, value):
+        self._prefetch.pop('vid_details', None)
         self._vid_details = value
 
     def age_check(self):
@@ -759,6 +1217,7 @@ class YouTube:
 
         :rtype: :class:`StreamQuery <StreamQuery>`.
         """
+        self._leave_metadata_only()
         self.check_availability()
         return StreamQuery(self.fmt_streams)
 
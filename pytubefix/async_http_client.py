@@ -5,6 +5,7 @@ import logging
 import re
 from urllib import parse
 
+from pytubefix import bandwidth
 from pytubefix.exceptions import RegexMatchError, MaxRetriesExceeded
 from pytubefix.helpers import regex_search
 
@@ -75,6 +76,18 @@ class AsyncHTTPClient:
         async with resp:
             return await resp.text()
 
+    async def conditional_get(self, url, headers=None, timeout=None):
+        """GET request that may be answered with 304 Not Modified.
+
+        Returns the response text (None if not modified) and the response headers.
+        """
+        resp = await self._execute_request(url, method="GET", headers=headers, timeout=timeout)
+        async with resp:
+            if resp.status == 304:
+                return None, resp.headers
+            resp.raise_for_status()
+            return await resp.text(), resp.headers
+
     async def post(self, url, headers=None, data=None, timeout=None):
         """POST request, returns response text."""
         headers = headers or {}
@@ -91,13 +104,23 @@ class AsyncHTTPClient:
         async with resp:
             return {k.lower(): v for k, v in resp.headers.items()}
 
-    async def stream(self, url, timeout=None, max_retries=0):
-        """Async generator: stream file in chunks with retries and range support."""
-        file_size = default_range_size
+    async def stream(self, url, timeout=None, max_retries=0, file_size=None, rate_limit=None):
+        """Async generator: stream file in chunks with retries and range support.
+
+        The total size comes from ``file_size`` (the manifest contentLength) or
+        the first range response; a probe request is only made as a last resort.
+        ``rate_limit`` (bytes per second or a shared TokenBucket) caps the
+        throughput, on top of the process-wide limit of bandwidth.set_global_limit.
+        """
+        rate_limit = bandwidth.as_bucket(rate_limit)
+        size_known = bool(file_size)
+        if not size_known:
+            file_size = default_range_size
         downloaded = 0
 
         while downloaded < file_size:
             stop_pos = min(downloaded + default_range_size, file_size) - 1
+            range_start = downloaded
             tries = 0
             response = None
             # retry loop
@@ -112,35 +135,56 @@ class AsyncHTTPClient:
                 except aiohttp.ClientError as e:
                     logger.error(e)
                     tries += 1
-            # get real filesize if first chunk
-            if file_size == default_range_size:
-                try:
-                    resp = await self._execute_request(
-                        f"{url}&range=0-99999999999", timeout=timeout
-                    )
-                    async with resp:
-                        content_length = resp.headers.get("Content-Length")
-                        if content_length:
-                            file_size = int(content_length)
-                except Exception as e:
-                    logger.error(e)
+            if not size_known:
+                total = response.headers.get("Content-Range", "").rpartition("/")[2]
+                if total.isdigit():
+                    file_size = int(total)
+                    size_known = True
             async with response:
+                limited = bandwidth.is_limited(rate_limit)
                 while True:
-                    chunk = await response.content.readany()
+                    if limited:
+                        chunk = await response.content.read(bandwidth.throttled_read_size)
+                    else:
+                        chunk = await response.content.readany()
                     if not chunk:
                         break
                     downloaded += len(chunk)
+                    if limited:
+                        await bandwidth.throttle_async(len(chunk), rate_limit)
                     yield chunk
+            if not size_known:
+                size_known = True
+                if downloaded - range_start <= stop_pos - range_start:
+                    # A short first range is the whole stream.
+                    file_size = downloaded
+                else:
+                    file_size = await self._probe_filesize(url, timeout) or downloaded
+
+    async def _probe_filesize(self, url, timeout=None):
+        """Request the whole stream just to read its Content-Length."""
+        try:
+            resp = await self._execute_request(
+                f"{url}&range=0-99999999999", timeout=timeout
+            )
+            async with resp:
+                content_length = resp.headers.get("Content-Length")
+                if content_length:
+                    return int(content_length)
+        except Exception as e:
+            logger.error(e)
+        return None
 
-    async def seq_stream(self, url, timeout=None, max_retries=0):
+    async def seq_stream(self, url, timeout=None, max_retries=0, rate_limit=None):
         """Async generator: read sequential video segments in order."""
+        rate_limit = bandwidth.as_bucket(rate_limit)
         split_url = parse.urlsplit(url)
         base_url = f"{split_url.scheme}://{split_url.netloc}/{split_url.path}?"
         qs = dict(parse.parse_qsl(split_url.query))
         qs["sq"] = 0
         url_0 = base_url + parse.urlencode(qs)
         buffer = bytearray()
-        async for chunk in self.stream(url_0, timeout, max_retries):
+        async for chunk in self.stream(url_0, timeout, max_retries, rate_limit=rate_limit):
             yield chunk
             buffer.extend(chunk)
         # Find segment count
@@ -157,7 +201,7 @@ class AsyncHTTPClient:
         for sq in range(1, segment_count + 1):
             qs["sq"] = sq
             seg_url = base_url + parse.urlencode(qs)
-            async for chunk in self.stream(seg_url, timeout, max_retries):
+            async for chunk in self.stream(seg_url, timeout, max_retries, rate_limit=rate_limit):
                 yield chunk
 
     async def filesize(self, url):
@@ -1,15 +1,17 @@
+import asyncio
 import logging
 from typing import Any, Callable, Dict, List, Optional, Tuple
 
 import pytubefix
 import pytubefix.exceptions as exceptions
-from pytubefix import extract
+from pytubefix import extract, player_store
 from pytubefix import Stream, StreamQuery
 from pytubefix.helpers import install_proxy
 from pytubefix.innertube import InnerTube
 from pytubefix.metadata import YouTubeMetadata
 from pytubefix.monostate import Monostate
 from pytubefix.botGuard import bot_guard
+from pytubefix.visitor_data import visitor_data_from_response, visitor_data_provider
 
 from pytubefix.async_http_client import AsyncHTTPClient
 
@@ -114,7 +116,7 @@ class AsyncYouTube:
             return self._js
         js_url = await self.get_js_url()
         if pytubefix.__js_url__ != js_url:
-            self._js = await self.http_client.get(js_url)
+            self._js = await player_store.get_player_js_async(js_url, self.http_client)
             pytubefix.__js__ = self._js
             pytubefix.__js_url__ = js_url
         else:
@@ -131,18 +133,54 @@ class AsyncYouTube:
         if self._visitor_data:
             return self._visitor_data
 
+        self._visitor_data = visitor_data_provider.cached()
+        if self._visitor_data:
+            return self._visitor_data
+        try:
+            loop = asyncio.get_running_loop()
+            self._visitor_data = await loop.run_in_executor(None, visitor_data_provider.get)
+            return self._visitor_data
+        except Exception as e:
+            logger.debug(f"Unable to obtain a shared visitorData, reason: {e}")
+
         try:
             self._visitor_data = extract.visitor_data(str((await self.get_initial_data())['responseContext']))
             return self._visitor_data
         except (KeyError, pytubefix.exceptions.RegexMatchError):
             pass
         innertube_response = InnerTube('WEB').player(self.video_id)
-        try:
-            self._visitor_data = innertube_response['responseContext']['visitorData']
-        except KeyError:
-            self._visitor_data = innertube_response['responseContext']['serviceTrackingParams'][0]['params'][6]['value']
+        self._visitor_data = visitor_data_from_response(innertube_response)
+        visitor_data_provider.offer(self._visitor_data)
         return self._visitor_data
-    
+
+    async def _get_shared_visitor_data(self):
+        """The visitorData sent by clients without a poToken, see :meth:`YouTube._shared_visitor_data`."""
+        if self._visitor_data:
+            return self._visitor_data
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, visitor_data_provider.get)
+        except Exception as e:
+            logger.debug(f"Unable to obtain a shared visitorData, reason: {e}")
+            return None
+
+    async def get_pot(self):
+        """Retrieves the poToken generated by botGuard, without blocking the event loop.
+
+        This poToken only works for WEB-based clients.
+        """
+        if self._pot:
+            return self._pot
+        visitor_data = await self.get_visitor_data()
+        logger.debug('Invoking botGuard')
+        try:
+            loop = asyncio.get_running_loop()
+            self._pot = await loop.run_in_executor(None, bot_guard.generate_po_token, visitor_data)
+            logger.debug('PoToken generated successfully')
+        except Exception as e:
+            logger.warning('Unable to run botGuard. Skipping poToken generation, reason: ' + e.__str__())
+        return self._pot
+
     async def get_vid_info(self):
         if self._vid_info:
             return self._vid_info
@@ -163,7 +201,10 @@ class AsyncYouTube:
             if innertube.require_po_token and not self.use_po_token:
                 innertube.insert_po_token(visitor_data=await self.get_visitor_data(), po_token=await self.get_pot())
             elif not self.use_po_token:
-                innertube.insert_visitor_data(visitor_data=await self.get_visitor_data())
+                # from 01/22/2025 all clients must send the visitorData in the API request
+                visitor_data = await self._get_shared_visitor_data()
+                if visitor_data:
+                    innertube.insert_visitor_data(visitor_data=visitor_data)
             response = innertube.player(self.video_id)
             if self.use_po_token or innertube.require_po_token:
                 self.po_token = innertube.access_po_token or await self.get_pot()
@@ -308,6 +349,7 @@ class AsyncYouTube:
                 extract.apply_signature(stream_manifest, vid_info, js, js_url)
             except exceptions.ExtractError:
                 # clear js cache and retry
+                player_store.default_store.invalidate(await self.get_js_url())
                 self._js = None
                 self._js_url = None
                 pytubefix.__js__ = None
@@ -366,6 +408,7 @@ class AsyncYouTube:
                 extract.apply_signature([stream_data], vid_info, js, js_url)
             except exceptions.ExtractError:
     #retry, recache
+                player_store.default_store.invalidate(await self.get_js_url())
                 self._js = None
                 self._js_url = None
                 pytubefix.__js__ = None
@@ -0,0 +1,116 @@
+"""Token bucket bandwidth shaping for stream downloads.
+
+Every download can be given its own limit, and all downloads of the process
+additionally share the bucket set with :func:`set_global_limit`. A chunk is
+only handed on once both buckets had the tokens for it, so a limited batch
+job leaves the rest of the bandwidth to everything else.
+"""
+import asyncio
+import threading
+import time
+from typing import Optional, Union
+
+# Reads are split in pieces of this size while a limit applies, so the
+# throughput stays smooth instead of arriving one 9MB range at a time.
+throttled_read_size = 65536  # 64KB
+
+global_bucket: Optional["TokenBucket"] = None
+
+
+class TokenBucket:
+    """Thread-safe token bucket, one token per byte."""
+
+    def __init__(self, rate: float, burst: Optional[int] = None):
+        """Construct a :class:`TokenBucket <TokenBucket>`.
+
+        :param float rate:
+            Sustained rate in bytes per second.
+        :param int burst:
+            (Optional) Maximum number of bytes that can go through at once
+            after the bucket sat idle. Defaults to one second worth of ``rate``.
+        """
+        if rate <= 0:
+            raise ValueError('rate must be positive')
+        self.rate = rate
+        self.burst = burst or max(int(rate), throttled_read_size)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: int) -> float:
+        """Take ``amount`` tokens, going into debt if there aren't enough.
+
+        :rtype: float
+        :returns: Seconds to wait before the reserved bytes may be used.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= amount
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def consume(self, amount: int):
+        """Block until ``amount`` bytes fit in the bucket."""
+        delay = self.reserve(amount)
+        if delay:
+            time.sleep(delay)
+
+    async def consume_async(self, amount: int):
+        """Wait, without blocking the event loop, until ``amount`` bytes fit."""
+        delay = self.reserve(amount)
+        if delay:
+            await asyncio.sleep(delay)
+
+
+def set_global_limit(rate: Optional[float], burst: Optional[int] = None):
+    """Cap the combined throughput of all downloads of the process.
+
+    Applies to the downloads already running as well.
+
+    :param float rate:
+        Bytes per second, or None to remove the limit.
+    :param int burst:
+        (Optional) See :class:`TokenBucket`.
+    """
+    global global_bucket
+    global_bucket = TokenBucket(rate, burst) if rate else None
+
+
+def as_bucket(limit: Union[None, float, TokenBucket]) -> Optional[TokenBucket]:
+    """Per-download bucket for a ``rate_limit`` argument.
+
+    A :class:`TokenBucket` is used as is, so several downloads given the same
+    bucket share its rate. A number is a limit in bytes per second.
+    """
+    if limit is None or isinstance(limit, TokenBucket):
+        return limit
+    return TokenBucket(limit)
+
+
+def is_limited(bucket: Optional[TokenBucket]) -> bool:
+    """Whether chunks of a download using ``bucket`` have to be throttled."""
+    return bucket is not None or global_bucket is not None
+
+
+def _delay(amount: int, bucket: Optional[TokenBucket]) -> float:
+    # Both buckets are charged up front and the longest wait wins,
+    # waiting for them one after the other would count the time twice.
+    delays = [b.reserve(amount) for b in (bucket, global_bucket) if b is not None]
+    return max(delays, default=0.0)
+
+
+def throttle(amount: int, bucket: Optional[TokenBucket] = None):
+    """Block until ``amount`` bytes are allowed by ``bucket`` and the global bucket."""
+    delay = _delay(amount, bucket)
+    if delay:
+        time.sleep(delay)
+
+
+async def throttle_async(amount: int, bucket: Optional[TokenBucket] = None):
+    """Asynchronous :func:`throttle`."""
+    delay = _delay(amount, bucket)
+    if delay:
+        await asyncio.sleep(delay)
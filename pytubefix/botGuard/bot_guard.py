@@ -1,27 +1,51 @@
+import atexit
+import json
+import logging
 import os
+import queue
 import subprocess
 import sys
-import nodejs_wheel.executable
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, Optional, Tuple
+
+try:
+    import nodejs_wheel.executable
+except ImportError:
+    nodejs_wheel = None
+
+from pytubefix.helpers import user_cache_dir
+
+logger = logging.getLogger(__name__)
 
 PLATFORM = sys.platform
 
-NODE_DIR = nodejs_wheel.executable.ROOT_DIR
+NODE_DIR = nodejs_wheel.executable.ROOT_DIR if nodejs_wheel else None
 
 def _node_path() -> str:
+    if NODE_DIR is None:
+        return 'node'
     suffix = ".exe" if os.name == "nt" else ""
     bin_dir = NODE_DIR if os.name == "nt" else os.path.join(NODE_DIR, "bin")
     return os.path.join(bin_dir, 'node' + suffix)
 
 NODE_PATH = _node_path()
 VM_PATH = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'vm/botGuard.js')
+WORKER_PATH = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'vm/worker.js')
 
-def generate_po_token(visitor_data: str) -> str:
-    """
-    Run nodejs to generate poToken through botGuard.
-    
-    Raises:
-        RuntimeError: If Node.js is not available
-    """
+# Mint poTokens in a long-lived node process instead of one process per token.
+use_worker = True
+
+# Upper bound of the lifetime of a cached poToken, in seconds. BotGuard
+# reports the lifetime of its integrity token, the shorter one is used.
+po_token_ttl = 6 * 60 * 60
+
+_cache_file = os.path.join(user_cache_dir(), 'po_tokens.json')
+
+
+def _run_once(visitor_data: str) -> str:
+    """Mint a poToken in a node process of its own."""
     try:
         result = subprocess.check_output(
             [NODE_PATH, VM_PATH, visitor_data],
@@ -37,3 +61,253 @@ def generate_po_token(visitor_data: str) -> str:
         raise RuntimeError(
             f"Failed to execute botGuard.js: {e.stderr.decode().strip()}"
         ) from e
+
+
+class WorkerUnsupported(RuntimeError):
+    """The worker can't drive this botGuard.js, tokens are minted one process at a time."""
+
+
+class BotGuardWorker:
+    """node process keeping botGuard.js loaded between poToken requests.
+
+    Requests are answered one at a time. The process is started on the first
+    request, restarted if it died, and stopped once idle for ``idle_timeout``.
+    """
+
+    def __init__(self, script: str = WORKER_PATH, timeout: float = 60, idle_timeout: float = 300):
+        """Construct a :class:`BotGuardWorker <BotGuardWorker>`.
+
+        :param str script:
+            The worker script run by node.
+        :param float timeout:
+            Seconds to wait for a token before giving up on the process.
+        :param float idle_timeout:
+            Seconds without request after which the process is stopped.
+        """
+        self.script = script
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self.proc: Optional[subprocess.Popen] = None
+        self._replies: Optional[queue.Queue] = None
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self._idle_timer: Optional[threading.Timer] = None
+
+    def _start(self):
+        try:
+            self.proc = subprocess.Popen(
+                [NODE_PATH, self.script],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                text=True
+            )
+        except FileNotFoundError as e:
+            raise RuntimeError(
+                f"Node.js is required but not found. Tried path: {NODE_PATH}\n"
+                "Please install Node.js or ensure it's in your PATH."
+            ) from e
+        # Replies are read on a thread of their own so a request can time out.
+        self._replies = queue.Queue()
+        threading.Thread(
+            target=self._read, args=(self.proc, self._replies), name='pytubefix-botguard-reader', daemon=True
+        ).start()
+
+    @staticmethod
+    def _read(proc: subprocess.Popen, replies: queue.Queue):
+        for line in proc.stdout:
+            try:
+                replies.put(json.loads(line))
+            except ValueError:
+                logger.debug(f'unexpected output of the botGuard worker: {line!r}')
+        replies.put(None)
+
+    def mint(self, visitor_data: str) -> Tuple[str, Optional[float]]:
+        """Mint a poToken for ``visitor_data``.
+
+        :rtype: Tuple[str, Optional[float]]
+        :returns: The token and its lifetime in seconds, if BotGuard reported it.
+        """
+        with self._lock:
+            if self._idle_timer is not None:
+                self._idle_timer.cancel()
+            if self.proc is None or self.proc.poll() is not None:
+                self._start()
+            self._next_id += 1
+            request_id = self._next_id
+            try:
+                self.proc.stdin.write(json.dumps({'id': request_id, 'visitor_data': visitor_data}) + '\n')
+                self.proc.stdin.flush()
+                while True:
+                    reply = self._replies.get(timeout=self.timeout)
+                    if reply is None:
+                        raise RuntimeError(f'botGuard worker exited with code {self.proc.wait()}')
+                    if reply.get('error') == 'unsupported':
+                        raise WorkerUnsupported('botGuard.js has no entry point the worker knows')
+                    if reply.get('id') == request_id:
+                        break
+            except (OSError, queue.Empty, RuntimeError):
+                self._stop()
+                raise
+            finally:
+                self._idle_timer = threading.Timer(self.idle_timeout, self.close)
+                self._idle_timer.daemon = True
+                self._idle_timer.start()
+
+        if 'error' in reply:
+            raise RuntimeError(f"Failed to execute botGuard.js: {reply['error']}")
+        return reply['po_token'], reply.get('ttl')
+
+    def _stop(self):
+        if self.proc is None:
+            return
+        try:
+            self.proc.stdin.close()
+        except OSError:
+            pass
+        self.proc.terminate()
+        self.proc.wait()
+        self.proc = None
+
+    def close(self):
+        """Stop the node process, the next request starts a new one."""
+        with self._lock:
+            if self._idle_timer is not None:
+                self._idle_timer.cancel()
+                self._idle_timer = None
+            self._stop()
+
+
+class PoTokenService:
+    """poTokens by visitor data, cached in memory and on disk until they expire.
+
+    Threads asking for the token of the same visitor at the same time share a
+    single BotGuard run.
+    """
+
+    def __init__(self, worker: Optional[BotGuardWorker] = None, path: Optional[str] = _cache_file):
+        """Construct a :class:`PoTokenService <PoTokenService>`.
+
+        :param BotGuardWorker worker:
+            (Optional) The worker minting the tokens.
+        :param str path:
+            (Optional) JSON file the tokens are kept in across processes,
+            None to keep them in memory only.
+        """
+        self.worker = worker or BotGuardWorker()
+        self.path = path
+        # visitor_data -> (token, expiry as a unix timestamp)
+        self._tokens: Optional[Dict[str, Tuple[str, float]]] = None
+        self._pending: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._worker_supported = True
+
+    def _load(self) -> Dict[str, Tuple[str, float]]:
+        if self._tokens is None:
+            self._tokens = {}
+            if self.path:
+                try:
+                    with open(self.path) as f:
+                        self._tokens = {key: tuple(value) for key, value in json.load(f).items()}
+                except (OSError, ValueError, TypeError):
+                    pass
+        return self._tokens
+
+    def _save(self):
+        if not self.path:
+            return
+        now = time.time()
+        tokens = {key: value for key, value in self._tokens.items() if value[1] > now}
+        temp_path = f'{self.path}.{os.getpid()}.tmp'
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(temp_path, 'w') as f:
+                json.dump(tokens, f)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            logger.debug(f'unable to store the poTokens: {e}')
+
+    def cached(self, visitor_data: str) -> Optional[str]:
+        """Unexpired token of ``visitor_data``, if one is cached."""
+        with self._lock:
+            token, expires = self._load().get(visitor_data, (None, 0))
+        return token if expires > time.time() else None
+
+    def get(self, visitor_data: str) -> str:
+        """poToken of ``visitor_data``, minted only if none is cached.
+
+        :rtype: str
+        """
+        token = self.cached(visitor_data)
+        if token:
+            return token
+
+        with self._lock:
+            future = self._pending.get(visitor_data)
+            owner = future is None
+            if owner:
+                future = self._pending[visitor_data] = Future()
+        if not owner:
+            logger.debug('waiting for the poToken already being minted')
+            return future.result()
+
+        try:
+            token, ttl = self._mint(visitor_data)
+            with self._lock:
+                expires = time.time() + min(ttl or po_token_ttl, po_token_ttl)
+                self._load()[visitor_data] = (token, expires)
+                self._save()
+            future.set_result(token)
+            return token
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._pending[visitor_data]
+
+    def _mint(self, visitor_data: str) -> Tuple[str, Optional[float]]:
+        if use_worker and self._worker_supported:
+            try:
+                return self.worker.mint(visitor_data)
+            except WorkerUnsupported:
+                logger.debug('botGuard worker unsupported, running botGuard.js once per token')
+                self._worker_supported = False
+        return _run_once(visitor_data), None
+
+    def invalidate(self, visitor_data: str):
+        """Forget the token of ``visitor_data``, e.g. once it was rejected."""
+        with self._lock:
+            if self._load().pop(visitor_data, None):
+                self._save()
+
+    def clear(self):
+        """Forget every token, in memory and on disk."""
+        with self._lock:
+            self._tokens = {}
+            if self.path:
+                try:
+                    os.remove(self.path)
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    logger.debug(f'unable to remove the poTokens: {e}')
+
+    def close(self):
+        self.worker.close()
+
+
+po_token_service = PoTokenService()
+atexit.register(po_token_service.close)
+
+
+def generate_po_token(visitor_data: str) -> str:
+    """
+    Run nodejs to generate poToken through botGuard.
+
+    Tokens are cached per visitor data until they expire, see :class:`PoTokenService`.
+
+    Raises:
+        RuntimeError: If Node.js is not available
+    """
+    return po_token_service.get(visitor_data)
@@ -0,0 +1,76 @@
+// Long-lived BotGuard process. botGuard.js mints a single poToken for the
+// visitor data given on its command line and exits; this worker loads it
+// once, with its entry point turned into a function, and mints one token per
+// request instead.
+//
+// Protocol: one JSON object per line on stdin and stdout.
+//   {"id": 1, "visitor_data": "..."} -> {"id": 1, "po_token": "...", "ttl": 43200}
+// A failed request gets {"id": 1, "error": "..."} instead. If the entry point
+// of botGuard.js can't be found, the first line written is
+// {"error": "unsupported"} and the worker exits.
+const fs = require("fs");
+const path = require("path");
+const Module = require("module");
+
+const BUNDLE = path.join(__dirname, "botGuard.js");
+const ENTRY = "!async function(){const n=process.argv.slice(2);";
+const RESULT = "console.info(p.poToken)}()";
+
+function reply(message) {
+    process.stdout.write(JSON.stringify(message) + "\n");
+}
+
+// stdout carries the replies, anything the bundle logs goes to stderr.
+for (const name of ["log", "info", "warn", "debug"]) {
+    console[name] = (...args) => process.stderr.write(args.join(" ") + "\n");
+}
+
+let source = fs.readFileSync(BUNDLE, "utf8");
+if (source.split(ENTRY).length !== 2 || source.split(RESULT).length !== 2) {
+    reply({error: "unsupported"});
+    process.exit(0);
+}
+source = source
+    .replace(ENTRY, "globalThis.__pytubefixMint=async function(n){")
+    .replace(RESULT, "return p}");
+const bundle = new Module(BUNDLE, module);
+bundle.filename = BUNDLE;
+bundle.paths = Module._nodeModulePaths(__dirname);
+bundle._compile(source, BUNDLE);
+const mint = globalThis.__pytubefixMint;
+
+// The bundle keeps its DOM in globals, requests are handled one at a time.
+let queue = Promise.resolve();
+
+function handle(request) {
+    return mint([request.visitor_data]).then(
+        (result) => reply({
+            id: request.id,
+            po_token: result.poToken,
+            ttl: (result.integrityTokenData || {}).estimatedTtlSecs,
+        }),
+        (error) => reply({id: request.id, error: String(error && error.message || error)}),
+    );
+}
+
+let buffer = "";
+process.stdin.on("data", (data) => {
+    buffer += data.toString();
+    let index;
+    while ((index = buffer.indexOf("\n")) >= 0) {
+        const line = buffer.slice(0, index).trim();
+        buffer = buffer.slice(index + 1);
+        if (!line) {
+            continue;
+        }
+        let request;
+        try {
+            request = JSON.parse(line);
+        } catch (error) {
+            reply({error: error.message});
+            continue;
+        }
+        queue = queue.then(() => handle(request));
+    }
+});
+process.stdin.on("end", () => queue.then(() => process.exit(0)));
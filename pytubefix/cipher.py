@@ -8,38 +8,205 @@ ciphered version, cycle it through a series of "transform functions," and then
 signs the media URL with the output.
 
 This module is responsible for (1) finding these "transformations
-functions" (2) sends them to be interpreted by nodejs
+functions" (2) sends them to be interpreted by nodejs, or by the Python
+interpreter where node isn't available
 """
+import atexit
 import logging
 import re
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
 
+from pytubefix import player_store
 from pytubefix.exceptions import RegexMatchError, InterpretationError
 from pytubefix.jsinterp import JSInterpreter, extract_player_js_global_var
-from pytubefix.sig_nsig.node_runner import NodeRunner
+from pytubefix.sig_cache import signature_cache
+from pytubefix.version import __version__
+from pytubefix.sig_nsig.node_runner import NodeRunner, node_available
+from pytubefix.sig_nsig.py_runner import PythonRunner
+from pytubefix.sig_nsig.slicer import slice_function
 
 logger = logging.getLogger(__name__)
 
+# Deciphered values are remembered on disk per player version, see sig_cache.
+use_signature_cache = True
+
+# Stored with the function names extracted from a player. Bump it whenever the
+# extraction changes in a way that makes previously stored results wrong.
+_metadata_version = 1
+
+# Node loads only the decipher functions and their dependencies instead of the
+# whole player, once such a slice was checked against the full player.
+use_code_slices = True
+
+# Where the decipher functions run: 'node', 'python' (in process, compiled
+# once per player and checked against the JavaScript interpreter, or
+# interpreted when that fails) or 'auto'. Node remains the reference for the
+# nsig function, which the interpreter can't always run to check a compiled
+# one against. 'auto' therefore runs nsig on node when installed, and sig in
+# process only when it compiles.
+default_backend = 'auto'
+
+# Inputs used to check that a slice behaves like the full player.
+_probe_inputs = (
+    'aBcDeFgHiJkLmNoP',
+    'AOq0QJ8wRAIgN3mr5QWRs1vwqsV5sYnC0YBbjPuVvHvUHLe2uxx1bK4CIDoUO_p-8rJUt8_wkQmvC3tZLw5nX0M5xHRHKa23RAZk',
+    '0123456789-_zyxwvutsrq',
+)
+
+
+def resolve_backend(backend: Optional[str] = None) -> str:
+    """Backend actually used for ``backend``, ``'node'`` or ``'python'``."""
+    backend = backend or default_backend
+    if backend == 'auto':
+        return 'node' if node_available() else 'python'
+    if backend not in ('node', 'python'):
+        raise ValueError(f"unknown cipher backend {backend!r}")
+    return backend
+
 
 class Cipher:
-    def __init__(self, js: str, js_url: str):
+    def __init__(self, js: str, js_url: str, backend: Optional[str] = None):
 
         self.js_url = js_url
         self.js = js
+        self.backend = resolve_backend(backend)
+        self._prefer_compiled_sig = (backend or default_backend) == 'auto'
+        self.js_interpreter = JSInterpreter(js)
 
         self._sig_param_val = None
         self._nsig_param_val = None
-        self.sig_function_name = self.get_sig_function_name(js, js_url)
-        self.nsig_function_name = self.get_nsig_function_name(js, js_url)
-
-        self.runner_sig = NodeRunner(js)
-        self.runner_sig.load_function(self.sig_function_name)
+        # kind -> standalone script, or None once slicing it failed
+        self._slices: Dict[str, Optional[str]] = {}
+        metadata_loaded = self._load_metadata()
+        if not metadata_loaded:
+            self.sig_function_name = self.get_sig_function_name(js, js_url)
+            self.nsig_function_name = self.get_nsig_function_name(js, js_url)
+            self.global_var = extract_player_js_global_var(js)
 
-        self.runner_nsig = NodeRunner(js)
-        self.runner_nsig.load_function(self.nsig_function_name)
+        known_slices = dict(self._slices)
+        self.runner_sig = self._start_runner('sig', self.sig_function_name)
+        self.runner_nsig = self._start_runner('nsig', self.nsig_function_name)
+        if not metadata_loaded or self._slices != known_slices:
+            self._save_metadata()
 
         self.calculated_n = None
 
-        self.js_interpreter = JSInterpreter(js)
+    def _metadata_version_tag(self) -> str:
+        return f'{_metadata_version}:{__version__}'
+
+    def _load_metadata(self) -> bool:
+        """Take the function names from the metadata stored for this player.
+
+        Metadata written by another version of the extraction, or for another
+        content at the same url, is ignored.
+
+        :rtype: bool
+        :returns: Whether usable metadata was found.
+        """
+        metadata = player_store.default_store.load_metadata(self.js_url, 'cipher')
+        if (
+            not metadata
+            or metadata.get('version') != self._metadata_version_tag()
+            or metadata.get('js_size') != len(self.js)
+        ):
+            return False
+        logger.debug(f'using the stored cipher metadata of {self.js_url}')
+        self.sig_function_name = metadata['sig_function_name']
+        self.nsig_function_name = metadata['nsig_function_name']
+        self._sig_param_val = metadata.get('sig_param_val')
+        self._nsig_param_val = metadata.get('nsig_param_val')
+        self.global_var = tuple(metadata.get('global_var') or (None, None, None))
+        self._slices = metadata.get('slices') or {}
+        return True
+
+    def _save_metadata(self):
+        player_store.default_store.save_metadata(self.js_url, 'cipher', {
+            'version': self._metadata_version_tag(),
+            'js_size': len(self.js),
+            'sig_function_name': self.sig_function_name,
+            'nsig_function_name': self.nsig_function_name,
+            'sig_param_val': self._sig_param_val,
+            'nsig_param_val': self._nsig_param_val,
+            'global_var': list(self.global_var),
+            'slices': self._slices,
+        })
+
+    def _start_runner(self, kind: str, function_name: str):
+        """Start a node process with ``function_name`` loaded.
+
+        The slice of the function is loaded when one is known to work. The
+        first time, the full player is loaded and a slice is tried and
+        compared with it, it replaces the full player if they agree.
+
+        With the python backend the function is built in process instead, as
+        is the sig function with the auto backend when it compiles.
+        """
+        if self.backend == 'python' or (kind == 'sig' and self._prefer_compiled_sig):
+            runner = PythonRunner(self.js, self.js_interpreter, self.global_var)
+            runner.load_function(function_name, self._probe_calls(kind))
+            if self.backend == 'python' or runner.compiled:
+                return runner
+            runner.close()
+
+        code = self._slices.get(kind) if use_code_slices else None
+        if code:
+            runner = NodeRunner(code)
+            runner.load_function(function_name)
+            return runner
+
+        runner = NodeRunner(self.js)
+        runner.load_function(function_name)
+        if use_code_slices and kind not in self._slices:
+            runner = self._try_slice(runner, kind, function_name)
+        return runner
+
+    def _try_slice(self, runner: NodeRunner, kind: str, function_name: str) -> NodeRunner:
+        self._slices[kind] = None
+        code = slice_function(self.js, function_name, self.global_var)
+        if code is None:
+            return runner
+
+        sliced = NodeRunner(code)
+        try:
+            sliced.load_function(function_name)
+            expected = self._probe(runner, kind)
+            if any(expected) and self._probe(sliced, kind) == expected:
+                logger.debug(f'loading the {kind} function from a {len(code)} bytes slice')
+                self._slices[kind] = code
+                runner.close()
+                return sliced
+            logger.debug(f'the {kind} slice disagrees with the player, loading the full player')
+        except Exception as e:
+            logger.debug(f'the {kind} slice failed ({e}), loading the full player')
+        sliced.close()
+        return runner
+
+    def _probe_calls(self, kind: str) -> list:
+        """Argument lists of the probe inputs, with the parameters the function is called with."""
+        if kind == 'sig':
+            params = [self._sig_param_val] if self._sig_param_val else [None]
+        else:
+            params = self._nsig_param_val or [None]
+        return [
+            [value] if param is None else [param, value]
+            for param in params for value in _probe_inputs
+        ]
+
+    def _probe(self, runner: NodeRunner, kind: str) -> list:
+        """Outputs of ``runner`` for the probe inputs, None where it failed."""
+        return [
+            result if isinstance(result, str) and 'error' not in result and '_w8_' not in result else None
+            for result in runner.call_batch(self._probe_calls(kind))
+        ]
+
+    def close(self):
+        """Stop the runners of this cipher."""
+        self.runner_sig.close()
+        self.runner_nsig.close()
 
     def get_nsig(self, n: str):
         """Interpret the function that transforms the signature parameter `n`.
@@ -50,22 +217,42 @@ class Cipher:
         :returns:
             Returns the transformed value "n".
         """
+        return self.get_nsig_batch([n])[n]
+
+    def get_nsig_batch(self, values: List[str]) -> Dict[str, str]:
+        """Transform several `n` parameters in a single round trip per control parameter.
+
+        :param list values:
+            The parameters that must be transformed.
+        :rtype: Dict[str, str]
+        :returns:
+            The transformed value of every parameter.
+        """
+        pending = list(dict.fromkeys(values))
+        cached = signature_cache.get_many(self.js_url, 'nsig', pending) if use_signature_cache else {}
+        pending = [n for n in pending if n not in cached]
+        results = {}
         try:
             if self._nsig_param_val:
                 for param in self._nsig_param_val:
-                    nsig = self.runner_nsig.call([param, n])
-                    if not isinstance(nsig, str):
-                        continue
-                    else:
+                    nsigs = self.runner_nsig.call_batch([[param, n] for n in pending])
+                    results.update(zip(pending, nsigs))
+                    # The first control parameter giving a string is the right one.
+                    pending = [n for n in pending if not isinstance(results[n], str)]
+                    if not pending:
                         break
             else:
-                nsig = self.runner_nsig.call([n])
+                results.update(zip(pending, self.runner_nsig.call_batch([[n] for n in pending])))
         except Exception as e:
             raise InterpretationError(js_url=self.js_url, reason=e)
 
-        if 'error' in nsig or '_w8_' in nsig or not isinstance(nsig, str):
-            raise InterpretationError(js_url=self.js_url, reason=nsig)
-        return nsig
+        for nsig in results.values():
+            if 'error' in nsig or '_w8_' in nsig or not isinstance(nsig, str):
+                raise InterpretationError(js_url=self.js_url, reason=nsig)
+        if use_signature_cache:
+            signature_cache.put_many(self.js_url, 'nsig', results)
+        results.update(cached)
+        return results
 
     def get_sig(self, ciphered_signature: str) -> str:
         """interprets the function that signs the streams.
@@ -76,17 +263,36 @@ class Cipher:
         :returns:
            Returns the correct stream signature.
         """
+        return self.get_sig_batch([ciphered_signature])[ciphered_signature]
+
+    def get_sig_batch(self, ciphered_signatures: List[str]) -> Dict[str, str]:
+        """Sign several streams in a single round trip.
+
+        :param list ciphered_signatures:
+           The signatures that must be transformed.
+        :rtype: Dict[str, str]
+        :returns:
+           The correct signature for every ciphered one.
+        """
+        pending = list(dict.fromkeys(ciphered_signatures))
+        cached = signature_cache.get_many(self.js_url, 'sig', pending) if use_signature_cache else {}
+        pending = [s for s in pending if s not in cached]
+        if self._sig_param_val:
+            calls = [[self._sig_param_val, s] for s in pending]
+        else:
+            calls = [[s] for s in pending]
         try:
-            if self._sig_param_val:
-                sig = self.runner_sig.call([self._sig_param_val, ciphered_signature])
-            else:
-                sig = self.runner_sig.call([ciphered_signature])
+            results = dict(zip(pending, self.runner_sig.call_batch(calls)))
         except Exception as e:
             raise InterpretationError(js_url=self.js_url, reason=e)
 
-        if 'error' in sig or not isinstance(sig, str):
-            raise InterpretationError(js_url=self.js_url, reason=sig)
-        return sig
+        for sig in results.values():
+            if 'error' in sig or not isinstance(sig, str):
+                raise InterpretationError(js_url=self.js_url, reason=sig)
+        if use_signature_cache:
+            signature_cache.put_many(self.js_url, 'sig', results)
+        results.update(cached)
+        return results
 
 
     def get_sig_function_name(self, js: str, js_url: str) -> str:
@@ -224,4 +430,168 @@ class Cipher:
             results.append(chosen)
 
         logger.debug(f'Parameters found: {results}')
-        return results
\ No newline at end of file
+        return results
+
+
+class _RegistryEntry:
+    """A cipher of :class:`CipherRegistry`, built or being built, and its users."""
+
+    def __init__(self):
+        self.future: Future = Future()
+        self.leases = 0
+        self.last_use = time.monotonic()
+        # Removed from the registry, closed once the last lease is returned.
+        self.retired = False
+
+    @property
+    def built(self) -> bool:
+        return self.future.done() and self.future.exception() is None
+
+
+class CipherRegistry:
+    """Process-wide cache of :class:`Cipher` objects, keyed by player url and backend.
+
+    Building a :class:`Cipher` starts two node processes and loads the whole
+    player into each of them. Videos served by the same player reuse the warm
+    cipher instead, so deciphering costs an IPC round trip rather than a node
+    cold start. Ciphers are handed out through :meth:`lease`, those not leased
+    for ``idle_timeout`` seconds are closed.
+    """
+
+    def __init__(self, idle_timeout: float = 300, max_size: int = 4):
+        """Construct a :class:`CipherRegistry <CipherRegistry>`.
+
+        :param float idle_timeout:
+            Seconds after which an unused cipher is closed.
+        :param int max_size:
+            Maximum number of players kept warm at once, the least recently
+            used one is closed to make room for a new one.
+        """
+        self.idle_timeout = idle_timeout
+        self.max_size = max_size
+        self._ciphers: Dict[tuple, _RegistryEntry] = {}
+        self._lock = threading.Lock()
+        self._reaper: Optional[threading.Thread] = None
+
+    @contextmanager
+    def lease(self, js: str, js_url: str, backend: Optional[str] = None) -> Iterator[Cipher]:
+        """Warm cipher of the player ``js_url``, built from ``js`` if needed.
+
+        The cipher is not closed before the ``with`` block exits, even if it
+        is evicted meanwhile. Only the thread that builds a cipher waits for
+        its node processes, other players are served in the meantime.
+
+        :param str backend:
+            (Optional) ``'node'``, ``'python'`` or ``'auto'``, defaults to
+            ``default_backend``.
+        :rtype: Iterator[Cipher]
+        """
+        key = (js_url, resolve_backend(backend))
+        with self._lock:
+            entry = self._ciphers.get(key)
+            builder = entry is None
+            if builder:
+                entry = self._ciphers[key] = _RegistryEntry()
+            entry.leases += 1
+            entry.last_use = time.monotonic()
+
+        try:
+            if builder:
+                self._build(key, entry, js)
+            yield entry.future.result()
+        finally:
+            self._release(entry)
+
+    def _build(self, key: tuple, entry: _RegistryEntry, js: str):
+        js_url, backend = key
+        logger.debug(f'building a new {backend} cipher for {js_url}')
+        try:
+            entry.future.set_result(Cipher(js=js, js_url=js_url, backend=backend))
+        except BaseException as e:
+            entry.future.set_exception(e)
+            with self._lock:
+                if self._ciphers.get(key) is entry:
+                    del self._ciphers[key]
+            raise
+        with self._lock:
+            # The new cipher must not be the one evicted to make room for it.
+            entry.last_use = time.monotonic()
+            closing = self._evict_lru()
+            self._start_reaper()
+        self._close(closing)
+
+    def _release(self, entry: _RegistryEntry):
+        with self._lock:
+            entry.leases -= 1
+            entry.last_use = time.monotonic()
+            closing = [entry] if entry.retired and not entry.leases else []
+        self._close(closing)
+
+    def _retire(self, key: tuple) -> List[_RegistryEntry]:
+        """Remove ``key``, its entry if it can be closed right away. Called with the lock held."""
+        entry = self._ciphers.pop(key)
+        entry.retired = True
+        return [] if entry.leases else [entry]
+
+    def _evict_lru(self) -> List[_RegistryEntry]:
+        closing = []
+        while len(self._ciphers) > self.max_size:
+            built = [key for key, entry in self._ciphers.items() if entry.built]
+            if not built:
+                break
+            closing += self._retire(min(built, key=lambda k: self._ciphers[k].last_use))
+        return closing
+
+    @staticmethod
+    def _close(entries: List[_RegistryEntry]):
+        for entry in entries:
+            if entry.built:
+                cipher = entry.future.result()
+                logger.debug(f'closing cipher of {cipher.js_url}')
+                cipher.close()
+
+    def evict_idle(self):
+        """Close the ciphers that haven't been leased for ``idle_timeout``."""
+        deadline = time.monotonic() - self.idle_timeout
+        with self._lock:
+            idle = [
+                key for key, entry in self._ciphers.items()
+                if entry.built and not entry.leases and entry.last_use < deadline
+            ]
+            closing = [entry for key in idle for entry in self._retire(key)]
+        self._close(closing)
+
+    def _start_reaper(self):
+        if self._reaper is None or not self._reaper.is_alive():
+            self._reaper = threading.Thread(target=self._reap, name='pytubefix-cipher-reaper', daemon=True)
+            self._reaper.start()
+
+    def _reap(self):
+        while True:
+            time.sleep(max(self.idle_timeout / 2, 1))
+            self.evict_idle()
+            with self._lock:
+                if not self._ciphers:
+                    self._reaper = None
+                    return
+
+    def evict(self, js_url: str):
+        """Close the ciphers of the player ``js_url``, e.g. once they failed to decipher.
+
+        Those still leased are closed once they are returned, the next lease
+        builds a new cipher.
+        """
+        with self._lock:
+            keys = [key for key in self._ciphers if key[0] == js_url]
+            closing = [entry for key in keys for entry in self._retire(key)]
+        self._close(closing)
+
+    def clear(self):
+        """Close every cipher, those still leased once they are returned."""
+        with self._lock:
+            closing = [entry for key in list(self._ciphers) for entry in self._retire(key)]
+        self._close(closing)
+
+
+cipher_registry = CipherRegistry()
+atexit.register(cipher_registry.clear)
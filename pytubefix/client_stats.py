@@ -0,0 +1,168 @@
+"""Persistent statistics of which InnerTube client serves which kind of video.
+
+Every video used to start with the default client and find out the expensive
+way, one player call at a time, that another client was needed. Outcomes of
+the player calls are recorded per video trait and client, and
+:meth:`ClientStats.rank` orders the clients of the next video by their success
+rate for its traits. The traits come from the url (``music``, ``shorts``,
+``live``), the only thing known before the first player call. Counts decay
+with a half-life so the ranking follows YouTube when it changes which client
+works.
+"""
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Set
+
+from pytubefix.helpers import user_cache_dir
+
+logger = logging.getLogger(__name__)
+
+# Order the clients of a video by their past success instead of always
+# starting with the default one.
+use_adaptive_clients = True
+
+_stats_file = os.path.join(user_cache_dir(), 'client_stats.json')
+
+
+def url_traits(url: str) -> Set[str]:
+    """Traits of a video known from its url alone."""
+    traits = {'any'}
+    if 'music.youtube.com' in url:
+        traits.add('music')
+    if '/shorts/' in url:
+        traits.add('shorts')
+    if '/live/' in url:
+        traits.add('live')
+    return traits
+
+
+class ClientStats:
+    """Decaying success and failure counts by ``(trait, client)``, kept in a JSON file.
+
+    Errors of the file system are logged and otherwise ignored, the worst
+    outcome is the default client order.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = _stats_file,
+        half_life: float = 2 * 24 * 60 * 60,
+        prior: float = 2,
+        save_interval: float = 30
+    ):
+        """Construct a :class:`ClientStats <ClientStats>`.
+
+        :param str path:
+            (Optional) JSON file the statistics are kept in, None to keep
+            them in memory only.
+        :param float half_life:
+            Seconds after which a recorded outcome weighs half as much.
+        :param float prior:
+            Weight of the assumed 50% success rate of a client without
+            history, so a single failure doesn't demote a client.
+        :param float save_interval:
+            Minimum seconds between two writes of the file.
+        """
+        self.path = path
+        self.half_life = half_life
+        self.prior = prior
+        self.save_interval = save_interval
+        # trait -> client -> [successes, failures, last update]
+        self._stats: Optional[Dict[str, Dict[str, list]]] = None
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._saved = 0.0
+
+    def _load(self) -> Dict[str, Dict[str, list]]:
+        if self._stats is None:
+            self._stats = {}
+            if self.path:
+                try:
+                    with open(self.path) as f:
+                        self._stats = json.load(f)
+                except (OSError, ValueError):
+                    pass
+        return self._stats
+
+    def _decayed(self, entry: list, now: float) -> List[float]:
+        successes, failures, updated = entry
+        factor = 0.5 ** (max(now - updated, 0) / self.half_life)
+        return [successes * factor, failures * factor]
+
+    def record(self, traits: Iterable[str], client: str, success: bool):
+        """Record that ``client`` did (or didn't) serve a video with ``traits``."""
+        now = time.time()
+        with self._lock:
+            stats = self._load()
+            for trait in traits:
+                entry = stats.setdefault(trait, {}).get(client, [0, 0, now])
+                successes, failures = self._decayed(entry, now)
+                if success:
+                    successes += 1
+                else:
+                    failures += 1
+                stats[trait][client] = [successes, failures, now]
+            self._dirty = True
+            if now - self._saved >= self.save_interval:
+                self._save()
+
+    def score(self, traits: Iterable[str], client: str) -> float:
+        """Estimated probability that ``client`` serves a video with ``traits``."""
+        now = time.time()
+        successes = failures = 0.0
+        with self._lock:
+            stats = self._load()
+            for trait in traits:
+                entry = stats.get(trait, {}).get(client)
+                if entry:
+                    s, f = self._decayed(entry, now)
+                    successes += s
+                    failures += f
+        return (successes + self.prior / 2) / (successes + failures + self.prior)
+
+    def rank(self, traits: Iterable[str], clients: Iterable[str]) -> List[str]:
+        """``clients`` from the most to the least likely to succeed, ties keep their order."""
+        traits = list(traits)
+        clients = list(dict.fromkeys(clients))
+        scores = {client: self.score(traits, client) for client in clients}
+        return sorted(clients, key=lambda client: -scores[client])
+
+    def _save(self):
+        if not self.path or not self._dirty:
+            return
+        temp_path = f'{self.path}.{os.getpid()}.tmp'
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(temp_path, 'w') as f:
+                json.dump(self._stats, f)
+            os.replace(temp_path, self.path)
+            self._dirty = False
+        except OSError as e:
+            logger.debug(f'unable to store the client statistics: {e}')
+        self._saved = time.time()
+
+    def clear(self):
+        """Forget every recorded outcome, in memory and on disk."""
+        with self._lock:
+            self._stats = {}
+            self._dirty = False
+            if self.path:
+                try:
+                    os.remove(self.path)
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    logger.debug(f'unable to remove the client statistics: {e}')
+
+    def flush(self):
+        """Write pending statistics to the file."""
+        with self._lock:
+            self._save()
+
+
+default_stats = ClientStats()
+atexit.register(default_stats.flush)
@@ -8,6 +8,7 @@ from typing import Dict, Iterable, List, Optional, Tuple, Union, Any, Callable
 from pytubefix import extract, request, YouTube
 from pytubefix.innertube import InnerTube
 from pytubefix.helpers import cache, DeferredGeneratorList, install_proxy, uniqueify
+from pytubefix.visitor_data import visitor_data_provider
 
 logger = logging.getLogger(__name__)
 
@@ -185,7 +186,8 @@ class Playlist(Sequence):
         while continuation:  # there is an url found
             # requesting the next page of videos with the url generated from the
             # previous page, needs to be a post
-            req = InnerTube('WEB').browse(continuation=continuation, visitor_data=self._visitor_data)
+            visitor_data = self._visitor_data or visitor_data_provider.cached()
+            req = InnerTube('WEB').browse(continuation=continuation, visitor_data=visitor_data)
             # extract up to 100 songs from the page loaded
             # returns another continuation if more videos are available
             videos_urls, continuation = self._extract_videos(req, context)
@@ -236,6 +238,7 @@ class Playlist(Sequence):
 
             self._visitor_data = initial_data["responseContext"]["webResponseContextExtensionData"][
                 "ytConfigData"]["visitorData"]
+            visitor_data_provider.offer(self._visitor_data)
         except (KeyError, IndexError, TypeError):
             try:
                 # this is the json tree structure, if the json was directly sent
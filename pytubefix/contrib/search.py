@@ -8,6 +8,7 @@ from pytubefix import YouTube, Channel, Playlist
 from pytubefix.helpers import deprecated, install_proxy
 from pytubefix.innertube import InnerTube
 from pytubefix.protobuf import encode_protobuf
+from pytubefix.visitor_data import visitor_data_provider
 
 logger = logging.getLogger(__name__)
 
@@ -384,6 +385,11 @@ class Search:
         :returns:
             The raw json object returned by the innertube API.
         """
+        if not self.use_po_token:
+            try:
+                self._innertube_client.insert_visitor_data(visitor_data_provider.get())
+            except Exception as e:
+                logger.debug(f"Searching without visitorData, reason: {e}")
         query_results = self._innertube_client.search(self.query, continuation=continuation, data=filters)
         if not self._initial_results:
             self._initial_results = query_results
@@ -0,0 +1,150 @@
+"""Sidecar journal used to resume interrupted downloads.
+
+The journal is a small JSON file stored next to the output file. For ranged
+streams it records the byte ranges already written, for OTF streams it records
+how many sequential segments have been written and where the next one starts.
+"""
+import json
+import logging
+import os
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+journal_suffix = '.pytubefix.json'
+
+
+class DownloadJournal:
+    """Progress record of a single (possibly partial) download."""
+
+    def __init__(self, file_path: str, itag: int, file_size: int):
+        """Construct a :class:`DownloadJournal <DownloadJournal>`.
+
+        :param str file_path:
+            Path of the file being downloaded.
+        :param int itag:
+            Itag of the stream, used to make sure a resumed download
+            continues the same format.
+        :param int file_size:
+            Total size of the stream in bytes, 0 for an OTF stream whose
+            exact size isn't known yet.
+        """
+        self.file_path = file_path
+        self.path = file_path + journal_suffix
+        self.itag = itag
+        self.file_size = file_size
+
+        # Sorted, non-overlapping ``[start, end)`` byte ranges already on disk.
+        self.ranges: List[List[int]] = []
+
+        # OTF streams: number of the next segment to fetch and its byte offset.
+        self.next_segment = 0
+        self.segment_count: Optional[int] = None
+        self.segment_offset = 0
+
+    @classmethod
+    def load(cls, file_path: str, itag: int, file_size: int) -> "DownloadJournal":
+        """Load the journal of ``file_path``, or start a new one.
+
+        A journal left by a different stream, or one that no longer matches
+        the partial file on disk, is ignored.
+        """
+        journal = cls(file_path, itag, file_size)
+        if not (os.path.isfile(journal.path) and os.path.isfile(file_path)):
+            return journal
+
+        try:
+            with open(journal.path) as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.debug(f'ignoring unreadable journal {journal.path}: {e}')
+            return journal
+
+        recorded_size = data.get('file_size')
+        # The exact size of an OTF stream may only be known on one of the runs.
+        if data.get('itag') != itag or (recorded_size != file_size and recorded_size and file_size):
+            logger.debug(f'journal {journal.path} belongs to another stream, ignoring it')
+            return journal
+        journal.file_size = file_size or recorded_size
+
+        on_disk = os.path.getsize(file_path)
+        if data.get('ranges') and on_disk != file_size:
+            # Ranged downloads preallocate the whole file.
+            return journal
+        if on_disk < data.get('segment_offset', 0):
+            return journal
+
+        journal.ranges = data.get('ranges', [])
+        journal.next_segment = data.get('next_segment', 0)
+        journal.segment_count = data.get('segment_count')
+        journal.segment_offset = data.get('segment_offset', 0)
+        return journal
+
+    @property
+    def is_empty(self) -> bool:
+        """Whether nothing has been recorded yet."""
+        return not self.ranges and self.next_segment == 0
+
+    @property
+    def completed_bytes(self) -> int:
+        """Number of bytes already written to the file."""
+        if self.next_segment:
+            return self.segment_offset
+        return sum(end - start for start, end in self.ranges)
+
+    def add_range(self, start: int, end: int):
+        """Record that the bytes ``[start, end)`` have been written."""
+        merged = []
+        for r_start, r_end in sorted(self.ranges + [[start, end]]):
+            if merged and r_start <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], r_end)
+            else:
+                merged.append([r_start, r_end])
+        self.ranges = merged
+
+    def add_segment(self, seq_num: int, segment_count: int, offset: int):
+        """Record that OTF segment ``seq_num`` has been written up to ``offset``."""
+        self.next_segment = seq_num + 1
+        self.segment_count = segment_count
+        self.segment_offset = offset
+
+    def missing_ranges(self, range_size: int) -> List[Tuple[int, int]]:
+        """Byte ranges still to be fetched, split in ``range_size`` pieces.
+
+        :rtype: List[Tuple[int, int]]
+        :returns: ``(start, stop)`` pairs, ``stop`` inclusive.
+        """
+        gaps = []
+        position = 0
+        for start, end in self.ranges + [[self.file_size, self.file_size]]:
+            if start > position:
+                gaps.append((position, start))
+            position = max(position, end)
+
+        missing = []
+        for start, end in gaps:
+            for offset in range(start, end, range_size):
+                missing.append((offset, min(offset + range_size, end) - 1))
+        return missing
+
+    def save(self):
+        """Atomically write the journal next to the output file."""
+        data = {
+            'itag': self.itag,
+            'file_size': self.file_size,
+            'ranges': self.ranges,
+            'next_segment': self.next_segment,
+            'segment_count': self.segment_count,
+            'segment_offset': self.segment_offset,
+        }
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump(data, f)
+        os.replace(temp_path, self.path)
+
+    def remove(self):
+        """Delete the journal once the download is complete."""
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
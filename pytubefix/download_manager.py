@@ -0,0 +1,294 @@
+"""Process-wide scheduler for :class:`Stream <Stream>` downloads.
+
+Starting one thread per download leaves nothing to coordinate them, and a
+burst of jobs opens as many sockets as there are jobs (times ``connections``).
+A :class:`DownloadManager` runs the jobs from a bounded priority queue on a
+fixed set of workers, and a job only starts once the connections it needs fit
+in both the global budget and the limit of the host it downloads from.
+"""
+import heapq
+import itertools
+import logging
+import threading
+from concurrent.futures import CancelledError, Future
+from queue import Full
+from typing import Any, Callable, Dict, Optional
+from urllib import parse
+
+logger = logging.getLogger(__name__)
+
+
+class DownloadJob(Future):
+    """Future of a single job submitted to a :class:`DownloadManager`.
+
+    The result is whatever the job returned: the file path for
+    :meth:`DownloadManager.submit`, ``None`` for
+    :meth:`DownloadManager.submit_chunks`.
+    """
+
+    def __init__(self, stream, priority: int):
+        super().__init__()
+        self.stream = stream
+        self.priority = priority
+        self._cancel_event = threading.Event()
+
+    def cancel(self) -> bool:
+        """Cancel the job.
+
+        A queued job is dropped. A running job is stopped at the next chunk,
+        and then finishes with :class:`CancelledError`.
+
+        :rtype: bool
+        :returns: False if the job was already done.
+        """
+        if self.done():
+            return False
+        self._cancel_event.set()
+        return super().cancel() or True
+
+    @property
+    def cancel_requested(self) -> bool:
+        """Whether :meth:`cancel` was called."""
+        return self._cancel_event.is_set()
+
+
+class _ConnectionBudget:
+    """Counts the connections in use, globally and per host."""
+
+    def __init__(self, max_connections: int, per_host_limit: int):
+        self.max_connections = max_connections
+        self.per_host_limit = per_host_limit
+        self.in_use = 0
+        self.per_host: Dict[str, int] = {}
+        self._condition = threading.Condition()
+
+    def clamp(self, connections: int) -> int:
+        """Largest number of connections a single job can get."""
+        return max(1, min(connections, self.max_connections, self.per_host_limit))
+
+    def _fits(self, host: str, connections: int) -> bool:
+        return (
+            self.in_use + connections <= self.max_connections
+            and self.per_host.get(host, 0) + connections <= self.per_host_limit
+        )
+
+    def acquire(self, host: str, connections: int):
+        with self._condition:
+            self._condition.wait_for(lambda: self._fits(host, connections))
+            self.in_use += connections
+            self.per_host[host] = self.per_host.get(host, 0) + connections
+
+    def release(self, host: str, connections: int):
+        with self._condition:
+            self.in_use -= connections
+            self.per_host[host] -= connections
+            if not self.per_host[host]:
+                del self.per_host[host]
+            self._condition.notify_all()
+
+
+class DownloadManager:
+    """Runs stream downloads under a shared concurrency budget.
+
+    Example::
+
+        manager = DownloadManager(max_workers=4, max_connections=8)
+        job = manager.submit(yt.streams.get_highest_resolution(), output_path='videos')
+        print(job.result())
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 4,
+        max_connections: int = 8,
+        per_host_limit: int = 4,
+        max_queued: int = 0
+    ):
+        """Construct a :class:`DownloadManager <DownloadManager>`.
+
+        :param int max_workers:
+            Number of jobs running at the same time.
+        :param int max_connections:
+            Number of connections all running jobs may use together. A job
+            downloading with ``connections=n`` takes ``n`` of them.
+        :param int per_host_limit:
+            Number of connections all running jobs may use to the same host.
+        :param int max_queued:
+            Maximum number of jobs waiting to start, 0 for no limit. Once it
+            is reached :meth:`submit` blocks (or raises :class:`queue.Full`).
+        """
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self._budget = _ConnectionBudget(max_connections, per_host_limit)
+        self._queue = []
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        self._workers = []
+        self._shutdown = False
+
+    def submit(
+        self,
+        stream,
+        priority: int = 0,
+        callback: Optional[Callable[[DownloadJob], Any]] = None,
+        block: bool = True,
+        timeout: Optional[float] = None,
+        **download_kwargs
+    ) -> DownloadJob:
+        """Queue ``stream.download(**download_kwargs)``.
+
+        :param Stream stream:
+            The stream to download.
+        :param int priority:
+            Jobs with a higher priority start first, jobs of the same
+            priority start in submission order.
+        :param callback:
+            (Optional) Called with the job once it is done, cancelled or failed.
+        :param bool block:
+            Wait for room in the queue when it is full, instead of raising
+            :class:`queue.Full`.
+        :param float timeout:
+            (Optional) Maximum time to wait for room in the queue.
+        :rtype: DownloadJob
+        """
+        user_checker = download_kwargs.pop('interrupt_checker', None)
+        connections = self._budget.clamp(download_kwargs.get('connections', 1))
+        if 'connections' in download_kwargs:
+            download_kwargs['connections'] = connections
+
+        def run(job: DownloadJob):
+            def interrupt_checker():
+                return job.cancel_requested or (user_checker is not None and user_checker())
+
+            file_path = stream.download(interrupt_checker=interrupt_checker, **download_kwargs)
+            if job.cancel_requested:
+                raise CancelledError()
+            return file_path
+
+        return self._enqueue(stream, run, connections, priority, callback, block, timeout)
+
+    def submit_chunks(
+        self,
+        stream,
+        write: Callable[[bytes], Any],
+        priority: int = 0,
+        callback: Optional[Callable[[DownloadJob], Any]] = None,
+        block: bool = True,
+        timeout: Optional[float] = None,
+        chunk_size: Optional[int] = None,
+        connections: int = 1,
+        rate_limit=None
+    ) -> DownloadJob:
+        """Queue a job passing every chunk of ``stream.iter_chunks()`` to ``write``.
+
+        See :meth:`submit` for the scheduling parameters.
+
+        :param callable write:
+            Called with every chunk, in order.
+        :rtype: DownloadJob
+        """
+        connections = self._budget.clamp(connections)
+
+        def run(job: DownloadJob):
+            chunks = stream.iter_chunks(chunk_size, connections=connections, rate_limit=rate_limit)
+            try:
+                for chunk in chunks:
+                    if job.cancel_requested:
+                        raise CancelledError()
+                    write(chunk)
+            finally:
+                chunks.close()
+
+        return self._enqueue(stream, run, connections, priority, callback, block, timeout)
+
+    def _enqueue(self, stream, run, connections, priority, callback, block, timeout) -> DownloadJob:
+        job = DownloadJob(stream, priority)
+        if callback is not None:
+            job.add_done_callback(callback)
+
+        with self._condition:
+            if self._shutdown:
+                raise RuntimeError('cannot submit jobs after shutdown')
+            if self.max_queued:
+                if not block and len(self._queue) >= self.max_queued:
+                    raise Full
+                if not self._condition.wait_for(
+                    lambda: len(self._queue) < self.max_queued or self._shutdown, timeout
+                ):
+                    raise Full
+                if self._shutdown:
+                    raise RuntimeError('cannot submit jobs after shutdown')
+            heapq.heappush(self._queue, (-priority, next(self._counter), job, run, connections))
+            self._condition.notify_all()
+            self._start_worker()
+        return job
+
+    def _start_worker(self):
+        """Start another worker, up to ``max_workers``."""
+        self._workers = [worker for worker in self._workers if worker.is_alive()]
+        if len(self._workers) < self.max_workers:
+            worker = threading.Thread(target=self._work, name='pytubefix-download', daemon=True)
+            self._workers.append(worker)
+            worker.start()
+
+    def _next(self):
+        with self._condition:
+            self._condition.wait_for(lambda: self._queue or self._shutdown)
+            if not self._queue:
+                return None
+            entry = heapq.heappop(self._queue)
+            self._condition.notify_all()
+            return entry
+
+    def _work(self):
+        while True:
+            entry = self._next()
+            if entry is None:
+                return
+            _, _, job, run, connections = entry
+            if not job.set_running_or_notify_cancel():
+                continue
+
+            host = parse.urlsplit(job.stream.url).hostname or ''
+            self._budget.acquire(host, connections)
+            try:
+                result = run(job)
+            except BaseException as e:
+                logger.debug(f'download of itag {job.stream.itag} failed: {e!r}')
+                job.set_exception(e)
+            else:
+                job.set_result(result)
+            finally:
+                self._budget.release(host, connections)
+
+    @property
+    def pending(self) -> int:
+        """Number of jobs waiting to start."""
+        with self._condition:
+            return len(self._queue)
+
+    def shutdown(self, wait: bool = True, cancel_pending: bool = False):
+        """Stop accepting jobs and let the workers exit once the queue is empty.
+
+        :param bool wait:
+            Block until the running (and queued) jobs are done.
+        :param bool cancel_pending:
+            Cancel the jobs that haven't started yet.
+        """
+        with self._condition:
+            self._shutdown = True
+            if cancel_pending:
+                for _, _, job, _, _ in self._queue:
+                    job.cancel()
+                self._queue = []
+            self._condition.notify_all()
+            workers = list(self._workers)
+        if wait:
+            for worker in workers:
+                worker.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.shutdown()
@@ -7,7 +7,7 @@ from datetime import datetime
 from typing import Any, Dict, List, Optional, Tuple
 from urllib.parse import parse_qs, quote, urlencode, urlparse
 
-from pytubefix.cipher import Cipher
+from pytubefix.cipher import cipher_registry
 from pytubefix.exceptions import HTMLParseError, LiveStreamError, RegexMatchError
 from pytubefix.helpers import regex_search
 from pytubefix.metadata import YouTubeMetadata
@@ -457,9 +457,10 @@ def apply_signature(stream_manifest: Dict, vid_info: Dict, js: str, url_js: str)
         Full base.js url
 
     """
-    cipher = Cipher(js=js, js_url=url_js)
-    discovered_n = dict()
-    for i, stream in enumerate(stream_manifest):
+    # Parse every stream first, so all the `s` and `n` values can be sent
+    # to the cipher together instead of one round trip per stream.
+    parsed_streams = []
+    for stream in stream_manifest:
         try:
             url: str = stream["url"]
         except KeyError:
@@ -486,29 +487,34 @@ def apply_signature(stream_manifest: Dict, vid_info: Dict, js: str, url_js: str)
             # which case there's no real magic to download them and we can skip
             # the whole signature descrambling entirely.
             logger.debug("signature found, skip decipher")
-
+            ciphered_signature = None
         else:
-            signature = cipher.get_sig(ciphered_signature=stream["s"])
+            ciphered_signature = stream["s"]
+
+        parsed_streams.append((parsed_url, query_params, ciphered_signature))
+
+    with cipher_registry.lease(js=js, js_url=url_js) as cipher:
+        signatures = cipher.get_sig_batch(
+            [sig for _, _, sig in parsed_streams if sig is not None]
+        )
+
+        # For WEB-based clients, YouTube sends an "n" parameter that throttles download speed.
+        # To decipher the value of "n", we must interpret the player's JavaScript.
+        # Streams usually share a handful of distinct values, each is only deciphered once.
+        discovered_n = cipher.get_nsig_batch(
+            [query_params['n'] for _, query_params, _ in parsed_streams if 'n' in query_params]
+        )
 
+    for i, (parsed_url, query_params, ciphered_signature) in enumerate(parsed_streams):
+        if ciphered_signature is not None:
+            query_params['sig'] = signatures[ciphered_signature]
             logger.debug(
-                "finished descrambling signature for itag=%s", stream["itag"]
+                "finished descrambling signature for itag=%s", stream_manifest[i]["itag"]
             )
 
-            query_params['sig'] = signature
-
         if 'n' in query_params.keys():
-            # For WEB-based clients, YouTube sends an "n" parameter that throttles download speed.
-            # To decipher the value of "n", we must interpret the player's JavaScript.
-
             initial_n = query_params['n']
             logger.debug(f'Parameter n is: {initial_n}')
-
-            # Check if any previous stream decrypted the parameter
-            if initial_n not in discovered_n:
-                discovered_n[initial_n] = cipher.get_nsig(initial_n)
-            else:
-                logger.debug('Parameter n found skipping decryption')
-
             new_n = discovered_n[initial_n]
             query_params['n'] = new_n
             logger.debug(f'Parameter n deciphered: {new_n}')
@@ -517,9 +523,6 @@ def apply_signature(stream_manifest: Dict, vid_info: Dict, js: str, url_js: str)
 
         stream_manifest[i]["url"] = url
 
-    cipher.runner_sig.close()
-    cipher.runner_nsig.close()
-
 
 def apply_descrambler(stream_data: Dict) -> Optional[List[Dict]]:
     """Apply various in-place transforms to YouTube's media stream data.
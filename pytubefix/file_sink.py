@@ -0,0 +1,139 @@
+"""File target for downloads that supports out of order writes.
+
+A :class:`FileSink` can be used wherever a binary file handle is expected
+(``write``, ``seek``, ``tell``, ...), and adds what parallel and resumed
+downloads need on top of it: preallocation of the final size and positional
+writes that don't move a shared file position.
+"""
+import logging
+import mmap
+import os
+import threading
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class FileSink:
+    """Download sink backed by a file on disk."""
+
+    def __init__(self, path: str, resume: bool = False, use_mmap: bool = False):
+        """Construct a :class:`FileSink <FileSink>`.
+
+        :param str path:
+            Path of the output file.
+        :param bool resume:
+            Keep the current content of an existing file instead of
+            truncating it.
+        :param bool use_mmap:
+            Write through a memory map of the file once it has been
+            preallocated, instead of ``pwrite`` calls.
+        """
+        self.path = path
+        self.use_mmap = use_mmap
+        mode = "r+b" if resume and os.path.isfile(path) else "w+b"
+        self._file = open(path, mode, buffering=0)
+        self._fd = self._file.fileno()
+        self._lock = threading.Lock()
+        self._mmap: Optional[mmap.mmap] = None
+        self._position = 0
+        if use_mmap and os.path.getsize(path):
+            self._map()
+
+    def _map(self):
+        self._mmap = mmap.mmap(self._fd, 0)
+
+    def _unmap(self):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    def preallocate(self, size: int):
+        """Reserve ``size`` bytes on disk for the file.
+
+        ``posix_fallocate`` is used where available so the blocks are
+        allocated up front (and contiguously on most file systems); otherwise
+        the file is simply extended.
+        """
+        self._unmap()
+        try:
+            if hasattr(os, 'posix_fallocate') and size:
+                os.posix_fallocate(self._fd, 0, size)
+            if os.fstat(self._fd).st_size != size:
+                os.ftruncate(self._fd, size)
+        except OSError as e:
+            # Not every file system supports fallocate.
+            logger.debug(f'posix_fallocate failed ({e}), extending the file instead')
+            os.ftruncate(self._fd, size)
+        if self.use_mmap and size:
+            self._map()
+
+    def write_at(self, offset: int, data) -> int:
+        """Write ``data`` at ``offset`` without touching the current position.
+
+        Safe to call from several threads at once.
+
+        :rtype: int
+        :returns: Number of bytes written.
+        """
+        view = memoryview(data)
+        size = len(view)
+        if self._mmap is not None and offset + size <= len(self._mmap):
+            self._mmap[offset:offset + size] = view
+        elif hasattr(os, 'pwrite'):
+            while view:
+                written = os.pwrite(self._fd, view, offset)
+                view = view[written:]
+                offset += written
+        else:
+            with self._lock:
+                self._file.seek(offset)
+                self._file.write(view)
+        return size
+
+    def write(self, data) -> int:
+        """Write ``data`` at the current position, like a file handle."""
+        size = self.write_at(self._position, data)
+        self._position += size
+        return size
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        if whence == os.SEEK_CUR:
+            offset += self._position
+        elif whence == os.SEEK_END:
+            offset += os.fstat(self._fd).st_size
+        self._position = offset
+        return self._position
+
+    def tell(self) -> int:
+        return self._position
+
+    def truncate(self, size: Optional[int] = None) -> int:
+        size = self._position if size is None else size
+        remap = self._mmap is not None
+        self._unmap()
+        os.ftruncate(self._fd, size)
+        if remap and size:
+            self._map()
+        return size
+
+    def flush(self):
+        if self._mmap is not None:
+            self._mmap.flush()
+
+    def fileno(self) -> int:
+        return self._fd
+
+    def close(self):
+        self._unmap()
+        self._file.close()
+
+    @property
+    def closed(self) -> bool:
+        return self._file.closed
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -5,6 +5,7 @@ import json
 import logging
 import os
 import re
+import sys
 import warnings
 import shutil
 from typing import Any, Callable, Dict, List, Optional, TypeVar
@@ -257,11 +258,42 @@ def target_directory(output_path: Optional[str] = None) -> str:
     return output_path
 
 
+def user_cache_dir() -> str:
+    """
+    Per-user directory of the caches kept between runs (players, deciphered
+    signatures, ...). The installed package itself is often not writable.
+
+    ``PYTUBEFIX_CACHE_DIR`` takes precedence, then the private files directory
+    of an Android app, ``%LOCALAPPDATA%`` on Windows, ``~/Library/Caches`` on
+    macOS and ``$XDG_CACHE_HOME`` (``~/.cache``) elsewhere.
+
+    :rtype: str
+    :returns:
+        The directory path, which may not exist yet.
+    """
+    if os.environ.get('PYTUBEFIX_CACHE_DIR'):
+        return os.environ['PYTUBEFIX_CACHE_DIR']
+    if os.environ.get('ANDROID_PRIVATE'):
+        base = os.path.join(os.environ['ANDROID_PRIVATE'], 'cache')
+    elif os.name == 'nt':
+        base = os.environ.get('LOCALAPPDATA') or os.path.expanduser('~')
+    elif sys.platform == 'darwin':
+        base = os.path.expanduser('~/Library/Caches')
+    else:
+        base = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache')
+    return os.path.join(base, 'pytubefix')
+
+
 def install_proxy(proxy_handler: Dict[str, str]) -> None:
     proxy_support = request.ProxyHandler(proxy_handler)
     opener = request.build_opener(proxy_support)
     request.install_opener(opener)
 
+    # The keep-alive pool connects directly, so proxied requests
+    # have to go through the installed opener instead.
+    from pytubefix import request as pytubefix_request
+    pytubefix_request.configure_pool(enabled=False)
+
 
 def uniqueify(duped_list: List) -> List:
     """Remove duplicate items from a list, while maintaining list order.
@@ -376,4 +408,22 @@ def reset_cache(verbose: bool = False):
         shutil.rmtree(cache_dir)
         logger.debug(f"Cache directory '{cache_dir}' has been reset.")
     else:
-        logger.debug(f"Cache directory '{cache_dir}' does not exist.")
\ No newline at end of file
+        logger.debug(f"Cache directory '{cache_dir}' does not exist.")
+
+
+def clear_user_cache():
+    """Delete what pytubefix keeps in :func:`user_cache_dir`.
+
+    The stored players, deciphered signatures, poTokens and client statistics
+    are cleared, in memory and on disk. Only these entries are removed, the
+    directory itself may belong to the user (``PYTUBEFIX_CACHE_DIR``).
+    """
+    from pytubefix import client_stats, player_store
+    from pytubefix.botGuard import bot_guard
+    from pytubefix.sig_cache import signature_cache
+
+    player_store.default_store.clear()
+    signature_cache.clear()
+    bot_guard.po_token_service.clear()
+    client_stats.default_stats.clear()
+    logger.debug(f"Cache directory '{user_cache_dir()}' has been cleared.")
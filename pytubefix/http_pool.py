@@ -0,0 +1,236 @@
+"""Keep-alive HTTP connection pool shared by :mod:`pytubefix.request`.
+
+``urllib.request.urlopen`` opens a new TCP (and TLS) connection for every
+call. A download made of hundreds of ranges or OTF segments therefore pays
+hundreds of handshakes. This module keeps finished connections open per host
+and hands them out again to the next request for the same host.
+"""
+import http.client
+import io
+import logging
+import socket
+import threading
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+from urllib import parse
+from urllib.error import HTTPError, URLError
+
+logger = logging.getLogger(__name__)
+
+_redirect_codes = (301, 302, 303, 307, 308)
+_max_redirects = 10
+
+_retried_methods = ('GET', 'HEAD')
+
+# Errors raised when a kept-alive connection was closed by the server while
+# sitting in the pool. Idempotent requests are then retried on a new
+# connection, the body of a POST may already have been acted on.
+_stale_connection_errors = (
+    http.client.RemoteDisconnected,
+    http.client.BadStatusLine,
+    BrokenPipeError,
+    ConnectionResetError,
+)
+
+
+class PooledResponse:
+    """Response that returns its connection to the pool once fully read.
+
+    It behaves like the object returned by ``urlopen``: ``read``,
+    ``readinto``, ``info`` and ``getcode`` are available, everything else
+    is forwarded to the underlying :class:`http.client.HTTPResponse`.
+    """
+
+    def __init__(self, pool, key, conn, response, url):
+        self._pool = pool
+        self._key = key
+        self._conn = conn
+        self._response = response
+        self._released = False
+        self.url = url
+
+    def _release(self):
+        if not self._released and self._response.isclosed():
+            self._released = True
+            self._pool._put(self._key, self._conn)
+
+    def _discard(self):
+        if not self._released:
+            self._released = True
+            self._conn.close()
+
+    def read(self, amt=None):
+        try:
+            data = self._response.read(amt)
+        except Exception:
+            self._discard()
+            raise
+        self._release()
+        return data
+
+    def readinto(self, b):
+        try:
+            n = self._response.readinto(b)
+        except Exception:
+            self._discard()
+            raise
+        self._release()
+        return n
+
+    def info(self):
+        return self._response.headers
+
+    def geturl(self):
+        return self.url
+
+    def getcode(self):
+        return self._response.status
+
+    def close(self):
+        """Close the response.
+
+        A connection whose body was not read to the end can't be reused,
+        so it is closed instead of being returned to the pool.
+        """
+        if self._response.isclosed():
+            self._release()
+        else:
+            self._response.close()
+            self._discard()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __getattr__(self, name):
+        return getattr(self._response, name)
+
+
+class HTTPConnectionPool:
+    """Thread-safe pool of keep-alive connections, keyed by host."""
+
+    def __init__(self, maxsize: int = 10):
+        """Construct a :class:`HTTPConnectionPool <HTTPConnectionPool>`.
+
+        :param int maxsize:
+            Maximum number of idle connections kept open per host.
+        """
+        self.maxsize = maxsize
+        self._idle: Dict[Tuple[str, str, int], List[http.client.HTTPConnection]] = defaultdict(list)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(split_url) -> Tuple[str, str, int]:
+        scheme = split_url.scheme.lower()
+        port = split_url.port or (443 if scheme == 'https' else 80)
+        return scheme, split_url.hostname, port
+
+    def _get(self, key, timeout) -> Tuple[http.client.HTTPConnection, bool]:
+        """Check out an idle connection for ``key``, or create a new one.
+
+        :returns: The connection and whether it was reused from the pool.
+        """
+        with self._lock:
+            idle = self._idle.get(key)
+            conn = idle.pop() if idle else None
+
+        if conn is not None:
+            conn.timeout = timeout
+            if conn.sock is not None:
+                conn.sock.settimeout(
+                    socket.getdefaulttimeout() if timeout is socket._GLOBAL_DEFAULT_TIMEOUT else timeout
+                )
+            return conn, True
+
+        scheme, host, port = key
+        if scheme == 'https':
+            return http.client.HTTPSConnection(host, port, timeout=timeout), False
+        return http.client.HTTPConnection(host, port, timeout=timeout), False
+
+    def _put(self, key, conn):
+        with self._lock:
+            idle = self._idle[key]
+            if len(idle) < self.maxsize:
+                idle.append(conn)
+                return
+        conn.close()
+
+    def clear(self):
+        """Close every idle connection."""
+        with self._lock:
+            idle, self._idle = self._idle, defaultdict(list)
+        for connections in idle.values():
+            for conn in connections:
+                conn.close()
+
+    def _send(self, key, path, method, headers, data, timeout):
+        """Send a single request, retrying a GET or HEAD if a reused connection was stale."""
+        while True:
+            conn, reused = self._get(key, timeout)
+            try:
+                conn.request(method, path, body=data, headers=headers)
+                return conn, conn.getresponse()
+            except _stale_connection_errors as e:
+                conn.close()
+                if not reused or method not in _retried_methods:
+                    raise URLError(e)
+                logger.debug('pooled connection to %s was closed, reconnecting', key[1])
+            except (OSError, http.client.HTTPException) as e:
+                conn.close()
+                raise URLError(e)
+
+    def urlopen(
+        self,
+        url: str,
+        method: Optional[str] = None,
+        headers: Optional[Dict[str, str]] = None,
+        data: Optional[bytes] = None,
+        timeout=socket._GLOBAL_DEFAULT_TIMEOUT
+    ) -> PooledResponse:
+        """Perform a request over a pooled connection.
+
+        Mirrors ``urlopen``: redirects are followed, responses with an error
+        status raise :class:`HTTPError` and network failures raise
+        :class:`URLError`.
+
+        :param str url: The URL to request.
+        :param str method: HTTP method, defaults to GET (or POST with data).
+        :param dict headers: Request headers.
+        :param bytes data: Request body.
+        :rtype: PooledResponse
+        """
+        method = method or ('POST' if data is not None else 'GET')
+        headers = dict(headers or {})
+
+        for _ in range(_max_redirects + 1):
+            split_url = parse.urlsplit(url)
+            key = self._key(split_url)
+            path = parse.urlunsplit(('', '', split_url.path or '/', split_url.query, ''))
+
+            conn, response = self._send(key, path, method, headers, data, timeout)
+            pooled = PooledResponse(self, key, conn, response, url)
+
+            if method == 'HEAD' or response.length == 0:
+                # There is no body to wait for, release the connection now.
+                pooled.read()
+
+            if response.status in _redirect_codes and response.getheader('Location'):
+                pooled.read()
+                url = parse.urljoin(url, response.getheader('Location'))
+                if response.status not in (307, 308) and method == 'POST':
+                    method, data = 'GET', None
+                    headers.pop('Content-Type', None)
+                continue
+
+            if response.status >= 400:
+                body = pooled.read()
+                raise HTTPError(url, response.status, response.reason, response.headers, io.BytesIO(body))
+
+            return pooled
+
+        raise HTTPError(url, response.status, 'Too many redirects', response.headers, None)
+
+
+default_pool = HTTPConnectionPool()
@@ -5,6 +5,7 @@ interfaces returns raw results. These should instead be parsed to extract
 the useful information for the end user.
 """
 # Native python imports
+import copy
 import json
 import os
 import pathlib
@@ -572,7 +573,9 @@ class InnerTube:
             (if passed, else default verifier will be used)
         """
         self.client_name = client
-        self.innertube_context = _default_clients[client]['innertube_context']
+        # Copied, the visitorData, poToken and signature timestamp inserted
+        # into it belong to this request only.
+        self.innertube_context = copy.deepcopy(_default_clients[client]['innertube_context'])
         self.header = _default_clients[client]['header']
         self.api_key = _default_clients[client]['api_key']
         self.require_js_player = _default_clients[client]['require_js_player']
@@ -876,6 +879,20 @@ class InnerTube:
         self.base_data.update({'videoId': video_id, 'contentCheckOk': "true"})
         return self._call_api(endpoint, query, self.base_data)
 
+    def visitor_id(self):
+        """Make a request to the visitor_id endpoint.
+
+        The lightest way to be issued a visitorData, no video is needed.
+
+        :rtype: dict
+        :returns:
+            Raw visitor_id results, the visitorData is in ``responseContext``.
+        """
+        endpoint = f'{self.base_url}/visitor_id'
+        query = self.base_params
+
+        return self._call_api(endpoint, query, self.base_data)
+
     def search(self, search_query, continuation=None, data=None):
         """Make a request to the search endpoint.
 
@@ -12,6 +12,8 @@ import json
 import math
 import operator
 import re
+import sys
+import threading
 import datetime
 import email.utils
 import calendar
@@ -19,16 +21,27 @@ from functools import update_wrapper
 from contextlib import suppress as compat_contextlib_suppress
 
 
+_JS_STRING_QUOTES = '\'"`'
+_JS_STRING_RE = '|'.join(rf'{q}(?:\\.|[^\\{q}])*{q}' for q in _JS_STRING_QUOTES)
+_JS_COMMENT_RE = r'/\*(?:(?!\*/).)*?\*/|//[^\n]*\n'
+_JS_SKIP_RE = fr'\s*(?:{_JS_COMMENT_RE})?\s*'
+_JS_INTEGER_TABLE = (
+    (re.compile(fr'(?s)^(0[xX][0-9a-fA-F]+){_JS_SKIP_RE}:?$'), 16),
+    (re.compile(fr'(?s)^(0+[0-7]+){_JS_SKIP_RE}:?$'), 8),
+)
+_JS_TOKEN_RE = re.compile(rf'''(?sx)
+        {_JS_STRING_RE}|
+        {_JS_COMMENT_RE}|,(?={_JS_SKIP_RE}[\]}}])|
+        void\s0|(?:(?<![0-9])[eE]|[a-df-zA-DF-Z_$])[.a-zA-Z_$0-9]*|
+        \b(?:0[xX][0-9a-fA-F]+|0+[0-7]+)(?:{_JS_SKIP_RE}:)?|
+        [0-9]+(?={_JS_SKIP_RE}:)|
+        !+
+        ''')
+
+
 def js_to_json(code, vars={}, *, strict=False):
     # vars is a dict of var, val pairs to substitute
-    STRING_QUOTES = '\'"`'
-    STRING_RE = '|'.join(rf'{q}(?:\\.|[^\\{q}])*{q}' for q in STRING_QUOTES)
-    COMMENT_RE = r'/\*(?:(?!\*/).)*?\*/|//[^\n]*\n'
-    SKIP_RE = fr'\s*(?:{COMMENT_RE})?\s*'
-    INTEGER_TABLE = (
-        (fr'(?s)^(0[xX][0-9a-fA-F]+){SKIP_RE}:?$', 16),
-        (fr'(?s)^(0+[0-7]+){SKIP_RE}:?$', 8),
-    )
+    STRING_QUOTES = _JS_STRING_QUOTES
 
     def process_escape(match):
         JSON_PASSTHROUGH_ESCAPES = R'"\bfnrtu'
@@ -60,8 +73,8 @@ def js_to_json(code, vars={}, *, strict=False):
             r = f'"{escaped}"'
             return r
 
-        for regex, base in INTEGER_TABLE:
-            im = re.match(regex, v)
+        for regex, base in _JS_INTEGER_TABLE:
+            im = regex.match(v)
             if im:
                 i = int(im.group(1), base)
                 return f'"{i}":' if v.endswith(':') else str(i)
@@ -91,22 +104,7 @@ def js_to_json(code, vars={}, *, strict=False):
         code = re.sub(r'parseInt\([^\d]+(\d+)[^\d]+\)', r'\1', code)
         code = re.sub(r'\(function\([^)]*\)\s*\{[^}]*\}\s*\)\s*\(\s*(["\'][^)]*["\'])\s*\)', r'\1', code)
 
-    r = rf'''(?sx)
-        {STRING_RE}|
-        {COMMENT_RE}|,(?={SKIP_RE}[\]}}])|
-        void\s0|(?:(?<![0-9])[eE]|[a-df-zA-DF-Z_$])[.a-zA-Z_$0-9]*|
-        \b(?:0[xX][0-9a-fA-F]+|0+[0-7]+)(?:{SKIP_RE}:)?|
-        [0-9]+(?={SKIP_RE}:)|
-        !+
-        '''
-    return re.sub(rf'''(?sx)
-        {STRING_RE}|
-        {COMMENT_RE}|,(?={SKIP_RE}[\]}}])|
-        void\s0|(?:(?<![0-9])[eE]|[a-df-zA-DF-Z_$])[.a-zA-Z_$0-9]*|
-        \b(?:0[xX][0-9a-fA-F]+|0+[0-7]+)(?:{SKIP_RE}:)?|
-        [0-9]+(?={SKIP_RE}:)|
-        !+
-        ''', fix_kv, code)
+    return _JS_TOKEN_RE.sub(fix_kv, code)
 
 
 DATE_FORMATS = (
@@ -452,6 +450,63 @@ _NAME_RE = r'[a-zA-Z_$][\w$]*'
 _MATCHING_PARENS = dict(zip(*zip('()', '{}', '[]')))
 _QUOTES = '\'"/'
 _NESTED_BRACKETS = r'[^[\]]+(?:\[[^[\]]+(?:\[[^\]]+\])?\])?'
+_ASSIGN_OPS = "|".join(map(re.escape, set(_OPERATORS) - _COMP_OPERATORS))
+
+_KEYWORD_RE = re.compile(r'(?P<var>(?:var|const|let)\s)|return(?:\s+|(?=["\'])|$)|(?P<throw>throw\s+)')
+_CONTROL_RE = re.compile(r'''(?x)
+                (?P<try>try)\s*\{|
+                (?P<if>if)\s*\(|
+                (?P<switch>switch)\s*\(|
+                (?P<for>for)\s*\(
+                ''')
+_ELSE_RE = re.compile(r'else\s*{')
+_CATCH_RE = re.compile(fr'catch\s*(?P<err>\(\s*{_NAME_RE}\s*\))?\{{')
+_FINALLY_RE = re.compile(r'finally\s*\{')
+_SWITCH_RE = re.compile(r'switch\s*\(')
+_ASSIGNMENT_RE = re.compile(fr'''(?x)
+                (?P<out>{_NAME_RE})(?:\[(?P<index>{_NESTED_BRACKETS})\])?\s*
+                (?P<op>{_ASSIGN_OPS})?
+                =(?!=)(?P<expr>.*)$
+            ''')
+_INCREMENT_RE = re.compile(rf'''(?x)
+                (?P<pre_sign>\+\+|--)(?P<var1>{_NAME_RE})|
+                (?P<var2>{_NAME_RE})(?P<post_sign>\+\+|--)''')
+_EXPRESSION_RE = re.compile(fr'''(?x)
+            (?P<assign>
+                (?P<out>{_NAME_RE})(?:\[(?P<index>{_NESTED_BRACKETS})\])?\s*
+                (?P<op>{_ASSIGN_OPS})?
+                =(?!=)(?P<expr>.*)$
+            )|(?P<return>
+                (?!if|return|true|false|null|undefined|NaN)(?P<name>{_NAME_RE})$
+            )|(?P<attribute>
+                (?P<var>{_NAME_RE})(?:
+                    (?P<nullish>\?)?\.(?P<member>[^(]+)|
+                    \[(?P<member2>{_NESTED_BRACKETS})\]
+                )\s*
+            )|(?P<indexing>
+                (?P<in>{_NAME_RE})\[(?P<idx>.+)\]$
+            )|(?P<function>
+                (?P<fname>{_NAME_RE})\((?P<args>.*)\)$
+            )''')
+
+# Interpreting a function re-parses the same code strings on every call, the
+# splits below only depend on the string and are memoized. Strings holding a
+# substituted value (a named object) are unique to one call, and huge ones
+# are only split once, neither is cached. Each cache is bounded by the
+# approximate memory its keys and splits take.
+_PARSE_CACHE_BYTES = 2 * 1024 * 1024
+_PARSE_CACHE_MAX_LENGTH = 10000
+_NAMED_OBJECT_PREFIX = '__pytubefix_jsinterp_obj'
+
+
+def _cacheable(expr):
+    return expr and len(expr) <= _PARSE_CACHE_MAX_LENGTH and _NAMED_OBJECT_PREFIX not in expr
+
+
+def clear_parse_cache():
+    """Drop the memoized splits of code strings."""
+    _cached_separate.cache_clear()
+    _cached_split_operator.cache_clear()
 
 
 class JS_Undefined:
@@ -542,7 +597,7 @@ class JSInterpreter:
 
     def _named_object(self, namespace, obj):
         self.__named_object_counter += 1
-        name = f'__pytubefix_jsinterp_obj{self.__named_object_counter}'
+        name = f'{_NAMED_OBJECT_PREFIX}{self.__named_object_counter}'
         if callable(obj) and not isinstance(obj, function_with_repr):
             obj = function_with_repr(obj, f'F<{self.__named_object_counter}>')
         namespace[name] = obj
@@ -561,6 +616,12 @@ class JSInterpreter:
 
     @staticmethod
     def _separate(expr, delim=',', max_split=None):
+        if _cacheable(expr):
+            return iter(_cached_separate(expr, delim, max_split))
+        return JSInterpreter._iter_separate(expr, delim, max_split)
+
+    @staticmethod
+    def _iter_separate(expr, delim=',', max_split=None):
         OP_CHARS = '+-*/%&|^=<>!,;{}:['
         if not expr:
             return
@@ -643,9 +704,17 @@ class JSInterpreter:
         except TypeError:
             return self._named_object(namespace, obj)
 
-    def handle_operators(self, expr, local_vars, allow_recursion):
+    @classmethod
+    def _split_operator(cls, expr):
+        """``(op, left_expr, right_expr)`` of the operator ``expr`` applies last, or None."""
+        if _cacheable(expr):
+            return _cached_split_operator(expr)
+        return cls._find_operator(expr)
+
+    @classmethod
+    def _find_operator(cls, expr):
         for op in _ALL_OPERATORS:
-            separated = list(self._separate(expr, op))
+            separated = list(cls._separate(expr, op))
             right_expr = separated.pop()
             while True:
                 if op in '?<>*-' and len(separated) > 1 and not separated[-1].strip():
@@ -657,8 +726,16 @@ class JSInterpreter:
                     right_expr = f'{separated.pop()}{op}{right_expr}'
             if not separated:
                 continue
-            left_val = self.interpret_expression(op.join(separated), local_vars, allow_recursion)
-            return self._operator(op, left_val, right_expr, expr, local_vars, allow_recursion), True
+            return op, op.join(separated), right_expr
+        return None
+
+    def handle_operators(self, expr, local_vars, allow_recursion):
+        split = self._split_operator(expr)
+        if split is None:
+            return None
+        op, left_expr, right_expr = split
+        left_val = self.interpret_expression(left_expr, local_vars, allow_recursion)
+        return self._operator(op, left_val, right_expr, expr, local_vars, allow_recursion), True
 
     # @Debugger.wrap_interpreter
     def interpret_statement(self, stmt, local_vars, allow_recursion=100):
@@ -675,7 +752,7 @@ class JSInterpreter:
             if should_return:
                 return ret, should_return
 
-        m = re.match(r'(?P<var>(?:var|const|let)\s)|return(?:\s+|(?=["\'])|$)|(?P<throw>throw\s+)', stmt)
+        m = _KEYWORD_RE.match(stmt)
         if m:
             expr = stmt[len(m.group(0)):].strip()
             if m.group('throw'):
@@ -758,12 +835,7 @@ class JSInterpreter:
                 for item in self._separate(inner)])
             expr = name + outer
 
-        m = re.match(r'''(?x)
-                (?P<try>try)\s*\{|
-                (?P<if>if)\s*\(|
-                (?P<switch>switch)\s*\(|
-                (?P<for>for)\s*\(
-                ''', expr)
+        m = _CONTROL_RE.match(expr)
         md = m.groupdict() if m else {}
         if md.get('if'):
             cndn, expr = self._separate_at_paren(expr[m.end() - 1:])
@@ -773,7 +845,7 @@ class JSInterpreter:
                 # may lose ... else ... because of ll.368-374
                 if_expr, expr = self._separate_at_paren(' %s;' % (expr,), delim=';')
             else_expr = None
-            m = re.match(r'else\s*{', expr)
+            m = _ELSE_RE.match(expr)
             if m:
                 else_expr, expr = self._separate_at_paren(expr[m.end() - 1:])
             cndn = _js_ternary(self.interpret_expression(cndn, local_vars, allow_recursion))
@@ -794,7 +866,7 @@ class JSInterpreter:
                 err = e
 
             pending = (None, False)
-            m = re.match(fr'catch\s*(?P<err>\(\s*{_NAME_RE}\s*\))?\{{', expr)
+            m = _CATCH_RE.match(expr)
             if m:
                 sub_expr, expr = self._separate_at_paren(expr[m.end() - 1:])
                 if err:
@@ -804,7 +876,7 @@ class JSInterpreter:
                     catch_vars = local_vars.new_child(catch_vars)
                     err, pending = None, self.interpret_statement(sub_expr, catch_vars, allow_recursion)
 
-            m = re.match(r'finally\s*\{', expr)
+            m = _FINALLY_RE.match(expr)
             if m:
                 sub_expr, expr = self._separate_at_paren(expr[m.end() - 1:])
                 ret, should_abort = self.interpret_statement(sub_expr, local_vars, allow_recursion)
@@ -823,7 +895,7 @@ class JSInterpreter:
             if remaining.startswith('{'):
                 body, expr = self._separate_at_paren(remaining)
             else:
-                switch_m = re.match(r'switch\s*\(', remaining)  # FIXME
+                switch_m = _SWITCH_RE.match(remaining)  # FIXME
                 if switch_m:
                     switch_val, remaining = self._separate_at_paren(remaining[switch_m.end() - 1:])
                     body, expr = self._separate_at_paren(remaining, '}')
@@ -883,12 +955,7 @@ class JSInterpreter:
                     return ret, True
             return ret, False
 
-        p =fr'''(?x)
-                (?P<out>{_NAME_RE})(?:\[(?P<index>{_NESTED_BRACKETS})\])?\s*
-                (?P<op>{"|".join(map(re.escape, set(_OPERATORS) - _COMP_OPERATORS))})?
-                =(?!=)(?P<expr>.*)$
-            '''
-        m = re.match(p, expr)
+        m = _ASSIGNMENT_RE.match(expr)
         if m:  # We are assigning a value to a variable
             left_val = local_vars.get(m.group('out'))
 
@@ -907,9 +974,7 @@ class JSInterpreter:
                 m.group('op'), self._index(left_val, idx), m.group('expr'), expr, local_vars, allow_recursion)
             return left_val[idx], should_return
 
-        for m in re.finditer(rf'''(?x)
-                (?P<pre_sign>\+\+|--)(?P<var1>{_NAME_RE})|
-                (?P<var2>{_NAME_RE})(?P<post_sign>\+\+|--)''', expr):
+        for m in _INCREMENT_RE.finditer(expr):
             var = m.group('var1') or m.group('var2')
             start, end = m.span()
             sign = m.group('pre_sign') or m.group('post_sign')
@@ -922,23 +987,7 @@ class JSInterpreter:
         if not expr:
             return None, should_return
 
-        m = re.match(fr'''(?x)
-            (?P<assign>
-                (?P<out>{_NAME_RE})(?:\[(?P<index>{_NESTED_BRACKETS})\])?\s*
-                (?P<op>{"|".join(map(re.escape, set(_OPERATORS) - _COMP_OPERATORS))})?
-                =(?!=)(?P<expr>.*)$
-            )|(?P<return>
-                (?!if|return|true|false|null|undefined|NaN)(?P<name>{_NAME_RE})$
-            )|(?P<attribute>
-                (?P<var>{_NAME_RE})(?:
-                    (?P<nullish>\?)?\.(?P<member>[^(]+)|
-                    \[(?P<member2>{_NESTED_BRACKETS})\]
-                )\s*
-            )|(?P<indexing>
-                (?P<in>{_NAME_RE})\[(?P<idx>.+)\]$
-            )|(?P<function>
-                (?P<fname>{_NAME_RE})\((?P<args>.*)\)$
-            )''', expr)
+        m = _EXPRESSION_RE.match(expr)
         if m and m.group('assign'):
             left_val = local_vars.get(m.group('out'))
 
@@ -1231,13 +1280,74 @@ class JSInterpreter:
     def build_function(self, argnames, code, *global_stack):
         global_stack = list(global_stack) or [{}]
         argnames = tuple(argnames)
+        code = code.replace('\n', ' ')
 
         def resf(args, kwargs={}, allow_recursion=100):
             global_stack[0].update(itertools.zip_longest(argnames, args, fillvalue=None))
             global_stack[0].update(kwargs)
             var_stack = LocalNameSpace(*global_stack)
-            ret, should_abort = self.interpret_statement(code.replace('\n', ' '), var_stack, allow_recursion - 1)
+            ret, should_abort = self.interpret_statement(code, var_stack, allow_recursion - 1)
             if should_abort:
                 return ret
 
         return resf
+
+
+def _size_of(value):
+    """Approximate bytes held by a cache key or split, shared objects excluded."""
+    if isinstance(value, tuple):
+        return sys.getsizeof(value) + sum(_size_of(item) for item in value)
+    if isinstance(value, str):
+        return sys.getsizeof(value)
+    return 0
+
+
+class _ParseCache:
+    """LRU memo of ``function``, bounded by the approximate bytes it holds."""
+
+    def __init__(self, function, max_bytes):
+        self.function = function
+        self.max_bytes = max_bytes
+        # key -> (value, size)
+        self._entries = collections.OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        update_wrapper(self, function)
+
+    @property
+    def currsize(self):
+        return self._bytes
+
+    def __call__(self, *key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry[0]
+        value = self.function(*key)
+        size = _size_of(key) + _size_of(value)
+        with self._lock:
+            if key not in self._entries and size <= self.max_bytes:
+                self._entries[key] = (value, size)
+                self._bytes += size
+                while self._bytes > self.max_bytes:
+                    _, (_, evicted) = self._entries.popitem(last=False)
+                    self._bytes -= evicted
+        return value
+
+    def cache_clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+def _cached_separate(expr, delim, max_split):
+    return tuple(JSInterpreter._iter_separate(expr, delim, max_split))
+
+
+def _cached_split_operator(expr):
+    return JSInterpreter._find_operator(expr)
+
+
+_cached_separate = _ParseCache(_cached_separate, _PARSE_CACHE_BYTES)
+_cached_split_operator = _ParseCache(_cached_split_operator, _PARSE_CACHE_BYTES)
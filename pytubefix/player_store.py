@@ -0,0 +1,237 @@
+"""On-disk store of the player JavaScript (base.js).
+
+The player is a ~2.5MB download that only changes when YouTube rolls out a new
+player version, and its url already names that version. Without a store every
+new process downloads it again; with it only the first one does. Entries are
+keyed by the player hash of ``js_url``, written atomically, revalidated with
+``If-None-Match``/``If-Modified-Since`` once they are older than
+``revalidate_after``, and the least recently used ones are removed when the
+store grows past ``max_bytes``.
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+from typing import Dict, Optional, Tuple
+
+from pytubefix import request
+from pytubefix.helpers import user_cache_dir
+from pytubefix.sig_cache import player_id
+
+logger = logging.getLogger(__name__)
+
+
+class PlayerStore:
+    """Directory of ``<key>.js`` players with a ``<key>.json`` sidecar each.
+
+    Errors of the file system are logged and treated as a miss, the player is
+    then simply downloaded.
+    """
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        max_bytes: int = 20 * 1024 * 1024,
+        revalidate_after: float = 24 * 60 * 60
+    ):
+        """Construct a :class:`PlayerStore <PlayerStore>`.
+
+        :param str directory:
+            (Optional) Where players are stored, defaults to ``players`` in
+            :func:`pytubefix.helpers.user_cache_dir`.
+        :param int max_bytes:
+            Total size of the stored players, the least recently used ones
+            are removed beyond it.
+        :param float revalidate_after:
+            Age in seconds after which a stored player is revalidated with
+            the server before being used.
+        """
+        self.directory = str(directory or os.path.join(user_cache_dir(), 'players'))
+        self.max_bytes = max_bytes
+        self.revalidate_after = revalidate_after
+
+    def _base_path(self, js_url: str) -> str:
+        # Several players (web, tv, embedded, ...) share a version hash.
+        variant = hashlib.sha1(js_url.encode()).hexdigest()[:8]
+        return os.path.join(self.directory, f'{player_id(js_url)}-{variant}')
+
+    def _paths(self, js_url: str) -> Tuple[str, str]:
+        base = self._base_path(js_url)
+        return base + '.js', base + '.json'
+
+    def _metadata_path(self, js_url: str, name: str) -> str:
+        return f'{self._base_path(js_url)}.{name}.json'
+
+    def lookup(self, js_url: str) -> Tuple[Optional[str], Dict[str, str], bool]:
+        """Stored player of ``js_url``.
+
+        :rtype: Tuple[Optional[str], Dict[str, str], bool]
+        :returns:
+            The player (or None), the conditional request headers to
+            revalidate it with, and whether it is recent enough to be used
+            without revalidation.
+        """
+        js_path, meta_path = self._paths(js_url)
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            with open(js_path, encoding='utf-8') as f:
+                js = f.read()
+            # The modification time of the player tracks its last use.
+            os.utime(js_path)
+        except (OSError, ValueError):
+            return None, {}, False
+
+        if meta.get('js_url') != js_url or len(js.encode('utf-8')) != meta.get('size'):
+            logger.debug(f'stored player {js_path} is corrupted, ignoring it')
+            return None, {}, False
+
+        headers = {}
+        if meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+        fresh = time.time() - meta.get('validated', 0) < self.revalidate_after
+        return js, headers, fresh
+
+    def _write(self, path: str, content: str):
+        temp_path = f'{path}.{os.getpid()}.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.replace(temp_path, path)
+
+    def save(self, js_url: str, js: str, headers=None):
+        """Atomically store ``js`` with the validators found in the response ``headers``."""
+        headers = headers or {}
+        js_path, meta_path = self._paths(js_url)
+        meta = {
+            'js_url': js_url,
+            'size': len(js.encode('utf-8')),
+            'etag': headers.get('ETag'),
+            'last_modified': headers.get('Last-Modified'),
+            'validated': time.time(),
+        }
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            # The player goes first, a sidecar always describes a complete file.
+            self._write(js_path, js)
+            self._write(meta_path, json.dumps(meta))
+        except OSError as e:
+            logger.debug(f'unable to store the player of {js_url}: {e}')
+            return
+        self._enforce_size()
+
+    def mark_validated(self, js_url: str):
+        """Record that the server confirmed the stored player is current."""
+        _, meta_path = self._paths(js_url)
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            meta['validated'] = time.time()
+            self._write(meta_path, json.dumps(meta))
+        except (OSError, ValueError) as e:
+            logger.debug(f'unable to update {meta_path}: {e}')
+
+    def load_metadata(self, js_url: str, name: str) -> Optional[dict]:
+        """Data derived from the player ``js_url`` and stored under ``name``.
+
+        :rtype: dict
+        :returns: The data, or None if nothing (readable) was stored.
+        """
+        try:
+            with open(self._metadata_path(js_url, name)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def save_metadata(self, js_url: str, name: str, data: dict):
+        """Store data derived from the player ``js_url`` next to it.
+
+        It is removed together with the player.
+        """
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            self._write(self._metadata_path(js_url, name), json.dumps(data))
+        except OSError as e:
+            logger.debug(f'unable to store the {name} metadata of {js_url}: {e}')
+
+    def _remove(self, base_path: str):
+        directory, prefix = os.path.split(base_path)
+        for entry in os.scandir(directory):
+            if entry.name == prefix + '.js' or (
+                entry.name.startswith(prefix + '.') and entry.name.endswith('.json')
+            ):
+                os.remove(entry.path)
+
+    def invalidate(self, js_url: str):
+        """Remove the stored player of ``js_url`` and its metadata, e.g. once it failed to decipher."""
+        try:
+            self._remove(self._base_path(js_url))
+        except OSError:
+            pass
+
+    def clear(self):
+        """Remove every stored player and its metadata."""
+        try:
+            shutil.rmtree(self.directory)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.debug(f'unable to clear the player store: {e}')
+
+    def _enforce_size(self):
+        try:
+            players = [
+                entry for entry in os.scandir(self.directory)
+                if entry.name.endswith('.js')
+            ]
+            players.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+            total = 0
+            for entry in players:
+                total += entry.stat().st_size
+                if total > self.max_bytes:
+                    logger.debug(f'removing least recently used player {entry.name}')
+                    self._remove(entry.path[:-3])
+        except OSError as e:
+            logger.debug(f'unable to trim the player store: {e}')
+
+
+default_store = PlayerStore()
+
+
+def get_player_js(js_url: str) -> str:
+    """Player of ``js_url``, from the store when possible.
+
+    :rtype: str
+    """
+    js, headers, fresh = default_store.lookup(js_url)
+    if js is not None and fresh:
+        return js
+
+    body, response_headers = request.conditional_get(js_url, extra_headers=headers)
+    if body is None:
+        logger.debug(f'stored player of {js_url} is still current')
+        default_store.mark_validated(js_url)
+        return js
+    default_store.save(js_url, body, response_headers)
+    return body
+
+
+async def get_player_js_async(js_url: str, http_client) -> str:
+    """Asynchronous :func:`get_player_js`, through an :class:`AsyncHTTPClient`.
+
+    :rtype: str
+    """
+    js, headers, fresh = default_store.lookup(js_url)
+    if js is not None and fresh:
+        return js
+
+    body, response_headers = await http_client.conditional_get(js_url, headers=headers)
+    if body is None:
+        logger.debug(f'stored player of {js_url} is still current')
+        default_store.mark_validated(js_url)
+        return js
+    default_store.save(js_url, body, response_headers)
+    return body
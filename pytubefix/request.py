@@ -4,16 +4,94 @@ import json
 import logging
 import re
 import socket
+import threading
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
 from functools import lru_cache
+from itertools import islice
 from urllib import parse
-from urllib.error import URLError
-from urllib.request import Request, urlopen
+from urllib import request as urllib_request
+from urllib.error import HTTPError, URLError
+from urllib.request import Request, getproxies, urlopen
 
+from pytubefix import bandwidth, http_pool
 from pytubefix.exceptions import RegexMatchError, MaxRetriesExceeded
 from pytubefix.helpers import regex_search
 
 logger = logging.getLogger(__name__)
 default_range_size = 9437184  # 9MB
+default_segment_buffer_size = 33554432  # 32MB
+
+# Requests go through a shared keep-alive pool unless it's disabled,
+# e.g. when a proxy opener has been installed for urllib.
+use_connection_pool = True
+
+
+class BufferPool:
+    """Free list of reusable ``bytearray`` buffers.
+
+    Zero-copy streams read into a buffer taken from here instead of
+    allocating a new ``bytes`` object for every chunk, and give it back
+    once the stream is finished.
+    """
+
+    def __init__(self, max_buffers=64):
+        """
+        :param int max_buffers:
+            Maximum number of idle buffers kept per size.
+        """
+        self.max_buffers = max_buffers
+        self._free = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def acquire(self, size):
+        """Take a buffer of ``size`` bytes from the pool, or allocate one."""
+        with self._lock:
+            free = self._free.get(size)
+            if free:
+                return free.pop()
+        return bytearray(size)
+
+    def release(self, buffer):
+        """Give a buffer back to the pool."""
+        with self._lock:
+            free = self._free[len(buffer)]
+            if len(free) < self.max_buffers:
+                free.append(buffer)
+
+
+buffer_pool = BufferPool()
+
+
+def configure_pool(maxsize=None, enabled=None):
+    """Configure the keep-alive connection pool shared by all requests.
+
+    :param int maxsize:
+        (Optional) Maximum number of idle connections kept open per host.
+    :param bool enabled:
+        (Optional) Whether requests should go through the pool at all.
+        When disabled, every request opens its own connection with urlopen.
+    """
+    global use_connection_pool
+    if maxsize is not None:
+        http_pool.default_pool.maxsize = maxsize
+    if enabled is not None:
+        use_connection_pool = enabled
+        if not enabled:
+            http_pool.default_pool.clear()
+
+
+def _pool_usable(url):
+    """Whether ``url`` can be requested over the pool's direct connections.
+
+    Proxies configured in the environment (``HTTPS_PROXY``, ...) and openers
+    installed with ``urllib.request.install_opener`` are only honoured by
+    ``urlopen``.
+    """
+    if not use_connection_pool or urllib_request._opener is not None:
+        return False
+    scheme = url.split(':', 1)[0].lower()
+    return scheme not in getproxies()
 
 
 def _execute_request(
@@ -28,10 +106,13 @@ def _execute_request(
         base_headers.update(headers)
     if data and not isinstance(data, bytes): # encode data for request
             data = bytes(json.dumps(data), encoding="utf-8")
-    if url.lower().startswith("http"):
-        request = Request(url, headers=base_headers, method=method, data=data)
-    else:
+    if not url.lower().startswith("http"):
         raise ValueError("Invalid URL")
+    if _pool_usable(url):
+        return http_pool.default_pool.urlopen(
+            url, method=method, headers=base_headers, data=data, timeout=timeout
+        )
+    request = Request(url, headers=base_headers, method=method, data=data)
     return urlopen(request, timeout=timeout)  # nosec
 
 
@@ -52,6 +133,32 @@ def get(url, extra_headers=None, timeout=socket._GLOBAL_DEFAULT_TIMEOUT):
     return response.read().decode("utf-8")
 
 
+def conditional_get(url, extra_headers=None, timeout=socket._GLOBAL_DEFAULT_TIMEOUT):
+    """Send an http GET request that may be answered with 304 Not Modified.
+
+    :param str url:
+        The URL to perform the GET request for.
+    :param dict extra_headers:
+        Extra headers to add to the request, usually ``If-None-Match``
+        and/or ``If-Modified-Since``.
+    :rtype: tuple
+    :returns:
+        The UTF-8 decoded body (None if the resource was not modified) and
+        the response headers.
+    """
+    try:
+        response = _execute_request(url, headers=extra_headers or {}, timeout=timeout)
+    except HTTPError as e:
+        # urlopen reports a 304 as an error.
+        if e.code == 304:
+            return None, e.headers
+        raise
+    if response.getcode() == 304:
+        response.read()
+        return None, response.info()
+    return response.read().decode("utf-8"), response.info()
+
+
 def post(url, extra_headers=None, data=None, timeout=socket._GLOBAL_DEFAULT_TIMEOUT):
     """Send an http POST request.
 
@@ -86,12 +193,42 @@ def post(url, extra_headers=None, data=None, timeout=socket._GLOBAL_DEFAULT_TIME
 def seq_stream(
             url,
             timeout=socket._GLOBAL_DEFAULT_TIMEOUT,
-            max_retries=0):
+            max_retries=0,
+            start_segment=0,
+            segment_count=None,
+            on_segment=None,
+            concurrency=1,
+            max_buffered_bytes=None,
+            chunk_size=None,
+            rate_limit=None):
 
     """Read the response in sequence.
     :param str url: The URL to perform the GET request for.
+    :param int start_segment:
+        (Optional) First segment to yield, used to resume a download.
+    :param int segment_count:
+        (Optional) Number of segments, if already known from a previous
+        request. The header segment is then not fetched again.
+    :param callable on_segment:
+        (Optional) Called as ``on_segment(seq_num, segment_count)`` once all
+        the chunks of a segment have been consumed.
+    :param int concurrency:
+        (Optional) Number of segments fetched concurrently. Segments are
+        still yielded in sequence order.
+    :param int max_buffered_bytes:
+        (Optional) With ``concurrency`` > 1, no new segment is requested
+        while this many bytes of finished segments wait to be consumed.
+        Defaults to ``default_segment_buffer_size``.
+    :param int chunk_size:
+        (Optional) Zero-copy mode of :func:`stream` for the segments fetched
+        one after the other. Ignored with ``concurrency`` > 1, where whole
+        segments are buffered anyway.
+    :param rate_limit:
+        (Optional) Bytes per second, or a shared :class:`TokenBucket`, that
+        all the segments of this stream count against together.
     :rtype: Iterable[bytes]
     """
+    rate_limit = bandwidth.as_bucket(rate_limit)
     # YouTube expects a request sequence number as part of the parameters.
     split_url = parse.urlsplit(url)
     base_url = f'{split_url.scheme}://{split_url.netloc}/{split_url.path}?'
@@ -100,101 +237,413 @@ def seq_stream(
 
     # The 0th sequential request provides the file headers, which tell us
     #  information about how the file is segmented.
-    querys['sq'] = 0
-    url = base_url + parse.urlencode(querys)
-
-    segment_data = b''
-    for chunk in stream(url, timeout=timeout, max_retries=max_retries):
-        yield chunk
-        segment_data += chunk
+    if segment_count is None or start_segment == 0:
+        querys['sq'] = 0
+        url = base_url + parse.urlencode(querys)
 
-    # We can then parse the header to find the number of segments
-    stream_info = segment_data.split(b'\r\n')
-    segment_count_pattern = re.compile(b'Segment-Count: (\\d+)')
-    for line in stream_info:
-        match = segment_count_pattern.search(line)
-        if match:
-            segment_count = int(match.group(1).decode('utf-8'))
+        segment_data = b''
+        for chunk in stream(url, timeout=timeout, max_retries=max_retries, rate_limit=rate_limit):
+            if start_segment == 0:
+                yield chunk
+            segment_data += chunk
+
+        # We can then parse the header to find the number of segments
+        stream_info = segment_data.split(b'\r\n')
+        segment_count_pattern = re.compile(b'Segment-Count: (\\d+)')
+        for line in stream_info:
+            match = segment_count_pattern.search(line)
+            if match:
+                segment_count = int(match.group(1).decode('utf-8'))
+
+        if start_segment == 0:
+            if on_segment is not None:
+                on_segment(0, segment_count)
+            start_segment = 1
+
+    if concurrency > 1:
+        segments = _concurrent_segments(
+            base_url,
+            querys,
+            range(start_segment, segment_count + 1),
+            concurrency=concurrency,
+            max_buffered_bytes=max_buffered_bytes or default_segment_buffer_size,
+            timeout=timeout,
+            max_retries=max_retries,
+            rate_limit=rate_limit
+        )
+        for seq_num, segment in segments:
+            yield segment
+            if on_segment is not None:
+                on_segment(seq_num, segment_count)
+        return
 
     # We request these segments sequentially to build the file.
-    seq_num = 1
+    seq_num = start_segment
     while seq_num <= segment_count:
         # Create sequential request URL
         querys['sq'] = seq_num
         url = base_url + parse.urlencode(querys)
 
-        yield from stream(url, timeout=timeout, max_retries=max_retries)
+        yield from stream(
+            url, timeout=timeout, max_retries=max_retries,
+            chunk_size=chunk_size, rate_limit=rate_limit
+        )
+        if on_segment is not None:
+            on_segment(seq_num, segment_count)
         seq_num += 1
     return  # pylint: disable=R1711
 
 
-# TODO: Refactor this code
+def _concurrent_segments(
+    base_url,
+    querys,
+    seq_nums,
+    concurrency,
+    max_buffered_bytes,
+    timeout=socket._GLOBAL_DEFAULT_TIMEOUT,
+    max_retries=0,
+    rate_limit=None
+):
+    """Fetch OTF segments on a pool of workers and yield them in order.
+
+    Up to ``concurrency`` segments are in flight at once. Segments that
+    finished ahead of the one being waited on are held in an ordered
+    reassembly buffer; no new request is started while that buffer holds
+    ``max_buffered_bytes`` or more.
+
+    :param str base_url: The segment URL without its query string.
+    :param dict querys: Query parameters shared by all segments.
+    :param seq_nums: Segment numbers to fetch, in order.
+    :rtype: Iterable[Tuple[int, bytes]]
+    :returns: ``(seq_num, segment)`` pairs in sequence order.
+    """
+    seq_nums = iter(seq_nums)
+
+    def fetch(seq_num):
+        url = base_url + parse.urlencode({**querys, 'sq': seq_num})
+        return b''.join(stream(url, timeout=timeout, max_retries=max_retries, rate_limit=rate_limit))
+
+    def buffered():
+        return sum(
+            len(future.result()) for _, future in pending
+            if future.done() and not future.exception()
+        )
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        pending = deque()
+        try:
+            while True:
+                while len(pending) < concurrency and buffered() < max_buffered_bytes:
+                    seq_num = next(seq_nums, None)
+                    if seq_num is None:
+                        break
+                    pending.append((seq_num, executor.submit(fetch, seq_num)))
+                if not pending:
+                    break
+
+                seq_num, future = pending.popleft()
+                yield seq_num, future.result()
+        finally:
+            for _, future in pending:
+                future.cancel()
+
+
+def _execute_range_request(
+    url,
+    start,
+    stop,
+    timeout=socket._GLOBAL_DEFAULT_TIMEOUT,
+    max_retries=0
+):
+    """Request the bytes ``start``-``stop`` of a stream, retrying on timeouts.
+
+    :param str url: The URL to perform the GET request for.
+    :param int start: First byte of the range.
+    :param int stop: Last byte of the range (inclusive).
+    :returns: The open response object.
+    """
+    tries = 0
+
+    # Attempt to make the request multiple times as necessary.
+    while True:
+        # If the max retries is exceeded, raise an exception
+        if tries >= 1 + max_retries:
+            raise MaxRetriesExceeded()
+
+        # Try to execute the request, ignoring socket timeouts
+        try:
+            response = _execute_request(
+                f"{url}&range={start}-{stop}",
+                method="GET",
+                timeout=timeout
+            )
+        except URLError as e:
+            # We only want to skip over timeout errors, and
+            # raise any other URLError exceptions
+            if not isinstance(e.reason, (socket.timeout, OSError)):
+                raise
+        except http.client.IncompleteRead:
+            # Allow retries on IncompleteRead errors for unreliable connections
+            pass
+        else:
+            # On a successful request, break from loop
+            return response
+        tries += 1
+
+
+def fetch_range(
+    url,
+    start,
+    stop,
+    timeout=socket._GLOBAL_DEFAULT_TIMEOUT,
+    max_retries=0,
+    rate_limit=None
+):
+    """Fetch the bytes ``start``-``stop`` of a stream in full.
+
+    If the connection drops mid-body, the remainder of the range is
+    requested again from where the partial read stopped.
+
+    :param str url: The URL to perform the GET request for.
+    :param int start: First byte of the range.
+    :param int stop: Last byte of the range (inclusive).
+    :param TokenBucket rate_limit: (Optional) Per-download bandwidth bucket.
+    :rtype: bytes
+    :raises http.client.IncompleteRead:
+        If a request for the remainder returned no bytes. A short range
+        must never be written as if it were complete.
+    """
+    data = bytearray()
+    while start + len(data) <= stop:
+        response = _execute_range_request(
+            url, start + len(data), stop, timeout=timeout, max_retries=max_retries
+        )
+        received = len(data)
+        for chunk in _read_chunks(response, rate_limit):
+            data += chunk
+        if len(data) == received:
+            raise http.client.IncompleteRead(bytes(data), stop - start + 1 - len(data))
+    return bytes(data)
+
+
+def parallel_stream(
+    url,
+    file_size,
+    connections=4,
+    range_size=None,
+    timeout=socket._GLOBAL_DEFAULT_TIMEOUT,
+    max_retries=0,
+    write_at=None,
+    ranges=None,
+    rate_limit=None
+):
+    """Read a stream as byte ranges fetched concurrently.
+
+    The stream is split into ``range_size`` ranges which are downloaded on a
+    pool of ``connections`` workers. At most ``2 * connections`` ranges are in
+    flight or waiting to be consumed at any time.
+
+    :param str url: The URL to perform the GET request for.
+    :param int file_size: Total size of the stream in bytes.
+    :param int connections: Number of concurrent connections.
+    :param int range_size: Size of each range, defaults to ``default_range_size``.
+    :param callable write_at:
+        (Optional) Called from the worker threads as ``write_at(offset, chunk)``
+        as soon as a range arrives, in whatever order they complete.
+    :param ranges:
+        (Optional) Explicit ``(start, stop)`` byte ranges to fetch instead of
+        the whole stream, e.g. the parts missing from a resumed download.
+    :param rate_limit:
+        (Optional) Bytes per second, or a shared :class:`TokenBucket`, that
+        all the connections of this stream count against together.
+    :rtype: Iterable[Tuple[int, bytes]]
+    :returns: ``(offset, chunk)`` pairs, strictly in byte order.
+    """
+    range_size = range_size or default_range_size
+    rate_limit = bandwidth.as_bucket(rate_limit)
+    if ranges is None:
+        ranges = (
+            (offset, min(offset + range_size, file_size) - 1)
+            for offset in range(0, file_size, range_size)
+        )
+    offsets = iter(ranges)
+
+    def fetch(byte_range):
+        offset, stop_pos = byte_range
+        chunk = fetch_range(
+            url, offset, stop_pos, timeout=timeout,
+            max_retries=max_retries, rate_limit=rate_limit
+        )
+        if write_at is not None:
+            write_at(offset, chunk)
+        return offset, chunk
+
+    with ThreadPoolExecutor(max_workers=connections) as executor:
+        pending = deque(
+            executor.submit(fetch, offset) for offset in islice(offsets, 2 * connections)
+        )
+        try:
+            while pending:
+                offset, chunk = pending.popleft().result()
+                next_offset = next(offsets, None)
+                if next_offset is not None:
+                    pending.append(executor.submit(fetch, next_offset))
+                yield offset, chunk
+        finally:
+            # Don't start ranges nobody is going to consume.
+            for future in pending:
+                future.cancel()
+
+
+def _content_range_total(response):
+    """Total stream size from a ``Content-Range: bytes a-b/total`` header.
+
+    :returns: The total size, or None if the server didn't send it.
+    """
+    content_range = response.info().get("Content-Range", "")
+    total = content_range.rpartition("/")[2]
+    return int(total) if total.isdigit() else None
+
+
+def _probe_filesize(url, timeout=socket._GLOBAL_DEFAULT_TIMEOUT):
+    """Ask the server for the whole stream just to read its size.
+
+    Only used when neither the manifest nor the first range told us the size.
+
+    :returns: The size in bytes, or None if it couldn't be determined.
+    """
+    try:
+        resp = _execute_request(
+            f"{url}&range=0-99999999999",
+            method="GET",
+            timeout=timeout
+        )
+        content_range = resp.info()["Content-Length"]
+        # Only the headers are needed, don't start the full transfer.
+        resp.close()
+        return int(content_range)
+    except (KeyError, IndexError, TypeError, ValueError) as e:
+        logger.error(e)
+        return None
+
+
 def stream(url,
            timeout=socket._GLOBAL_DEFAULT_TIMEOUT,
-           max_retries=0):
+           max_retries=0,
+           file_size=None,
+           chunk_size=None,
+           rate_limit=None):
     """Read the response in chunks.
+
+    The total size is taken from ``file_size`` when the caller knows it (the
+    manifest ``contentLength``), otherwise from the first range response: a
+    range shorter than requested is the whole stream. A separate request to
+    probe the size is only made as a last resort.
+
     :param str url: The URL to perform the GET request for.
+    :param int file_size: (Optional) Total size of the stream in bytes.
+    :param int chunk_size:
+        (Optional) Enables the zero-copy mode: the response is read with
+        ``readinto`` into a pooled buffer of this size and memoryviews of that
+        buffer are yielded. A chunk is only valid until the next one is
+        requested, so consumers must write it out (or copy it) right away.
+    :param rate_limit:
+        (Optional) Bytes per second, or a :class:`TokenBucket` shared with
+        other downloads. The process-wide limit of
+        :func:`pytubefix.bandwidth.set_global_limit` applies on top of it.
     :rtype: Iterable[bytes]
     """
-    file_size: int = default_range_size  # fake filesize to start
-    downloaded = 0
-    while downloaded < file_size:
-        stop_pos = min(downloaded + default_range_size, file_size) - 1
-        range_header = f"bytes={downloaded}-{stop_pos}"
-        tries = 0
-
-        # Attempt to make the request multiple times as necessary.
-        while True:
-            # If the max retries is exceeded, raise an exception
-            if tries >= 1 + max_retries:
-                raise MaxRetriesExceeded()
-
-            # Try to execute the request, ignoring socket timeouts
-            try:
-                response = _execute_request(
-                    f"{url}&range={downloaded}-{stop_pos}",
-                    method="GET",
-                    timeout=timeout
-                )
-            except URLError as e:
-                # We only want to skip over timeout errors, and
-                # raise any other URLError exceptions
-                if not isinstance(e.reason, (socket.timeout, OSError)):
-                    raise
-            except http.client.IncompleteRead:
-                # Allow retries on IncompleteRead errors for unreliable connections
-                pass
+    rate_limit = bandwidth.as_bucket(rate_limit)
+    buffer = buffer_pool.acquire(chunk_size) if chunk_size else None
+    try:
+        size_known = bool(file_size)
+        if not size_known:
+            file_size = default_range_size  # fake filesize to start
+        downloaded = 0
+        while downloaded < file_size:
+            stop_pos = min(downloaded + default_range_size, file_size) - 1
+            range_start = downloaded
+            response = _execute_range_request(
+                url, downloaded, stop_pos, timeout=timeout, max_retries=max_retries
+            )
+
+            if not size_known:
+                total = _content_range_total(response)
+                if total is not None:
+                    file_size = total
+                    size_known = True
+
+            if buffer is None:
+                chunks = _read_chunks(response, rate_limit)
             else:
-                # On a successful request, break from loop
-                break
-            tries += 1
-
-        if file_size == default_range_size:
-            try:
-                resp = _execute_request(
-                    f"{url}&range=0-99999999999",
-                    method="GET",
-                    timeout=timeout
-                )
-                content_range = resp.info()["Content-Length"]
-                file_size = int(content_range)
-            except (KeyError, IndexError, ValueError) as e:
-                logger.error(e)
-        while True:
-            try:
-                chunk = response.read()
-            except StopIteration:
-                return
-            except http.client.IncompleteRead as e:
-                chunk = e.partial
-            if not chunk:
-                break
-
-            if chunk: downloaded += len(chunk)
-            yield chunk
+                chunks = _readinto_chunks(response, buffer, rate_limit)
+            for chunk in chunks:
+                downloaded += len(chunk)
+                yield chunk
+
+            # A dropped connection says nothing about the size, the next
+            # iteration requests the rest of the range again.
+            if not size_known and not _body_incomplete(response):
+                size_known = True
+                if downloaded - range_start <= stop_pos - range_start:
+                    file_size = downloaded
+                else:
+                    file_size = _probe_filesize(url, timeout=timeout) or downloaded
+    finally:
+        if buffer is not None:
+            buffer_pool.release(buffer)
     return  # pylint: disable=R1711
 
 
+def _read_chunks(response, rate_limit=None):
+    """Read the body of ``response``, throttled by the bandwidth limits.
+
+    A connection dropped mid-body just ends the body early, see
+    :func:`_body_incomplete`.
+
+    :param TokenBucket rate_limit: (Optional) Per-download bandwidth bucket.
+    :rtype: Iterable[bytes]
+    """
+    limited = bandwidth.is_limited(rate_limit)
+    read_size = bandwidth.throttled_read_size if limited else None
+    while True:
+        try:
+            chunk = response.read(read_size)
+        except StopIteration:
+            return
+        except http.client.IncompleteRead as e:
+            chunk = e.partial
+        if not chunk:
+            return
+        if limited:
+            bandwidth.throttle(len(chunk), rate_limit)
+        yield chunk
+
+
+def _body_incomplete(response):
+    """Whether part of the announced body of ``response`` was never received."""
+    return bool(getattr(response, 'length', None))
+
+
+def _readinto_chunks(response, buffer, rate_limit=None):
+    """Zero-copy variant of :func:`_read_chunks`, see the ``chunk_size`` of :func:`stream`.
+
+    The body is read into ``buffer`` and memoryviews of it are yielded.
+
+    :param TokenBucket rate_limit: (Optional) Per-download bandwidth bucket.
+    :rtype: Iterable[memoryview]
+    """
+    view = memoryview(buffer)
+    limited = bandwidth.is_limited(rate_limit)
+    while True:
+        n = response.readinto(view)
+        if not n:
+            return
+        if limited:
+            bandwidth.throttle(n, rate_limit)
+        yield view[:n]
+
+
 @lru_cache()
 def filesize(url):
     """Fetch size in bytes of file at given URL
@@ -206,10 +655,14 @@ def filesize(url):
 
 
 @lru_cache()
-def seq_filesize(url):
+def seq_filesize(url, workers=8):
     """Fetch size in bytes of file at given URL from sequential requests
 
+    The segments are sized with HEAD requests issued concurrently over the
+    shared connection pool.
+
     :param str url: The URL to get the size of
+    :param int workers: Maximum number of HEAD requests in flight.
     :returns: int: size in bytes of remote file
     """
     total_filesize = 0
@@ -245,15 +698,13 @@ def seq_filesize(url):
     if segment_count == 0:
         raise RegexMatchError('seq_filesize', segment_regex)
 
-    # We make HEAD requests to the segments sequentially to find the total filesize.
-    seq_num = 1
-    while seq_num <= segment_count:
-        # Create sequential request URL
-        querys['sq'] = seq_num
-        url = base_url + parse.urlencode(querys)
+    def segment_size(seq_num):
+        segment_url = base_url + parse.urlencode({**querys, 'sq': seq_num})
+        return int(head(segment_url)['content-length'])
 
-        total_filesize += int(head(url)['content-length'])
-        seq_num += 1
+    # We make HEAD requests to the segments concurrently to find the total filesize.
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        total_filesize += sum(executor.map(segment_size, range(1, segment_count + 1)))
     return total_filesize
 
 
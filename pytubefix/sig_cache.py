@@ -0,0 +1,196 @@
+"""Persistent memo of deciphered signatures and `n` parameters.
+
+A given player version always transforms the same input into the same
+output, and the same inputs come back for as long as that player is served.
+The results are kept in a small sqlite database in the per-user cache
+directory, keyed by player id and input, so a restarted process doesn't have
+to ask node for values it has already seen.
+
+Entries of players that are no longer served are dropped as soon as a newer
+player shows up, and the least recently used entries are evicted once the
+database holds more than ``max_entries``.
+"""
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Optional
+
+from pytubefix.helpers import user_cache_dir
+
+logger = logging.getLogger(__name__)
+
+_player_id_re = re.compile(r'/s/player/([\w-]+)/')
+
+_schema = """
+CREATE TABLE IF NOT EXISTS entries (
+    player TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    input TEXT NOT NULL,
+    output TEXT NOT NULL,
+    used REAL NOT NULL,
+    PRIMARY KEY (player, kind, input)
+);
+CREATE INDEX IF NOT EXISTS entries_used ON entries (used);
+CREATE TABLE IF NOT EXISTS players (
+    player TEXT PRIMARY KEY,
+    used REAL NOT NULL
+);
+"""
+
+
+def player_id(js_url: str) -> str:
+    """Version id of the player ``js_url``, e.g. ``6e1dd460``."""
+    match = _player_id_re.search(js_url or '')
+    if match:
+        return match.group(1)
+    return hashlib.sha1((js_url or '').encode()).hexdigest()[:16]
+
+
+class SignatureCache:
+    """sqlite backed memo of ``(player, kind, input) -> output``.
+
+    Every error of the database is logged and treated as a cache miss, a
+    broken or read-only cache never stops a download.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_entries: int = 20000, max_players: int = 2):
+        """Construct a :class:`SignatureCache <SignatureCache>`.
+
+        :param str path:
+            (Optional) Database file, defaults to ``signatures.sqlite3`` in
+            :func:`pytubefix.helpers.user_cache_dir`.
+        :param int max_entries:
+            Number of entries kept, the least recently used are evicted.
+        :param int max_players:
+            Number of player versions whose entries are kept. Entries of
+            older players are dropped when a new player is first seen.
+        """
+        self.path = path or os.path.join(user_cache_dir(), 'signatures.sqlite3')
+        self.max_entries = max_entries
+        self.max_players = max_players
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._known_players = set()
+        self._writes = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+            conn.executescript(_schema)
+            self._conn = conn
+        return self._conn
+
+    def _use_player(self, conn: sqlite3.Connection, player: str):
+        """Mark ``player`` as current and drop the entries of outdated players."""
+        if player in self._known_players:
+            return
+        now = time.time()
+        with conn:
+            conn.execute('INSERT OR REPLACE INTO players (player, used) VALUES (?, ?)', (player, now))
+            outdated = [row[0] for row in conn.execute(
+                'SELECT player FROM players ORDER BY used DESC LIMIT -1 OFFSET ?',
+                (self.max_players,)
+            )]
+            for old in outdated:
+                logger.debug(f'dropping cached signatures of player {old}')
+                conn.execute('DELETE FROM entries WHERE player = ?', (old,))
+                conn.execute('DELETE FROM players WHERE player = ?', (old,))
+        self._known_players.add(player)
+
+    def get_many(self, js_url: str, kind: str, inputs: Iterable[str]) -> Dict[str, str]:
+        """Cached outputs of ``inputs`` for the player ``js_url``.
+
+        :param str kind: ``'sig'`` or ``'nsig'``.
+        :rtype: Dict[str, str]
+        :returns: The inputs found in the cache and their output.
+        """
+        inputs = list(dict.fromkeys(inputs))
+        if not inputs:
+            return {}
+        player = player_id(js_url)
+        try:
+            with self._lock:
+                conn = self._connect()
+                self._use_player(conn, player)
+                found = {}
+                # Stay well below sqlite's limit of bound parameters.
+                for i in range(0, len(inputs), 500):
+                    batch = inputs[i:i + 500]
+                    marks = ','.join('?' * len(batch))
+                    found.update(conn.execute(
+                        f'SELECT input, output FROM entries '
+                        f'WHERE player = ? AND kind = ? AND input IN ({marks})',
+                        (player, kind, *batch)
+                    ))
+                if found:
+                    now = time.time()
+                    with conn:
+                        conn.executemany(
+                            'UPDATE entries SET used = ? WHERE player = ? AND kind = ? AND input = ?',
+                            [(now, player, kind, value) for value in found]
+                        )
+                return found
+        except sqlite3.Error as e:
+            logger.debug(f'signature cache unavailable: {e}')
+            return {}
+
+    def put_many(self, js_url: str, kind: str, outputs: Dict[str, str]):
+        """Store the ``input -> output`` pairs of ``outputs`` for the player ``js_url``."""
+        if not outputs:
+            return
+        player = player_id(js_url)
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._connect()
+                self._use_player(conn, player)
+                with conn:
+                    # Another process may have dropped the player meanwhile.
+                    conn.execute('INSERT OR REPLACE INTO players (player, used) VALUES (?, ?)', (player, now))
+                    conn.executemany(
+                        'INSERT OR REPLACE INTO entries (player, kind, input, output, used) '
+                        'VALUES (?, ?, ?, ?, ?)',
+                        [(player, kind, value, output, now) for value, output in outputs.items()]
+                    )
+                self._writes += len(outputs)
+                if self._writes >= self.max_entries // 10:
+                    self._writes = 0
+                    self._evict(conn)
+        except sqlite3.Error as e:
+            logger.debug(f'signature cache unavailable: {e}')
+
+    def _evict(self, conn: sqlite3.Connection):
+        """Delete the least recently used entries beyond ``max_entries``."""
+        with conn:
+            conn.execute(
+                'DELETE FROM entries WHERE rowid IN ('
+                'SELECT rowid FROM entries ORDER BY used DESC LIMIT -1 OFFSET ?)',
+                (self.max_entries,)
+            )
+
+    def clear(self):
+        """Delete every entry."""
+        try:
+            with self._lock:
+                conn = self._connect()
+                with conn:
+                    conn.execute('DELETE FROM entries')
+                    conn.execute('DELETE FROM players')
+                self._known_players.clear()
+        except sqlite3.Error as e:
+            logger.debug(f'signature cache unavailable: {e}')
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+            self._known_players.clear()
+
+
+signature_cache = SignatureCache()
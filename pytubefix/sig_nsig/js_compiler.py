@@ -0,0 +1,2232 @@
+"""Compile a player function into Python closures.
+
+:class:`JSInterpreter <JSInterpreter>` re-parses the source text of every
+statement each time it runs, which makes an nsig function cost milliseconds
+per call. Here the function is parsed once into a syntax tree and every node
+is turned into a closure, calling it then only runs those closures.
+
+Only the part of JavaScript that the decipher functions are written in is
+supported (no classes, generators, destructuring or labels, and a subset of
+the built-in objects). Whatever falls outside of it raises
+:class:`Unsupported`, during compilation or when it's reached while running:
+a compiled function is only a candidate, it must agree with the interpreter
+before it replaces it.
+"""
+import decimal
+import functools
+import logging
+import math
+import re
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from pytubefix.jsinterp import JS_Undefined, JSInterpreter, _fixup_n_function_code
+
+logger = logging.getLogger(__name__)
+
+_MAX_SAFE_INTEGER = 2 ** 53
+
+_TOKEN_RE = re.compile(r'''(?xs)
+    (?P<space>(?:\s|//[^\n]*|/\*.*?\*/)+)
+  | (?P<number>0[xX][0-9a-fA-F]+|0[oO][0-7]+|0[bB][01]+|(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+  | (?P<name>[a-zA-Z_$][\w$]*)
+  | (?P<string>"(?:\\.|[^"\\\n])*"|'(?:\\.|[^'\\\n])*')
+  | (?P<template>`(?:\\.|[^`\\])*`)
+  | (?P<punct>>>>=|\.\.\.|===|!==|\*\*=|<<=|>>=|>>>|&&=|\|\|=|\?\?=|=>|==|!=|<=|>=|&&|\|\||\?\?
+        |\?\.(?!\d)|\+\+|--|\+=|-=|\*=|/=|%=|&=|\|=|\^=|<<|>>|\*\*|[{}()\[\];,<>+\-*/%&|^!~?:=.])
+''')
+_STRING_ESCAPE_RE = re.compile(r'''\\(?:u\{([0-9a-fA-F]+)\}|u([0-9a-fA-F]{4})|x([0-9a-fA-F]{2})|([0-7]{1,3})|(\r\n|[\s\S]))''')
+_SIMPLE_ESCAPES = {'n': '\n', 't': '\t', 'r': '\r', 'b': '\b', 'f': '\f', 'v': '\v', '\n': '', '\r\n': ''}
+_NUMBER_STRING_RE = re.compile(r'^[+-]?(?:Infinity|(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)$')
+
+_KEYWORDS = frozenset((
+    'break', 'case', 'catch', 'class', 'const', 'continue', 'debugger', 'default', 'delete', 'do',
+    'else', 'export', 'extends', 'finally', 'for', 'function', 'if', 'import', 'in', 'instanceof',
+    'let', 'new', 'return', 'super', 'switch', 'this', 'throw', 'try', 'typeof', 'var', 'void',
+    'while', 'with', 'yield', 'null', 'true', 'false',
+))
+# Tokens after which a slash divides, anywhere else it starts a regex.
+_DIVISION_AFTER = frozenset((')', ']', '}'))
+
+# Binary operators by precedence, higher binds tighter.
+_BINARY_PRECEDENCE = {
+    '??': 1, '||': 2, '&&': 3, '|': 4, '^': 5, '&': 6,
+    '==': 7, '!=': 7, '===': 7, '!==': 7,
+    '<': 8, '>': 8, '<=': 8, '>=': 8, 'in': 8, 'instanceof': 8,
+    '<<': 9, '>>': 9, '>>>': 9,
+    '+': 10, '-': 10, '*': 11, '/': 11, '%': 11, '**': 12,
+}
+_ASSIGN_OPS = frozenset((
+    '=', '+=', '-=', '*=', '/=', '%=', '**=', '<<=', '>>=', '>>>=', '&=', '|=', '^=', '&&=', '||=', '??=',
+))
+
+
+class Unsupported(Exception):
+    """Raised for code outside of what the compiler handles."""
+
+
+class JSError(Exception):
+    """A JavaScript exception, what a ``catch`` block receives is ``value``."""
+
+    def __init__(self, value):
+        super().__init__(value)
+        self.value = value
+
+
+def _type_error(message: str) -> JSError:
+    return JSError({'name': 'TypeError', 'message': message})
+
+
+# Values ---------------------------------------------------------------------
+# undefined is JS_Undefined, null None, numbers int (when integral) or float,
+# arrays list, objects dict and functions callables taking (this, args).
+
+class NativeFunction:
+    """A built-in function, with the properties of its constructor."""
+
+    def __init__(self, function: Callable, props: Optional[dict] = None, construct: Optional[Callable] = None):
+        self.function = function
+        self.props = props or {}
+        self.construct = construct
+
+    def __call__(self, this, args):
+        return self.function(this, args)
+
+
+class GlobalObject:
+    """``this`` of a function called without one.
+
+    The player's ``'use strict'`` follows a statement, so it isn't a
+    directive and its functions get the global object.
+    """
+
+
+GLOBAL_THIS = GlobalObject()
+
+
+class RegExp:
+    def __init__(self, source: str, flags: str):
+        self.source = source
+        self.flags = flags
+        if set(flags) - set('gimsuy'):
+            raise Unsupported(f'regex flags {flags}')
+        self._pattern = None
+
+    @property
+    def pattern(self):
+        if self._pattern is None:
+            # Python's syntax covers the usual JavaScript regexes, the
+            # probe check catches where they differ.
+            flags = (re.I if 'i' in self.flags else 0) | (re.M if 'm' in self.flags else 0) | (re.S if 's' in self.flags else 0)
+            try:
+                self._pattern = re.compile(self.source.replace('(?<', '(?P<').replace('(?P<=', '(?<=').replace('(?P<!', '(?<!'), flags)
+            except re.error as e:
+                raise Unsupported(f'regex /{self.source}/: {e}')
+        return self._pattern
+
+
+def _is_function(v) -> bool:
+    # JS_Undefined is a class, which Python would call.
+    return callable(v) and v is not JS_Undefined
+
+
+def _arg(args: list, i: int):
+    return args[i] if i < len(args) else JS_Undefined
+
+
+def _number(x):
+    """Normalize an arithmetic result, integral values are kept as int."""
+    if type(x) is int:
+        return x if -_MAX_SAFE_INTEGER <= x <= _MAX_SAFE_INTEGER else float(x)
+    if x.is_integer() and -_MAX_SAFE_INTEGER <= x <= _MAX_SAFE_INTEGER and not (x == 0 and math.copysign(1, x) < 0):
+        return int(x)
+    return x
+
+
+def to_number(v):
+    t = type(v)
+    if t is int or t is float:
+        return v
+    if t is bool:
+        return int(v)
+    if v is None:
+        return 0
+    if v is JS_Undefined:
+        return math.nan
+    if t is str:
+        s = v.strip()
+        if not s:
+            return 0
+        if s[:2] in ('0x', '0X', '0o', '0O', '0b', '0B'):
+            try:
+                return _number(int(s, 0))
+            except ValueError:
+                return math.nan
+        if not _NUMBER_STRING_RE.match(s):
+            return math.nan
+        return _number(float(s.replace('Infinity', 'inf')))
+    if t is list or t is dict:
+        return to_number(to_primitive(v))
+    return math.nan
+
+
+def _to_integer(v):
+    n = to_number(v)
+    if type(n) is int:
+        return n
+    if n != n:
+        return 0
+    if math.isinf(n):
+        return n
+    return int(n)
+
+
+def _to_int32(v):
+    if type(v) is int and -0x80000000 <= v <= 0x7fffffff:
+        return v
+    n = to_number(v)
+    if type(n) is float:
+        if n != n or math.isinf(n):
+            return 0
+        n = int(n)
+    n &= 0xffffffff
+    return n - 0x100000000 if n & 0x80000000 else n
+
+
+def _to_uint32(v):
+    return _to_int32(v) & 0xffffffff
+
+
+def _clamped_index(v, length: int, default: int) -> int:
+    """Position argument of a string method, kept within the string."""
+    if v is JS_Undefined:
+        return default
+    return int(min(max(_to_integer(v), 0), length))
+
+
+def _relative_index(v, length: int, default: int) -> int:
+    """Index from a start or end argument counted from the end when negative."""
+    if v is JS_Undefined:
+        return default
+    n = _to_integer(v)
+    if n < 0:
+        return max(length + n, 0) if n != -math.inf else 0
+    return min(n, length) if n != math.inf else length
+
+
+def _number_to_string(x, radix=10) -> str:
+    if type(x) is int:
+        if radix == 10:
+            return str(x)
+        digits = '0123456789abcdefghijklmnopqrstuvwxyz'
+        n, out = abs(x), ''
+        while True:
+            n, r = divmod(n, radix)
+            out = digits[r] + out
+            if not n:
+                break
+        return '-' + out if x < 0 else out
+    if x != x:
+        return 'NaN'
+    if math.isinf(x):
+        return 'Infinity' if x > 0 else '-Infinity'
+    if radix != 10:
+        if x.is_integer():
+            return _number_to_string(int(x), radix)
+        raise Unsupported('fractional number in another radix')
+    if x == 0:
+        return '0'
+    if x.is_integer() and abs(x) <= _MAX_SAFE_INTEGER:
+        return str(int(x))
+    # repr gives the same shortest round-trip digits as JavaScript, they are
+    # laid out the JavaScript way.
+    sign, digits, exponent = decimal.Decimal(repr(abs(x))).normalize().as_tuple()
+    digits = ''.join(map(str, digits))
+    k, n = len(digits), len(digits) + exponent
+    if k <= n <= 21:
+        s = digits + '0' * (n - k)
+    elif 0 < n <= 21:
+        s = f'{digits[:n]}.{digits[n:]}'
+    elif -6 < n <= 0:
+        s = f'0.{"0" * -n}{digits}'
+    else:
+        e = n - 1
+        s = f'{digits[0]}{"." + digits[1:] if k > 1 else ""}e{"+" if e >= 0 else "-"}{abs(e)}'
+    return '-' + s if x < 0 else s
+
+
+def to_string(v, _seen=None) -> str:
+    t = type(v)
+    if t is str:
+        return v
+    if t is int or t is float:
+        return _number_to_string(v)
+    if t is bool:
+        return 'true' if v else 'false'
+    if v is None:
+        return 'null'
+    if v is JS_Undefined:
+        return 'undefined'
+    if t is list:
+        return _join(v, ',', _seen)
+    if t is dict:
+        return '[object Object]'
+    if t is RegExp:
+        return f'/{v.source}/{v.flags}'
+    raise Unsupported(f'string of {t.__name__}')
+
+
+def to_primitive(v):
+    t = type(v)
+    if t is list or t is dict or t is RegExp:
+        return to_string(v)
+    if _is_function(v):
+        raise Unsupported('primitive of a function')
+    return v
+
+
+def to_property_key(v) -> str:
+    return v if type(v) is str else to_string(v)
+
+
+def truthy(v) -> bool:
+    if v is True:
+        return True
+    if v is False or v is None or v is JS_Undefined:
+        return False
+    t = type(v)
+    if t is str:
+        return v != ''
+    if t is int:
+        return v != 0
+    if t is float:
+        return not (v == 0 or v != v)
+    return True
+
+
+def typeof(v) -> str:
+    if v is JS_Undefined:
+        return 'undefined'
+    t = type(v)
+    if t is str:
+        return 'string'
+    if t is int or t is float:
+        return 'number'
+    if t is bool:
+        return 'boolean'
+    if v is None or t is list or t is dict or t is RegExp:
+        return 'object'
+    if _is_function(v):
+        return 'function'
+    return 'object'
+
+
+def strict_equals(a, b) -> bool:
+    ta, tb = type(a), type(b)
+    if ta is str or tb is str:
+        return ta is tb and a == b
+    if (ta is int or ta is float) and (tb is int or tb is float):
+        return a == b
+    if ta is bool or tb is bool:
+        return ta is tb and a == b
+    return a is b
+
+
+def _same_value_zero(a, b) -> bool:
+    return strict_equals(a, b) or (type(a) is float and type(b) is float and a != a and b != b)
+
+
+def loose_equals(a, b) -> bool:
+    if a is None or a is JS_Undefined:
+        return b is None or b is JS_Undefined
+    if b is None or b is JS_Undefined:
+        return False
+    ta, tb = type(a), type(b)
+    if ta is tb or {ta, tb} == {int, float}:
+        return strict_equals(a, b)
+    if ta is bool:
+        return loose_equals(int(a), b)
+    if tb is bool:
+        return loose_equals(a, int(b))
+    if ta in (int, float) and tb is str or ta is str and tb in (int, float):
+        return to_number(a) == to_number(b)
+    if ta in (list, dict, RegExp) and tb in (int, float, str):
+        return loose_equals(to_primitive(a), b)
+    if tb in (list, dict, RegExp) and ta in (int, float, str):
+        return loose_equals(a, to_primitive(b))
+    return False
+
+
+# Operators --------------------------------------------------------------------
+
+def _add(a, b):
+    ta, tb = type(a), type(b)
+    if ta is int and tb is int:
+        r = a + b
+        return r if -_MAX_SAFE_INTEGER <= r <= _MAX_SAFE_INTEGER else float(r)
+    if ta is str and tb is str:
+        return a + b
+    a, b = to_primitive(a), to_primitive(b)
+    if type(a) is str or type(b) is str:
+        return to_string(a) + to_string(b)
+    return _number(to_number(a) + to_number(b))
+
+
+def _sub(a, b):
+    if type(a) is int and type(b) is int:
+        return _number(a - b)
+    return _number(to_number(a) - to_number(b))
+
+
+def _mul(a, b):
+    if type(a) is int and type(b) is int:
+        return _number(a * b)
+    a, b = to_number(a), to_number(b)
+    if (a == 0 and type(b) is float and math.isinf(b)) or (b == 0 and type(a) is float and math.isinf(a)):
+        return math.nan
+    return _number(a * b)
+
+
+def _div(a, b):
+    a, b = to_number(a), to_number(b)
+    if b == 0:
+        if a == 0 or a != a:
+            return math.nan
+        return math.copysign(math.inf, a) * math.copysign(1, b)
+    if a != a or b != b:
+        return math.nan
+    return _number(a / b)
+
+
+def _mod(a, b):
+    if type(a) is int and type(b) is int and b:
+        r = abs(a) % abs(b)
+        return -r if a < 0 else r
+    a, b = to_number(a), to_number(b)
+    if b == 0 or a != a or b != b or math.isinf(a):
+        return math.nan
+    if math.isinf(b):
+        return a
+    return _number(math.fmod(a, b))
+
+
+def _pow(a, b):
+    a, b = to_number(a), to_number(b)
+    if b != b:
+        return math.nan
+    if b == 0:
+        return 1
+    if type(a) is int and type(b) is int and 0 < b <= 1100:
+        return _number(a ** b)
+    try:
+        r = math.pow(a, b)
+    except ValueError:
+        return math.nan
+    except OverflowError:
+        return math.inf if a > 0 or b % 2 == 0 else -math.inf
+    return _number(r)
+
+
+def _compare(op):
+    def compare(a, b):
+        a, b = to_primitive(a), to_primitive(b)
+        if type(a) is str and type(b) is str:
+            return op(a, b)
+        a, b = to_number(a), to_number(b)
+        if a != a or b != b:
+            return False
+        return op(a, b)
+    return compare
+
+
+def _in(key, obj):
+    t = type(obj)
+    if t is dict:
+        return to_property_key(key) in obj
+    if t is list:
+        if key == 'length':
+            return True
+        index = _array_index(key)
+        return index is not None and index < len(obj)
+    raise _type_error("Cannot use 'in' operator on a primitive")
+
+
+def _instanceof(a, b):
+    raise Unsupported('instanceof')
+
+
+_BINARY_FUNCTIONS = {
+    '+': _add,
+    '-': _sub,
+    '*': _mul,
+    '/': _div,
+    '%': _mod,
+    '**': _pow,
+    '|': lambda a, b: _to_int32(a) | _to_int32(b),
+    '&': lambda a, b: _to_int32(a) & _to_int32(b),
+    '^': lambda a, b: _to_int32(a) ^ _to_int32(b),
+    '<<': lambda a, b: _to_int32(_to_int32(a) << (_to_uint32(b) & 31)),
+    '>>': lambda a, b: _to_int32(a) >> (_to_uint32(b) & 31),
+    '>>>': lambda a, b: _to_uint32(a) >> (_to_uint32(b) & 31),
+    '==': loose_equals,
+    '!=': lambda a, b: not loose_equals(a, b),
+    '===': strict_equals,
+    '!==': lambda a, b: not strict_equals(a, b),
+    '<': _compare(lambda a, b: a < b),
+    '>': _compare(lambda a, b: a > b),
+    '<=': _compare(lambda a, b: a <= b),
+    '>=': _compare(lambda a, b: a >= b),
+    'in': _in,
+    'instanceof': _instanceof,
+}
+
+
+# Properties -------------------------------------------------------------------
+
+# Built-in properties not implemented here. Reading one is unsupported, while
+# any other missing property is undefined as in JavaScript.
+_UNIMPLEMENTED_PROPERTIES = frozenset((
+    '__proto__', 'constructor', 'prototype', 'name', 'bind', 'toLocaleString', 'toJSON',
+    'isPrototypeOf', 'propertyIsEnumerable', 'toString', 'valueOf', 'at', 'copyWithin', 'entries',
+    'findLast', 'findLastIndex', 'flat', 'flatMap', 'keys', 'values', 'reduceRight', 'toReversed',
+    'toSorted', 'toSpliced', 'with', 'localeCompare', 'match', 'matchAll', 'normalize', 'search',
+    'trimStart', 'trimEnd', 'trimLeft', 'trimRight', 'toLocaleLowerCase', 'toLocaleUpperCase',
+    'toFixed', 'toPrecision', 'toExponential', 'exec', 'lastIndex', 'sticky', 'unicode',
+))
+
+
+def _missing_property(obj, key: str):
+    if key in _UNIMPLEMENTED_PROPERTIES:
+        raise Unsupported(f'{typeof(obj)} property {key}')
+    return JS_Undefined
+
+
+def _own_keys(obj: dict) -> list:
+    """Keys in the order JavaScript enumerates them, array indexes first."""
+    indexes = sorted((k for k in obj if _array_index(k) is not None), key=int)
+    return indexes + [k for k in obj if _array_index(k) is None]
+
+
+def _array_index(key) -> Optional[int]:
+    t = type(key)
+    if t is int:
+        return key if key >= 0 else None
+    if t is float:
+        return int(key) if key.is_integer() and key >= 0 else None
+    if t is str and key.isdigit() and (key == '0' or key[0] != '0'):
+        return int(key)
+    return None
+
+
+def _get_indexed(obj, key, methods: dict):
+    """Property of an array or a string, the most frequent keys are tried first."""
+    if type(key) is int:
+        return obj[key] if 0 <= key < len(obj) else JS_Undefined
+    method = methods.get(key)
+    if method is not None:
+        return method
+    index = _array_index(key)
+    if index is not None:
+        return obj[index] if index < len(obj) else JS_Undefined
+    key = to_property_key(key)
+    if key == 'length':
+        return len(obj)
+    method = methods.get(key)
+    return _missing_property(obj, key) if method is None else method
+
+
+def get_property(obj, key):
+    t = type(obj)
+    if t is list:
+        return _get_indexed(obj, key, _ARRAY_METHODS)
+    if t is str:
+        return _get_indexed(obj, key, _STRING_METHODS)
+    if t is dict:
+        key = to_property_key(key)
+        try:
+            return obj[key]
+        except KeyError:
+            pass
+        if key in _OBJECT_METHODS:
+            return _OBJECT_METHODS[key]
+        return _missing_property(obj, key)
+    if obj is None or obj is JS_Undefined:
+        raise _type_error(f'Cannot read properties of {to_string(obj)} (reading {to_property_key(key)!r})')
+    key = to_property_key(key)
+    if t is GlobalObject:
+        raise Unsupported(f'global property {key}')
+    if t is int or t is float:
+        method = _NUMBER_METHODS.get(key)
+    elif t is bool:
+        method = _NUMBER_METHODS.get(key) if key == 'toString' else None
+    elif t is RegExp:
+        if key in ('source', 'flags'):
+            return getattr(obj, key)
+        if key == 'global':
+            return 'g' in obj.flags
+        method = _REGEXP_METHODS.get(key)
+    elif t is NativeFunction and key in obj.props:
+        return obj.props[key]
+    elif _is_function(obj):
+        method = _FUNCTION_METHODS.get(key)
+    else:
+        method = None
+    return _missing_property(obj, key) if method is None else method
+
+
+def set_property(obj, key, value):
+    t = type(obj)
+    if t is list:
+        index = _array_index(key)
+        if index is None:
+            if to_property_key(key) != 'length':
+                raise Unsupported(f'array property {key}')
+            length = _to_integer(value)
+            if length < len(obj):
+                del obj[length:]
+            else:
+                obj.extend([JS_Undefined] * (length - len(obj)))
+        elif index < len(obj):
+            obj[index] = value
+        else:
+            obj.extend([JS_Undefined] * (index - len(obj)))
+            obj.append(value)
+    elif t is dict:
+        obj[to_property_key(key)] = value
+    elif obj is None or obj is JS_Undefined:
+        raise _type_error(f'Cannot set properties of {to_string(obj)} (setting {to_property_key(key)!r})')
+    else:
+        raise Unsupported(f'setting a property of {typeof(obj)}')
+
+
+def _delete_property(obj, key):
+    t = type(obj)
+    if t is dict:
+        obj.pop(to_property_key(key), None)
+    elif t is list:
+        index = _array_index(key)
+        if index is None:
+            raise Unsupported(f'deleting array property {key}')
+        if index < len(obj):
+            obj[index] = JS_Undefined
+    else:
+        raise Unsupported(f'deleting a property of {typeof(obj)}')
+    return True
+
+
+def call(function, this, args):
+    if not _is_function(function):
+        raise _type_error(f'{typeof(function)} is not a function')
+    return function(this, args)
+
+
+def _construct(function, args):
+    if type(function) is NativeFunction:
+        if function.construct is None:
+            raise Unsupported('constructing a built-in')
+        return function.construct(args)
+    if not _is_function(function):
+        raise _type_error(f'{typeof(function)} is not a constructor')
+    this = {}
+    result = function(this, args)
+    return result if isinstance(result, (list, dict)) or _is_function(result) else this
+
+
+# Built-ins --------------------------------------------------------------------
+
+def _native(function):
+    return NativeFunction(lambda this, args: function(this, *args))
+
+
+def _array(this) -> list:
+    if type(this) is not list:
+        raise Unsupported(f'array method on {typeof(this)}')
+    return this
+
+
+def _string(this) -> str:
+    if type(this) is not str:
+        if this is None or this is JS_Undefined:
+            raise _type_error('String method called on null or undefined')
+        raise Unsupported(f'string method on {typeof(this)}')
+    return this
+
+
+def _join(array: list, separator, _seen=None) -> str:
+    separator = ',' if separator is JS_Undefined else to_string(separator)
+    _seen = _seen or set()
+    if id(array) in _seen:
+        return ''
+    _seen.add(id(array))
+    try:
+        return separator.join(
+            '' if item is None or item is JS_Undefined
+            else item if type(item) is str
+            else to_string(item, _seen)
+            for item in array
+        )
+    finally:
+        _seen.discard(id(array))
+
+
+def _iterate(this, callback):
+    """(index, value) pairs of the array, which ``callback`` may modify meanwhile."""
+    array = _array(this)
+    if not _is_function(callback):
+        raise _type_error(f'{typeof(callback)} is not a function')
+    for i in range(len(array)):
+        if i >= len(array):
+            break
+        yield i, array[i]
+
+
+def _for_each(this, args):
+    callback, this_arg = _arg(args, 0), _arg(args, 1)
+    for i, value in _iterate(this, callback):
+        callback(this_arg, [value, i, this])
+    return JS_Undefined
+
+
+def _map(this, args):
+    callback, this_arg = _arg(args, 0), _arg(args, 1)
+    result = [JS_Undefined] * len(_array(this))
+    for i, value in _iterate(this, callback):
+        result[i] = callback(this_arg, [value, i, this])
+    return result
+
+
+def _filter(this, args):
+    callback, this_arg = _arg(args, 0), _arg(args, 1)
+    return [value for i, value in _iterate(this, callback) if truthy(callback(this_arg, [value, i, this]))]
+
+
+def _some(this, args):
+    callback, this_arg = _arg(args, 0), _arg(args, 1)
+    return any(truthy(callback(this_arg, [value, i, this])) for i, value in _iterate(this, callback))
+
+
+def _every(this, args):
+    callback, this_arg = _arg(args, 0), _arg(args, 1)
+    return all(truthy(callback(this_arg, [value, i, this])) for i, value in _iterate(this, callback))
+
+
+def _find_index(this, args):
+    callback, this_arg = _arg(args, 0), _arg(args, 1)
+    for i, value in _iterate(this, callback):
+        if truthy(callback(this_arg, [value, i, this])):
+            return i
+    return -1
+
+
+def _find(this, args):
+    i = _find_index(this, args)
+    return this[i] if i >= 0 else JS_Undefined
+
+
+def _reduce(this, args):
+    callback = _arg(args, 0)
+    items = iter(_iterate(this, callback))
+    if len(args) > 1:
+        accumulator = args[1]
+    else:
+        try:
+            _, accumulator = next(items)
+        except StopIteration:
+            raise _type_error('Reduce of empty array with no initial value')
+    for i, value in items:
+        accumulator = callback(JS_Undefined, [accumulator, value, i, this])
+    return accumulator
+
+
+def _push(this, args):
+    _array(this).extend(args)
+    return len(this)
+
+
+def _pop(this, args):
+    return _array(this).pop() if this else JS_Undefined
+
+
+def _shift(this, args):
+    return _array(this).pop(0) if this else JS_Undefined
+
+
+def _unshift(this, args):
+    _array(this)[0:0] = args
+    return len(this)
+
+
+def _splice(this, args):
+    length = len(_array(this))
+    start = _relative_index(_arg(args, 0), length, 0)
+    if not args:
+        count = 0
+    elif len(args) == 1:
+        count = length - start
+    else:
+        count = min(max(_to_integer(args[1]), 0), length - start)
+    removed = this[start:start + count]
+    this[start:start + count] = args[2:]
+    return removed
+
+
+def _slice(this, args):
+    length = len(this)
+    return this[_relative_index(_arg(args, 0), length, 0):_relative_index(_arg(args, 1), length, length)]
+
+
+def _reverse(this, args):
+    _array(this).reverse()
+    return this
+
+
+def _concat(this, args):
+    result = list(_array(this))
+    for item in args:
+        if type(item) is list:
+            result.extend(item)
+        else:
+            result.append(item)
+    return result
+
+
+def _index_of(this, args):
+    if type(this) is str:
+        return this.find(to_string(_arg(args, 0)), _clamped_index(_arg(args, 1), len(this), 0))
+    value = _arg(args, 0)
+    for i in range(_relative_index(_arg(args, 1), len(_array(this)), 0), len(this)):
+        if strict_equals(this[i], value):
+            return i
+    return -1
+
+
+def _last_index_of(this, args):
+    if type(this) is str:
+        return this.rfind(to_string(_arg(args, 0)))
+    value = _arg(args, 0)
+    for i in range(len(_array(this)) - 1, -1, -1):
+        if strict_equals(this[i], value):
+            return i
+    return -1
+
+
+def _includes(this, args):
+    if type(this) is str:
+        return to_string(_arg(args, 0)) in this[_clamped_index(_arg(args, 1), len(this), 0):]
+    value = _arg(args, 0)
+    return any(_same_value_zero(item, value) for item in _array(this))
+
+
+def _sort(this, args):
+    compare = _arg(args, 0)
+    array = _array(this)
+    defined = [item for item in array if item is not JS_Undefined]
+    if compare is JS_Undefined:
+        defined.sort(key=to_string)
+    else:
+        def key(a, b):
+            result = to_number(call(compare, JS_Undefined, [a, b]))
+            return 0 if result != result else (result > 0) - (result < 0)
+        defined.sort(key=functools.cmp_to_key(key))
+    array[:] = defined + [JS_Undefined] * (len(array) - len(defined))
+    return array
+
+
+def _fill(this, args):
+    length = len(_array(this))
+    for i in range(_relative_index(_arg(args, 1), length, 0), _relative_index(_arg(args, 2), length, length)):
+        this[i] = _arg(args, 0)
+    return this
+
+
+_ARRAY_METHODS = {
+    'push': _push, 'pop': _pop, 'shift': _shift, 'unshift': _unshift, 'splice': _splice,
+    'slice': _slice, 'reverse': _reverse, 'concat': _concat, 'join': lambda this, args: _join(_array(this), _arg(args, 0)),
+    'indexOf': _index_of, 'lastIndexOf': _last_index_of, 'includes': _includes,
+    'forEach': _for_each, 'map': _map, 'filter': _filter, 'some': _some, 'every': _every,
+    'find': _find, 'findIndex': _find_index, 'reduce': _reduce, 'sort': _sort, 'fill': _fill,
+    'toString': lambda this, args: _join(_array(this), ','),
+}
+
+
+def _split(this, args):
+    s, separator, limit = _string(this), _arg(args, 0), _arg(args, 1)
+    if separator is JS_Undefined:
+        parts = [s]
+    elif type(separator) is RegExp:
+        if separator.pattern.groups or separator.pattern.match('') is not None:
+            raise Unsupported(f'splitting on /{separator.source}/')
+        parts = separator.pattern.split(s)
+    else:
+        separator = to_string(separator)
+        parts = list(s) if separator == '' else s.split(separator)
+    if limit is not JS_Undefined:
+        parts = parts[:_to_uint32(limit)]
+    return parts
+
+
+def _char_at(this, args):
+    i = _to_integer(_arg(args, 0))
+    return _string(this)[i] if 0 <= i < len(this) else ''
+
+
+def _char_code_at(this, args):
+    i = _to_integer(_arg(args, 0))
+    if not 0 <= i < len(_string(this)):
+        return math.nan
+    code = ord(this[i])
+    if code > 0xffff:
+        raise Unsupported('astral character')
+    return code
+
+
+def _substring(this, args):
+    length = len(_string(this))
+    start = min(max(_to_integer(_arg(args, 0)), 0), length)
+    end = length if _arg(args, 1) is JS_Undefined else min(max(_to_integer(args[1]), 0), length)
+    return this[min(start, end):max(start, end)]
+
+
+def _substr(this, args):
+    length = len(_string(this))
+    start = _relative_index(_arg(args, 0), length, 0)
+    count = length - start if _arg(args, 1) is JS_Undefined else min(max(_to_integer(args[1]), 0), length - start)
+    return this[start:start + count]
+
+
+def _replacement(replacement, match: str, groups: tuple, offset: int, s: str) -> str:
+    if _is_function(replacement):
+        return to_string(call(replacement, JS_Undefined, [match, *groups, offset, s]))
+    replacement = to_string(replacement)
+    if '$' in replacement:
+        raise Unsupported('replacement patterns')
+    return replacement
+
+
+def _replace(this, args, replace_all=False):
+    s, pattern, replacement = _string(this), _arg(args, 0), _arg(args, 1)
+    if type(pattern) is RegExp:
+        count = 0 if replace_all or 'g' in pattern.flags else 1
+        return pattern.pattern.sub(
+            lambda m: _replacement(
+                replacement, m.group(0),
+                tuple(JS_Undefined if g is None else g for g in m.groups()), m.start(), s),
+            s, count=count)
+    pattern = to_string(pattern)
+    if not pattern and replace_all:
+        raise Unsupported('replacing all empty strings')
+    out, start = [], 0
+    i = s.find(pattern)
+    while i >= 0:
+        out.append(s[start:i])
+        out.append(_replacement(replacement, pattern, (), i, s))
+        start = i + len(pattern)
+        i = s.find(pattern, start) if replace_all else -1
+    out.append(s[start:])
+    return ''.join(out)
+
+
+def _pad(this, args, at_start):
+    s, length = _string(this), _to_integer(_arg(args, 0))
+    fill = ' ' if _arg(args, 1) is JS_Undefined else to_string(args[1])
+    if length <= len(s) or not fill:
+        return s
+    padding = (fill * (length // len(fill) + 1))[:length - len(s)]
+    return padding + s if at_start else s + padding
+
+
+_STRING_METHODS = {
+    'split': _split,
+    'charAt': _char_at,
+    'charCodeAt': _char_code_at,
+    'codePointAt': lambda this, args: _char_code_at(this, args) if 0 <= _to_integer(_arg(args, 0)) < len(
+        _string(this)) else JS_Undefined,
+    'indexOf': lambda this, args: _index_of(_string(this), args),
+    'lastIndexOf': lambda this, args: _last_index_of(_string(this), args),
+    'includes': lambda this, args: _includes(_string(this), args),
+    'startsWith': lambda this, args: _string(this).startswith(
+        to_string(_arg(args, 0)), _clamped_index(_arg(args, 1), len(this), 0)),
+    'endsWith': lambda this, args: _string(this)[:_clamped_index(_arg(args, 1), len(this), len(this))].endswith(
+        to_string(_arg(args, 0))),
+    'slice': lambda this, args: _slice(_string(this), args),
+    'substring': _substring,
+    'substr': _substr,
+    'toUpperCase': lambda this, args: _string(this).upper(),
+    'toLowerCase': lambda this, args: _string(this).lower(),
+    'trim': lambda this, args: _string(this).strip(),
+    'concat': lambda this, args: _string(this) + ''.join(map(to_string, args)),
+    'repeat': lambda this, args: _string(this) * _to_integer(_arg(args, 0)),
+    'replace': _replace,
+    'replaceAll': lambda this, args: _replace(this, args, replace_all=True),
+    'padStart': lambda this, args: _pad(this, args, True),
+    'padEnd': lambda this, args: _pad(this, args, False),
+    'toString': lambda this, args: _string(this),
+    'valueOf': lambda this, args: _string(this),
+}
+
+_NUMBER_METHODS = {
+    'toString': lambda this, args: to_string(this) if type(this) is bool else _number_to_string(
+        this, 10 if _arg(args, 0) is JS_Undefined else _to_integer(args[0])),
+    'valueOf': lambda this, args: this,
+}
+
+_OBJECT_METHODS = {
+    'hasOwnProperty': lambda this, args: to_property_key(_arg(args, 0)) in this,
+}
+
+_REGEXP_METHODS = {
+    'test': lambda this, args: this.pattern.search(to_string(_arg(args, 0))) is not None,
+}
+
+_FUNCTION_METHODS = {
+    'call': lambda this, args: call(this, _arg(args, 0), args[1:]),
+    'apply': lambda this, args: call(
+        this, _arg(args, 0), [] if _arg(args, 1) in (None, JS_Undefined) else list(_array(args[1]))),
+}
+
+
+def _math(function):
+    """Math function of one number, NaN and infinities are returned as they are."""
+    def math_function(this, args):
+        x = to_number(_arg(args, 0))
+        if type(x) is float and (x != x or math.isinf(x)):
+            return x
+        return _number(function(x))
+    return NativeFunction(math_function)
+
+
+def _sign(x):
+    return x if x != x or x == 0 else int(math.copysign(1, x))
+
+
+def _math_random(this, args):
+    raise Unsupported('Math.random')
+
+
+def _min_max(pick, empty):
+    def min_max(this, args):
+        values = [to_number(v) for v in args]
+        if any(v != v for v in values):
+            return math.nan
+        return _number(pick(values)) if values else empty
+    return NativeFunction(min_max)
+
+
+def _parse_int(this, args):
+    s = to_string(_arg(args, 0)).strip()
+    radix = _to_int32(_arg(args, 1))
+    sign = -1 if s[:1] == '-' else 1
+    s = s[1:] if s[:1] in '+-' else s
+    if radix in (0, 16) and s[:2].lower() == '0x':
+        s, radix = s[2:], 16
+    radix = radix or 10
+    if not 2 <= radix <= 36:
+        return math.nan
+    digits = 0
+    while digits < len(s) and s[digits].isascii() and s[digits].isalnum() and int(s[digits], 36) < radix:
+        digits += 1
+    return _number(sign * int(s[:digits], radix)) if digits else math.nan
+
+
+def _parse_float(this, args):
+    m = re.match(r'[+-]?(?:Infinity|(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)', to_string(_arg(args, 0)).strip())
+    return _number(float(m.group(0).replace('Infinity', 'inf'))) if m else math.nan
+
+
+def _new_array(args):
+    if len(args) == 1 and type(args[0]) in (int, float):
+        if _array_index(args[0]) is None:
+            raise JSError({'name': 'RangeError', 'message': 'Invalid array length'})
+        return [JS_Undefined] * int(args[0])
+    return list(args)
+
+
+def _array_from(this, args):
+    source = _arg(args, 0)
+    if type(source) is str:
+        return list(source)
+    if type(source) is list:
+        return list(source)
+    raise Unsupported(f'Array.from of {typeof(source)}')
+
+
+def _object_keys(this, args):
+    obj = _arg(args, 0)
+    if type(obj) is dict:
+        return _own_keys(obj)
+    if type(obj) in (list, str):
+        return [str(i) for i in range(len(obj))]
+    raise Unsupported(f'Object.keys of {typeof(obj)}')
+
+
+BUILTINS = {
+    'undefined': JS_Undefined,
+    'NaN': math.nan,
+    'Infinity': math.inf,
+    'String': NativeFunction(
+        lambda this, args: to_string(args[0]) if args else '',
+        {'fromCharCode': _native(lambda this, *codes: ''.join(chr(_to_uint32(c) & 0xffff) for c in codes))}),
+    'Number': NativeFunction(lambda this, args: to_number(args[0]) if args else 0),
+    'Boolean': NativeFunction(lambda this, args: truthy(_arg(args, 0))),
+    'Array': NativeFunction(
+        lambda this, args: _new_array(args),
+        {'isArray': _native(lambda this, v=JS_Undefined, *_: type(v) is list), 'from': NativeFunction(_array_from)},
+        construct=_new_array),
+    'Object': NativeFunction(lambda this, args: {}, {'keys': NativeFunction(_object_keys)}, construct=lambda args: {}),
+    'Math': {
+        'floor': _math(math.floor),
+        'ceil': _math(math.ceil),
+        'round': _math(lambda x: math.floor(x + 0.5)),
+        'trunc': _math(math.trunc),
+        'abs': NativeFunction(lambda this, args: _number(abs(to_number(_arg(args, 0))))),
+        'sqrt': _math(lambda x: math.sqrt(x) if x >= 0 else math.nan),
+        'pow': _native(lambda this, *args: _pow(_arg(args, 0), _arg(args, 1))),
+        'sign': NativeFunction(lambda this, args: _sign(to_number(_arg(args, 0)))),
+        'max': _min_max(max, -math.inf),
+        'min': _min_max(min, math.inf),
+        'random': NativeFunction(_math_random),
+        'PI': math.pi,
+        'E': math.e,
+    },
+    'parseInt': NativeFunction(_parse_int),
+    'parseFloat': NativeFunction(_parse_float),
+    'isNaN': _native(lambda this, v=JS_Undefined, *_: to_number(v) != to_number(v)),
+    'isFinite': _native(lambda this, v=JS_Undefined, *_: math.isfinite(to_number(v))),
+}
+
+
+# Parser -----------------------------------------------------------------------
+
+def _string_value(literal: str) -> str:
+    def unescape(m):
+        braced, u, x, octal, char = m.groups()
+        if braced or u or x:
+            return chr(int(braced or u or x, 16))
+        if octal:
+            return chr(int(octal, 8))
+        return _SIMPLE_ESCAPES.get(char, char)
+    return _STRING_ESCAPE_RE.sub(unescape, literal[1:-1])
+
+
+class _Parser:
+    """Recursive descent parser producing tuples, ``(kind, *fields)``."""
+
+    def __init__(self, source: str, pos: int = 0):
+        self.source = source
+        self.pos = pos
+        self.newline = False
+        self._regex_allowed = True
+        self.kind, self.value = self._scan()
+
+    def snapshot(self):
+        return self.pos, self.newline, self._regex_allowed, self.kind, self.value
+
+    def restore(self, state):
+        self.pos, self.newline, self._regex_allowed, self.kind, self.value = state
+
+    def _scan(self) -> Tuple[str, Any]:
+        self.newline = False
+        while True:
+            if self.pos >= len(self.source):
+                return 'eof', None
+            m = _TOKEN_RE.match(self.source, self.pos)
+            if m is None:
+                raise Unsupported(f'unexpected character {self.source[self.pos]!r} at {self.pos}')
+            kind, value = m.lastgroup, m.group()
+            if kind == 'space':
+                self.newline = self.newline or '\n' in value
+                self.pos = m.end()
+                continue
+            if kind == 'punct' and value in ('/', '/=') and self._regex_allowed:
+                return self._scan_regex()
+            self.pos = m.end()
+            self._regex_allowed = (
+                kind == 'punct' and value not in _DIVISION_AFTER
+                or kind == 'name' and value in _KEYWORDS and value not in ('this', 'null', 'true', 'false')
+            )
+            return kind, value
+
+    def _scan_regex(self):
+        i, in_class = self.pos + 1, False
+        while True:
+            if i >= len(self.source) or self.source[i] == '\n':
+                raise Unsupported('unterminated regex')
+            c = self.source[i]
+            if c == '\\':
+                i += 1
+            elif c == '[':
+                in_class = True
+            elif c == ']':
+                in_class = False
+            elif c == '/' and not in_class:
+                break
+            i += 1
+        flags = re.match(r'[a-z]*', self.source[i + 1:]).group()
+        value = (self.source[self.pos + 1:i], flags)
+        self.pos = i + 1 + len(flags)
+        self._regex_allowed = False
+        return 'regex', value
+
+    def advance(self):
+        token = self.kind, self.value
+        self.kind, self.value = self._scan()
+        return token
+
+    def at(self, value: str) -> bool:
+        return self.value == value and self.kind in ('punct', 'name')
+
+    def accept(self, value: str) -> bool:
+        if self.at(value):
+            self.advance()
+            return True
+        return False
+
+    def expect(self, value: str):
+        if not self.accept(value):
+            raise Unsupported(f'expected {value!r}, got {self.value!r} at {self.pos}')
+
+    def name(self) -> str:
+        if self.kind != 'name' or self.value in _KEYWORDS:
+            raise Unsupported(f'expected a name, got {self.value!r} at {self.pos}')
+        return self.advance()[1]
+
+    def semicolon(self):
+        if not self.accept(';') and not (self.at('}') or self.kind == 'eof' or self.newline):
+            raise Unsupported(f'expected ";", got {self.value!r} at {self.pos}')
+
+    # Statements
+
+    def statements(self, end: Optional[str] = '}') -> list:
+        body = []
+        while not (self.at(end) if end else self.kind == 'eof'):
+            if self.kind == 'eof':
+                raise Unsupported('unexpected end of code')
+            body.append(self.statement())
+        return body
+
+    def block(self) -> tuple:
+        self.expect('{')
+        body = self.statements()
+        self.expect('}')
+        return ('block', body)
+
+    def statement(self) -> tuple:
+        if self.at('{'):
+            return self.block()
+        if self.accept(';'):
+            return ('empty',)
+        if self.kind == 'name':
+            keyword = self.value
+            if keyword in ('var', 'let', 'const'):
+                self.advance()
+                statement = self.declarations()
+                self.semicolon()
+                return statement
+            if keyword == 'function':
+                self.advance()
+                name = self.name()
+                params, body = self.function_rest()
+                return ('function_declaration', name, params, body)
+            handler = getattr(self, f'_statement_{keyword}', None)
+            if handler is not None:
+                self.advance()
+                return handler()
+            if keyword in ('class', 'with', 'import', 'export', 'yield', 'debugger'):
+                raise Unsupported(f'{keyword} statement')
+            state = self.snapshot()
+            self.advance()
+            if self.at(':'):
+                raise Unsupported('labeled statement')
+            self.restore(state)
+        expression = self.expression()
+        self.semicolon()
+        return ('expression', expression)
+
+    def declarations(self) -> tuple:
+        declarations = []
+        while True:
+            name = self.name()
+            init = self.assignment() if self.accept('=') else None
+            declarations.append((name, init))
+            if not self.accept(','):
+                return ('var', declarations)
+
+    def _statement_if(self):
+        self.expect('(')
+        test = self.expression()
+        self.expect(')')
+        consequent = self.statement()
+        alternate = self.statement() if self.accept('else') else None
+        return ('if', test, consequent, alternate)
+
+    def _statement_for(self):
+        self.expect('(')
+        state = self.snapshot()
+        declared = self.accept('var') or self.accept('let') or self.accept('const')
+        if self.kind == 'name' and self.value not in _KEYWORDS:
+            name = self.name()
+            if self.at('in') or self.at('of'):
+                kind = self.advance()[1]
+                iterable = self.expression()
+                self.expect(')')
+                return ('for_in', kind, name, declared, iterable, self.statement())
+        self.restore(state)
+        init = None
+        if self.accept('var') or self.accept('let') or self.accept('const'):
+            init = self.declarations()
+        elif not self.at(';'):
+            init = ('expression', self.expression())
+        self.expect(';')
+        test = None if self.at(';') else self.expression()
+        self.expect(';')
+        update = None if self.at(')') else self.expression()
+        self.expect(')')
+        return ('for', init, test, update, self.statement())
+
+    def _statement_while(self):
+        self.expect('(')
+        test = self.expression()
+        self.expect(')')
+        return ('for', None, test, None, self.statement())
+
+    def _statement_do(self):
+        body = self.statement()
+        self.expect('while')
+        self.expect('(')
+        test = self.expression()
+        self.expect(')')
+        self.accept(';')
+        return ('do', body, test)
+
+    def _statement_return(self):
+        if self.at(';') or self.at('}') or self.kind == 'eof' or self.newline:
+            argument = None
+        else:
+            argument = self.expression()
+        self.semicolon()
+        return ('return', argument)
+
+    def _statement_break(self):
+        if self.kind == 'name' and not self.newline and self.value not in _KEYWORDS:
+            raise Unsupported('labeled break')
+        self.semicolon()
+        return ('break',)
+
+    def _statement_continue(self):
+        if self.kind == 'name' and not self.newline and self.value not in _KEYWORDS:
+            raise Unsupported('labeled continue')
+        self.semicolon()
+        return ('continue',)
+
+    def _statement_throw(self):
+        argument = self.expression()
+        self.semicolon()
+        return ('throw', argument)
+
+    def _statement_try(self):
+        block = self.block()
+        param = handler = finalizer = None
+        if self.accept('catch'):
+            if self.accept('('):
+                param = self.name()
+                self.expect(')')
+            handler = self.block()
+        if self.accept('finally'):
+            finalizer = self.block()
+        if handler is None and finalizer is None:
+            raise Unsupported('try without catch or finally')
+        return ('try', block, param, handler, finalizer)
+
+    def _statement_switch(self):
+        self.expect('(')
+        discriminant = self.expression()
+        self.expect(')')
+        self.expect('{')
+        cases = []
+        while not self.accept('}'):
+            if self.accept('default'):
+                test = None
+            else:
+                self.expect('case')
+                test = self.expression()
+            self.expect(':')
+            body = []
+            while not (self.at('case') or self.at('default') or self.at('}')):
+                body.append(self.statement())
+            cases.append((test, body))
+        return ('switch', discriminant, cases)
+
+    # Expressions
+
+    def expression(self) -> tuple:
+        expression = self.assignment()
+        if not self.at(','):
+            return expression
+        expressions = [expression]
+        while self.accept(','):
+            expressions.append(self.assignment())
+        return ('sequence', expressions)
+
+    def _arrow_params(self) -> Optional[list]:
+        state = self.snapshot()
+        if self.kind == 'name' and self.value not in _KEYWORDS:
+            params = [self.advance()[1]]
+        elif self.accept('('):
+            params = []
+            while self.kind == 'name' and self.value not in _KEYWORDS:
+                params.append(self.advance()[1])
+                if not self.accept(','):
+                    break
+            if not self.accept(')'):
+                self.restore(state)
+                return None
+        else:
+            return None
+        if self.at('=>') and not self.newline:
+            self.advance()
+            return params
+        self.restore(state)
+        return None
+
+    def assignment(self) -> tuple:
+        params = self._arrow_params()
+        if params is not None:
+            if self.at('{'):
+                body = self.block()[1]
+            else:
+                body = [('return', self.assignment())]
+            return ('function', None, params, body, True)
+        target = self.conditional()
+        if self.kind == 'punct' and self.value in _ASSIGN_OPS:
+            if target[0] not in ('name', 'member'):
+                raise Unsupported(f'assignment to {target[0]}')
+            op = self.advance()[1]
+            return ('assign', op, target, self.assignment())
+        return target
+
+    def conditional(self) -> tuple:
+        test = self.binary(0)
+        if not self.accept('?'):
+            return test
+        consequent = self.assignment()
+        self.expect(':')
+        return ('conditional', test, consequent, self.assignment())
+
+    def binary(self, min_precedence: int) -> tuple:
+        left = self.unary()
+        while True:
+            op = self.value
+            precedence = _BINARY_PRECEDENCE.get(op) if self.kind in ('punct', 'name') else None
+            if precedence is None or precedence < min_precedence:
+                return left
+            self.advance()
+            right = self.binary(precedence if op == '**' else precedence + 1)
+            left = ('logical' if op in ('&&', '||', '??') else 'binary', op, left, right)
+
+    def unary(self) -> tuple:
+        if self.kind == 'punct' and self.value in ('!', '-', '+', '~'):
+            return ('unary', self.advance()[1], self.unary())
+        if self.kind == 'name' and self.value in ('typeof', 'void', 'delete'):
+            return ('unary', self.advance()[1], self.unary())
+        if self.kind == 'punct' and self.value in ('++', '--'):
+            op = self.advance()[1]
+            return ('update', op, True, self.unary())
+        expression = self.call_member()
+        if self.kind == 'punct' and self.value in ('++', '--') and not self.newline:
+            return ('update', self.advance()[1], False, expression)
+        return expression
+
+    def arguments(self) -> list:
+        self.expect('(')
+        args = []
+        while not self.accept(')'):
+            if self.at('...'):
+                raise Unsupported('spread argument')
+            args.append(self.assignment())
+            if not self.accept(','):
+                self.expect(')')
+                break
+        return args
+
+    def call_member(self, allow_call: bool = True) -> tuple:
+        if self.accept('new'):
+            callee = self.call_member(allow_call=False)
+            expression = ('new', callee, self.arguments() if self.at('(') else [])
+        else:
+            expression = self.primary()
+        while True:
+            if self.accept('.'):
+                if self.kind != 'name':
+                    raise Unsupported(f'expected a property name, got {self.value!r}')
+                expression = ('member', expression, ('literal', self.advance()[1]))
+            elif self.accept('['):
+                expression = ('member', expression, self.expression())
+                self.expect(']')
+            elif allow_call and self.at('('):
+                expression = ('call', expression, self.arguments())
+            elif self.at('?.') or self.kind == 'template':
+                raise Unsupported(f'{self.value[:2]} expression')
+            else:
+                return expression
+
+    def function_rest(self) -> Tuple[list, list]:
+        self.expect('(')
+        params = []
+        while not self.accept(')'):
+            params.append(self.name())
+            if not self.accept(','):
+                self.expect(')')
+                break
+        self.expect('{')
+        body = self.statements()
+        self.expect('}')
+        return params, body
+
+    def primary(self) -> tuple:
+        kind, value = self.advance()
+        if kind == 'number':
+            if value[:2] in ('0x', '0X', '0o', '0O', '0b', '0B'):
+                return ('literal', int(value, 0))
+            if len(value) > 1 and value[0] == '0' and value.isdigit():
+                raise Unsupported('legacy octal literal')
+            return ('literal', _number(float(value)) if any(c in value for c in '.eE') else _number(int(value)))
+        if kind == 'string':
+            return ('literal', _string_value(value))
+        if kind == 'template':
+            return self._template(value)
+        if kind == 'regex':
+            return ('regex', *value)
+        if kind == 'name':
+            if value == 'function':
+                name = self.name() if self.kind == 'name' and self.value not in _KEYWORDS else None
+                params, body = self.function_rest()
+                return ('function', name, params, body, False)
+            if value in ('true', 'false'):
+                return ('literal', value == 'true')
+            if value == 'null':
+                return ('literal', None)
+            if value == 'this':
+                return ('this',)
+            if value in _KEYWORDS:
+                raise Unsupported(f'unexpected {value!r}')
+            return ('name', value)
+        if value == '(':
+            expression = self.expression()
+            self.expect(')')
+            return expression
+        if value == '[':
+            elements = []
+            while not self.accept(']'):
+                if self.at(','):
+                    self.advance()
+                    elements.append(('literal', JS_Undefined))
+                    continue
+                if self.at('...'):
+                    raise Unsupported('spread element')
+                elements.append(self.assignment())
+                if not self.accept(','):
+                    self.expect(']')
+                    break
+            return ('array', elements)
+        if value == '{':
+            return self._object()
+        raise Unsupported(f'unexpected {value!r} at {self.pos}')
+
+    def _object(self) -> tuple:
+        properties = []
+        while not self.accept('}'):
+            kind, key = self.advance()
+            if kind == 'string':
+                key = ('literal', _string_value(key))
+            elif kind == 'number':
+                key = ('literal', to_string(self.__class__(key).primary()[1]))
+            elif kind == 'name':
+                if key in ('get', 'set', 'async') and not (self.at(':') or self.at('(') or self.at(',') or self.at('}')):
+                    raise Unsupported(f'{key} accessor')
+                key = ('literal', key)
+            elif key == '[':
+                key = self.assignment()
+                self.expect(']')
+            else:
+                raise Unsupported(f'object key {key!r}')
+            if self.accept(':'):
+                value = self.assignment()
+            elif self.at('('):
+                params, body = self.function_rest()
+                value = ('function', None, params, body, False)
+            elif kind == 'name':
+                value = ('name', key[1])
+            else:
+                raise Unsupported('object property without a value')
+            properties.append((key, value))
+            if not self.accept(','):
+                self.expect('}')
+                break
+        return ('object', properties)
+
+    def _template(self, literal: str) -> tuple:
+        parts, text, i = [], [], 1
+        while i < len(literal) - 1:
+            if literal.startswith('${', i):
+                parts.append(('literal', _string_value('`' + ''.join(text) + '`')))
+                text = []
+                parser = self.__class__(literal, i + 2)
+                parts.append(parser.expression())
+                if not parser.at('}'):
+                    raise Unsupported('template expression')
+                i = parser.pos
+            else:
+                if literal[i] == '\\':
+                    text.append(literal[i])
+                    i += 1
+                text.append(literal[i])
+                i += 1
+        parts.append(('literal', _string_value('`' + ''.join(text) + '`')))
+        return ('template', parts)
+
+
+# Compiler ---------------------------------------------------------------------
+
+_BREAK = object()
+_CONTINUE = object()
+_RETURN = object()
+_THIS = '%this'
+
+
+class _Scope:
+    """Names declared by one function, in the frame at ``depth``."""
+
+    def __init__(self, parent: Optional['_Scope'], params: list, body: list, arrow: bool, name: Optional[str]):
+        self.parent = parent
+        self.depth = parent.depth + 1 if parent else 0
+        self.arrow = arrow
+        self.functions: List[tuple] = []
+        self.names = dict.fromkeys(params)
+        if name and name not in self.names:
+            self.names[name] = None
+        self.uses_arguments = False
+        self._declare(body)
+        # arguments is only made when used and not shadowed by a declaration.
+        self.uses_arguments = self.uses_arguments and 'arguments' not in self.names
+        if self.uses_arguments:
+            self.names['arguments'] = None
+
+    def _declare(self, node):
+        """Hoist the var and function declarations of a function body."""
+        if isinstance(node, list):
+            for item in node:
+                self._declare(item)
+            return
+        if not isinstance(node, tuple) or not node:
+            return
+        kind = node[0]
+        if kind == 'var':
+            for name, init in node[1]:
+                self.names.setdefault(name, None)
+                self._declare(init)
+            return
+        if kind == 'function_declaration':
+            self.names.setdefault(node[1], None)
+            self.functions.append(node)
+            return
+        elif kind == 'for_in':
+            if node[3]:
+                self.names.setdefault(node[2], None)
+        elif kind == 'try' and node[2]:
+            self.names.setdefault(node[2], None)
+        elif kind == 'name' and node[1] == 'arguments':
+            self.uses_arguments = True
+        elif kind == 'function':
+            return
+        for field in node[1:]:
+            if isinstance(field, (list, tuple)):
+                self._declare(field)
+
+    def resolve(self, name: str) -> Optional[int]:
+        scope = self
+        while scope is not None:
+            if name in scope.names:
+                return scope.depth
+            scope = scope.parent
+        return None
+
+    def this_depth(self) -> Optional[int]:
+        """Depth of the frame holding ``this``, arrow functions take it from their parent."""
+        scope = self
+        while scope is not None and scope.arrow:
+            scope = scope.parent
+        return scope.depth if scope else None
+
+
+class _Globals:
+    """Names the compiled code doesn't declare, resolved from the player when first used."""
+
+    def __init__(self, compiler: 'Compiler'):
+        self._compiler = compiler
+        self._values: Dict[str, Any] = {}
+        self._resolving = set()
+
+    def get(self, name: str):
+        try:
+            return self._values[name]
+        except KeyError:
+            pass
+        if name in self._resolving:
+            raise Unsupported(f'{name} refers to itself while being defined')
+        self._resolving.add(name)
+        try:
+            value = self._compiler.resolve_global(name)
+        finally:
+            self._resolving.discard(name)
+        self._values[name] = value
+        return value
+
+    def defined(self, name: str) -> bool:
+        try:
+            self.get(name)
+        except Unsupported:
+            return False
+        return True
+
+    def set(self, name: str, value):
+        self._values[name] = value
+
+
+class Compiler:
+    """Compile functions of one player, sharing the player's global names.
+
+    :param JSInterpreter jsi:
+        Interpreter of the player, which locates the functions and objects.
+    """
+
+    def __init__(self, jsi: JSInterpreter):
+        self.jsi = jsi
+        self.globals = _Globals(self)
+
+    def compile_function(self, function_name: str) -> Callable[[list], Any]:
+        """Compile ``function_name`` as the interpreter extracts it.
+
+        :rtype: Callable[[list], Any]
+        :returns: A function taking the list of arguments, like the one of
+            :meth:`JSInterpreter.extract_function`.
+        :raises Unsupported: When the function can't be compiled.
+        """
+        try:
+            argnames, code = _fixup_n_function_code(*self.jsi.extract_function_code(function_name), self.jsi.code)
+        except JSInterpreter.Exception as e:
+            raise Unsupported(str(e))
+        function = self.compile_source([a for a in argnames if a], code)
+
+        def compiled(args: list):
+            return function(JS_Undefined, list(args))
+
+        return compiled
+
+    def compile_source(self, params: list, code: str, name: Optional[str] = None) -> Callable:
+        """Compile a function from its parameters and the code of its body."""
+        body = _Parser(code).statements(end=None)
+        return self._function(None, name, params, body, False)(())
+
+    def resolve_global(self, name: str):
+        if name in BUILTINS:
+            return BUILTINS[name]
+        try:
+            argnames, code = self.jsi.extract_function_code(name)
+        except JSInterpreter.Exception:
+            pass
+        else:
+            logger.debug(f'compiling the player function {name}')
+            return self.compile_source([a for a in argnames if a], code, name)
+
+        # Objects (the helpers of the signature function) are found as the
+        # interpreter finds them, other values from their first assignment.
+        m = re.search(
+            r'(?<![a-zA-Z$0-9.])%s\s*=\s*(?={\s*(?:(?:[a-zA-Z$0-9]+|"[a-zA-Z$0-9]+"|\'[a-zA-Z$0-9]+\')\s*:\s*function\b|}))'
+            % re.escape(name), self.jsi.code
+        ) or re.search(r'(?:\bvar\s+|[;,{(]\s*)%s\s*=(?![=>])' % re.escape(name), self.jsi.code)
+        if m is None:
+            raise Unsupported(f'{name} is not defined in the player')
+        logger.debug(f'compiling the player value {name}')
+        parser = _Parser(self.jsi.code, m.end())
+        return self._expression(None, parser.assignment())(())
+
+    # Functions and statements
+
+    def _function(self, scope: Optional[_Scope], name: Optional[str], params: list, body: list, arrow: bool):
+        inner = _Scope(scope, params, body, arrow, name)
+        run = self._block(inner, body)
+        declarations = [(f[1], self._function(inner, f[1], f[2], f[3], False)) for f in inner.functions]
+        template = dict.fromkeys(inner.names, JS_Undefined)
+        params = tuple(params)
+        uses_arguments = inner.uses_arguments
+        self_name = name if name and name not in params and not any(name == f[0] for f in declarations) else None
+
+        def make(frames: tuple):
+            def function(this, args):
+                scope = template.copy()
+                for i, param in enumerate(params):
+                    if i < len(args):
+                        scope[param] = args[i]
+                if not arrow:
+                    scope[_THIS] = GLOBAL_THIS if this is JS_Undefined or this is None else this
+                if uses_arguments:
+                    scope['arguments'] = list(args)
+                if self_name:
+                    scope[self_name] = function
+                local = frames + (scope,)
+                for declared, maker in declarations:
+                    scope[declared] = maker(local)
+                result = run(local)
+                if result is not None and result[0] is _RETURN:
+                    return result[1]
+                return JS_Undefined
+
+            return function
+
+        return make
+
+    def _block(self, scope: _Scope, body: list) -> Callable:
+        statements = [self._statement(scope, s) for s in body if s[0] not in ('empty', 'function_declaration')]
+        if len(statements) == 1:
+            return statements[0]
+
+        def block(frames):
+            for statement in statements:
+                result = statement(frames)
+                if result is not None:
+                    return result
+            return None
+
+        return block
+
+    def _statement(self, scope: _Scope, node: tuple) -> Callable:
+        kind = node[0]
+        if kind == 'expression':
+            expression = self._expression(scope, node[1])
+
+            def statement(frames):
+                expression(frames)
+
+            return statement
+        if kind == 'var':
+            assignments = [
+                self._expression(scope, ('assign', '=', ('name', name), init))
+                for name, init in node[1] if init is not None
+            ]
+
+            def statement(frames):
+                for assignment in assignments:
+                    assignment(frames)
+
+            return statement
+        if kind == 'return':
+            if node[1] is None:
+                return lambda frames: (_RETURN, JS_Undefined)
+            argument = self._expression(scope, node[1])
+            return lambda frames: (_RETURN, argument(frames))
+        if kind == 'block':
+            return self._block(scope, node[1])
+        if kind == 'if':
+            test = self._expression(scope, node[1])
+            consequent = self._statement(scope, node[2])
+            alternate = self._statement(scope, node[3]) if node[3] else None
+
+            def statement(frames):
+                if truthy(test(frames)):
+                    return consequent(frames)
+                if alternate is not None:
+                    return alternate(frames)
+                return None
+
+            return statement
+        if kind == 'for':
+            return self._for(scope, node)
+        if kind == 'do':
+            body, test = self._statement(scope, node[1]), self._expression(scope, node[2])
+
+            def statement(frames):
+                while True:
+                    result = body(frames)
+                    if result is not None:
+                        if result is _BREAK:
+                            break
+                        if result is not _CONTINUE:
+                            return result
+                    if not truthy(test(frames)):
+                        break
+                return None
+
+            return statement
+        if kind == 'for_in':
+            return self._for_in(scope, node)
+        if kind in ('break', 'continue'):
+            signal = _BREAK if kind == 'break' else _CONTINUE
+            return lambda frames: signal
+        if kind == 'throw':
+            argument = self._expression(scope, node[1])
+
+            def statement(frames):
+                raise JSError(argument(frames))
+
+            return statement
+        if kind == 'try':
+            return self._try(scope, node)
+        if kind == 'switch':
+            return self._switch(scope, node)
+        if kind == 'empty':
+            return lambda frames: None
+        raise Unsupported(f'{kind} statement')
+
+    def _for(self, scope: _Scope, node: tuple) -> Callable:
+        _, init, test, update, body = node
+        init = self._statement(scope, init) if init else None
+        test = self._expression(scope, test) if test else None
+        update = self._expression(scope, update) if update else None
+        body = self._statement(scope, body)
+
+        def statement(frames):
+            if init is not None:
+                init(frames)
+            while test is None or truthy(test(frames)):
+                result = body(frames)
+                if result is not None:
+                    if result is _BREAK:
+                        break
+                    if result is not _CONTINUE:
+                        return result
+                if update is not None:
+                    update(frames)
+            return None
+
+        return statement
+
+    def _for_in(self, scope: _Scope, node: tuple) -> Callable:
+        _, kind, name, _, iterable, body = node
+        assign = self._assignment(scope, ('name', name))
+        iterable = self._expression(scope, iterable)
+        body = self._statement(scope, body)
+
+        def statement(frames):
+            obj = iterable(frames)
+            if kind == 'in':
+                if obj is None or obj is JS_Undefined:
+                    return None
+                keys = _own_keys(obj) if type(obj) is dict else [str(i) for i in range(len(obj))] if type(obj) in (list, str) else None
+            else:
+                keys = list(obj) if type(obj) in (list, str) else None
+            if keys is None:
+                raise Unsupported(f'for {kind} over {typeof(obj)}')
+            for key in keys:
+                assign(frames, key)
+                result = body(frames)
+                if result is not None:
+                    if result is _BREAK:
+                        break
+                    if result is not _CONTINUE:
+                        return result
+            return None
+
+        return statement
+
+    def _try(self, scope: _Scope, node: tuple) -> Callable:
+        _, block, param, handler, finalizer = node
+        block = self._statement(scope, block)
+        handler = self._statement(scope, handler) if handler else None
+        finalizer = self._statement(scope, finalizer) if finalizer else None
+        depth = scope.resolve(param) if param else None
+
+        def statement(frames):
+            try:
+                if handler is None:
+                    return block(frames)
+                try:
+                    return block(frames)
+                except JSError as e:
+                    if param:
+                        frames[depth][param] = e.value
+                    return handler(frames)
+            finally:
+                # As in JavaScript, leaving the finally block replaces the outcome.
+                if finalizer is not None:
+                    result = finalizer(frames)
+                    if result is not None:
+                        return result
+
+        return statement
+
+    def _switch(self, scope: _Scope, node: tuple) -> Callable:
+        _, discriminant, cases = node
+        discriminant = self._expression(scope, discriminant)
+        tests = [self._expression(scope, test) if test is not None else None for test, _ in cases]
+        bodies = [[self._statement(scope, s) for s in body] for _, body in cases]
+        default = next((i for i, test in enumerate(tests) if test is None), None)
+
+        def statement(frames):
+            value = discriminant(frames)
+            start = next(
+                (i for i, test in enumerate(tests) if test is not None and strict_equals(value, test(frames))),
+                default)
+            if start is None:
+                return None
+            for body in bodies[start:]:
+                for s in body:
+                    result = s(frames)
+                    if result is not None:
+                        return None if result is _BREAK else result
+            return None
+
+        return statement
+
+    # Expressions
+
+    def _expression(self, scope: Optional[_Scope], node: tuple) -> Callable:
+        kind = node[0]
+        if kind == 'literal':
+            value = node[1]
+            return lambda frames: value
+        if kind == 'name':
+            return self._name(scope, node[1])
+        if kind == 'this':
+            depth = scope.this_depth() if scope else None
+            if depth is None:
+                return lambda frames: GLOBAL_THIS
+            return lambda frames: frames[depth][_THIS]
+        if kind == 'member':
+            obj = self._expression(scope, node[1])
+            if node[2][0] == 'literal':
+                key = node[2][1]
+                return lambda frames: get_property(obj(frames), key)
+            key = self._expression(scope, node[2])
+            return lambda frames: get_property(obj(frames), key(frames))
+        if kind == 'call':
+            return self._call(scope, node)
+        if kind == 'new':
+            callee = self._expression(scope, node[1])
+            args = [self._expression(scope, a) for a in node[2]]
+            return lambda frames: _construct(callee(frames), [a(frames) for a in args])
+        if kind == 'binary':
+            return self._binary(scope, node)
+        if kind == 'logical':
+            _, op, left, right = node
+            left, right = self._expression(scope, left), self._expression(scope, right)
+
+            def logical(frames):
+                value = left(frames)
+                if op == '&&':
+                    return right(frames) if truthy(value) else value
+                if op == '||':
+                    return value if truthy(value) else right(frames)
+                return right(frames) if value is None or value is JS_Undefined else value
+
+            return logical
+        if kind == 'unary':
+            return self._unary(scope, node)
+        if kind == 'update':
+            _, op, prefix, target = node
+            delta = 1 if op == '++' else -1
+
+            def update(value):
+                old = to_number(value)
+                return _add(old, delta), old
+
+            return self._modify(scope, target, update, prefix)
+        if kind == 'assign':
+            return self._assign(scope, node)
+        if kind == 'conditional':
+            test, consequent, alternate = (self._expression(scope, n) for n in node[1:])
+            return lambda frames: consequent(frames) if truthy(test(frames)) else alternate(frames)
+        if kind == 'sequence':
+            expressions = [self._expression(scope, n) for n in node[1]]
+
+            def sequence(frames):
+                for expression in expressions:
+                    value = expression(frames)
+                return value
+
+            return sequence
+        if kind == 'array':
+            elements = [self._expression(scope, n) for n in node[1]]
+            return lambda frames: [e(frames) for e in elements]
+        if kind == 'object':
+            properties = [(self._expression(scope, k), self._expression(scope, v)) for k, v in node[1]]
+            return lambda frames: {to_property_key(k(frames)): v(frames) for k, v in properties}
+        if kind == 'function':
+            _, name, params, body, arrow = node
+            return self._function(scope, name, params, body, arrow)
+        if kind == 'regex':
+            _, source, flags = node
+            RegExp(source, flags)
+            return lambda frames: RegExp(source, flags)
+        if kind == 'template':
+            parts = [self._expression(scope, n) for n in node[1]]
+            return lambda frames: ''.join(to_string(p(frames)) for p in parts)
+        raise Unsupported(f'{kind} expression')
+
+    def _name(self, scope: Optional[_Scope], name: str) -> Callable:
+        depth = scope.resolve(name) if scope else None
+        if depth is not None:
+            return lambda frames: frames[depth][name]
+        get = self.globals.get
+        return lambda frames: get(name)
+
+    def _call(self, scope: _Scope, node: tuple) -> Callable:
+        _, callee, args = node
+        args = [self._expression(scope, a) for a in args]
+        if callee[0] == 'member':
+            obj = self._expression(scope, callee[1])
+            if callee[2][0] == 'literal':
+                key = callee[2][1]
+
+                def method_call(frames):
+                    this = obj(frames)
+                    function = get_property(this, key)
+                    if not _is_function(function):
+                        raise _type_error(f'{to_string(key)} is not a function')
+                    return function(this, [a(frames) for a in args])
+
+                return method_call
+            key_of = self._expression(scope, callee[2])
+
+            def computed_call(frames):
+                this = obj(frames)
+                function = get_property(this, key_of(frames))
+                if not _is_function(function):
+                    raise _type_error(f'{typeof(function)} is not a function')
+                return function(this, [a(frames) for a in args])
+
+            return computed_call
+        function_of = self._expression(scope, callee)
+
+        def function_call(frames):
+            function = function_of(frames)
+            if not _is_function(function):
+                raise _type_error(f'{typeof(function)} is not a function')
+            return function(JS_Undefined, [a(frames) for a in args])
+
+        return function_call
+
+    def _binary(self, scope: _Scope, node: tuple) -> Callable:
+        _, op, left, right = node
+        left, right = self._expression(scope, left), self._expression(scope, right)
+        function = _BINARY_FUNCTIONS[op]
+        return lambda frames: function(left(frames), right(frames))
+
+    def _unary(self, scope: _Scope, node: tuple) -> Callable:
+        _, op, argument = node
+        if op == 'typeof' and argument[0] == 'name' and (scope is None or scope.resolve(argument[1]) is None):
+            name, globals_ = argument[1], self.globals
+            return lambda frames: typeof(globals_.get(name)) if globals_.defined(name) else 'undefined'
+        if op == 'delete':
+            if argument[0] != 'member':
+                raise Unsupported('delete of a name')
+            obj, key = self._expression(scope, argument[1]), self._expression(scope, argument[2])
+            return lambda frames: _delete_property(obj(frames), key(frames))
+        value = self._expression(scope, argument)
+        if op == '!':
+            return lambda frames: not truthy(value(frames))
+        if op == '-':
+            return lambda frames: _number(-to_number(value(frames)))
+        if op == '+':
+            return lambda frames: to_number(value(frames))
+        if op == '~':
+            return lambda frames: ~_to_int32(value(frames))
+        if op == 'typeof':
+            return lambda frames: typeof(value(frames))
+        if op == 'void':
+            return lambda frames: (value(frames), JS_Undefined)[1]
+        raise Unsupported(f'unary {op}')
+
+    def _assignment(self, scope: Optional[_Scope], target: tuple) -> Callable:
+        """Function storing a value into the name ``target``."""
+        name = target[1]
+        depth = scope.resolve(name) if scope else None
+        if depth is not None:
+            def assign(frames, value):
+                frames[depth][name] = value
+        else:
+            def assign(frames, value):
+                self.globals.set(name, value)
+        return assign
+
+    def _assign(self, scope: Optional[_Scope], node: tuple) -> Callable:
+        _, op, target, value = node
+        value = self._expression(scope, value)
+        if op == '=':
+            if target[0] == 'name':
+                name = target[1]
+                depth = scope.resolve(name) if scope else None
+                if depth is not None:
+                    def assign_local(frames):
+                        v = frames[depth][name] = value(frames)
+                        return v
+                    return assign_local
+                assign = self._assignment(scope, target)
+
+                def assign_global(frames):
+                    v = value(frames)
+                    assign(frames, v)
+                    return v
+
+                return assign_global
+            obj, key = self._expression(scope, target[1]), self._expression(scope, target[2])
+
+            def assign_member(frames):
+                o, k = obj(frames), key(frames)
+                v = value(frames)
+                set_property(o, k, v)
+                return v
+
+            return assign_member
+        if op in ('&&=', '||=', '??='):
+            raise Unsupported(f'{op} assignment')
+        function = _BINARY_FUNCTIONS[op[:-1]]
+
+        def update(frames, old):
+            new = function(old, value(frames))
+            return new, new
+
+        return self._modify(scope, target, update, True, pass_frames=True)
+
+    def _modify(self, scope: _Scope, target: tuple, update: Callable, prefix: bool, pass_frames: bool = False):
+        """Read ``target``, store what ``update`` makes of it, return the new or old value."""
+        if target[0] == 'name':
+            read = self._name(scope, target[1])
+            store = self._assignment(scope, target)
+
+            def modify(frames):
+                new, old = update(frames, read(frames)) if pass_frames else update(read(frames))
+                store(frames, new)
+                return new if prefix else old
+
+            return modify
+        if target[0] != 'member':
+            raise Unsupported(f'update of {target[0]}')
+        obj, key = self._expression(scope, target[1]), self._expression(scope, target[2])
+
+        def modify_member(frames):
+            o, k = obj(frames), key(frames)
+            old = get_property(o, k)
+            new, old = update(frames, old) if pass_frames else update(old)
+            set_property(o, k, new)
+            return new if prefix else old
+
+        return modify_member
+
+
+def compile_function(jsi: JSInterpreter, function_name: str) -> Optional[Callable[[list], Any]]:
+    """Compile ``function_name`` of the player into Python closures.
+
+    :param JSInterpreter jsi:
+        Interpreter of the player.
+    :param str function_name:
+        Name of the function.
+    :rtype: Optional[Callable[[list], Any]]
+    :returns: The compiled function, called like the interpreter's with
+        the list of arguments, or None if it uses something unsupported.
+        Parts of the player it refers to are compiled when first reached, and
+        may still raise :class:`Unsupported` when it runs.
+    """
+    try:
+        return Compiler(jsi).compile_function(function_name)
+    except (Unsupported, RecursionError) as e:
+        logger.debug(f'cannot compile {function_name}: {e}')
+        return None
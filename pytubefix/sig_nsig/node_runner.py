@@ -1,17 +1,40 @@
 import os
 import json
+import logging
 import subprocess
-import nodejs_wheel.executable
+import threading
 
+try:
+    import nodejs_wheel.executable
+except ImportError:
+    # Not available everywhere (e.g. on Android), ciphers then run in Python.
+    nodejs_wheel = None
+
+logger = logging.getLogger(__name__)
 
 RUNNER_PATH = os.path.join(os.path.dirname(__file__), "vm", "runner.js")
-NODE_DIR = nodejs_wheel.executable.ROOT_DIR
+NODE_DIR = nodejs_wheel.executable.ROOT_DIR if nodejs_wheel else None
+
+
+def node_available() -> bool:
+    """Whether a node executable is installed to run ciphers with."""
+    return NODE_DIR is not None and os.path.exists(NodeRunner._node_path())
+
 
 class NodeRunner:
     def __init__(self, code: str):
         self.code = code
         self.function_name = None
-        self.proc = subprocess.Popen(
+        self.closed = False
+        # Runners are shared between threads through the cipher registry,
+        # a request and its reply must not interleave with another one.
+        self._lock = threading.RLock()
+        self.proc = self._start()
+
+    def _start(self) -> subprocess.Popen:
+        if NODE_DIR is None:
+            raise RuntimeError("nodejs_wheel isn't installed, node is unavailable")
+        return subprocess.Popen(
             [self._node_path(), RUNNER_PATH],
             stdin=subprocess.PIPE,
             stdout=subprocess.PIPE,
@@ -29,10 +52,39 @@ class NodeRunner:
         exposed = f"_exposed['{fun_name}']={fun_name};" + "})(_yt_player);"
         return code.replace("})(_yt_player);", exposed)
 
-    def _send(self, data):
+    def _exchange(self, data):
         self.proc.stdin.write(json.dumps(data) + "\n")
         self.proc.stdin.flush()
-        return json.loads(self.proc.stdout.readline())
+        line = self.proc.stdout.readline()
+        if not line:
+            raise BrokenPipeError(f"node exited with code {self.proc.poll()}")
+        return json.loads(line)
+
+    def _restart(self):
+        """Replace a dead node process and load the function again."""
+        logger.debug(f"node runner for {self.function_name} died, restarting it")
+        self._kill()
+        self.proc = self._start()
+        if self.function_name is not None:
+            self._exchange({"type": "load", "code": self._exposed(self.code, self.function_name)})
+
+    def _send(self, data):
+        with self._lock:
+            if self.closed:
+                raise BrokenPipeError("node runner is closed")
+            if self.proc.poll() is not None:
+                self._restart()
+            try:
+                return self._exchange(data)
+            except (OSError, ValueError):
+                # The process crashed (or was killed) while handling the
+                # request, retry once on a fresh one.
+                self._restart()
+                return self._exchange(data)
+
+    @property
+    def alive(self) -> bool:
+        return self.proc.poll() is None
 
     def load_function(self, function_name: str):
         self.function_name = function_name
@@ -41,7 +93,29 @@ class NodeRunner:
     def call(self, args: list):
         return self._send({"type": "call", "fun": self.function_name, "args": args or []})
 
-    def close(self):
-        self.proc.stdin.close()
+    def call_batch(self, calls: list) -> list:
+        """Call the loaded function once per argument list, in a single round trip.
+
+        A call that throws yields ``{"error": message}`` in its place instead
+        of failing the whole batch.
+        """
+        if not calls:
+            return []
+        results = self._send({"type": "batch", "fun": self.function_name, "calls": calls})
+        if not isinstance(results, list):
+            # The batch itself failed, e.g. the function isn't loaded.
+            return [results] * len(calls)
+        return results
+
+    def _kill(self):
+        try:
+            self.proc.stdin.close()
+        except OSError:
+            pass
         self.proc.terminate()
-        self.proc.wait()
\ No newline at end of file
+        self.proc.wait()
+
+    def close(self):
+        with self._lock:
+            self.closed = True
+            self._kill()
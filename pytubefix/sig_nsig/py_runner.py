@@ -0,0 +1,194 @@
+"""In-process replacement for :class:`NodeRunner <NodeRunner>`.
+
+Used where node isn't available (e.g. the Android build). Functions are
+built with :class:`JSInterpreter <JSInterpreter>` once per runner instead of
+once per call. A signature function made only of the usual array transforms
+(reverse, splice, swap of a helper object) is compiled further into a plan
+of native list operations, so a call costs microseconds. Other functions,
+nsig included, are compiled into Python closures by
+:mod:`js_compiler <pytubefix.sig_nsig.js_compiler>`, which is tens of times
+faster than interpreting them. Either is only used once it gave the same
+results as the interpreter for the probe calls, the interpreter runs the
+function otherwise.
+"""
+import logging
+import re
+from typing import Callable, List, Optional, Tuple
+
+from pytubefix.jsinterp import JSInterpreter
+from pytubefix.sig_nsig.js_compiler import compile_function
+
+logger = logging.getLogger(__name__)
+
+_SPLIT_RE = re.compile(r'^([\w$]+)\s*=\s*\1\s*\.\s*split\(\s*(["\'])\2\s*\)$')
+_JOIN_RE = re.compile(r'^return\s+([\w$]+)\s*\.\s*join\(\s*(["\'])\2\s*\)$')
+_TRANSFORM_RE = re.compile(
+    r'^(?P<obj>[\w$]+)\s*(?:\.\s*(?P<attr>[\w$]+)|\[\s*(?P<q>["\'])(?P<key>[\w$]+)(?P=q)\s*\])'
+    r'\s*\(\s*(?P<arg>[\w$]+)\s*(?:,\s*(?P<n>\d+)\s*)?\)$'
+)
+
+# Inputs used to check a compiled plan against the interpreter.
+_probe_inputs = ('abcdefghijklmnopqrstuvwxyz', '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ-_abcdefghijklmnopqrstuvwxyz=')
+
+
+def _reverse(a: list, _):
+    a.reverse()
+
+
+def _splice(a: list, n: int):
+    del a[:n]
+
+
+def _swap(a: list, n: int):
+    i = n % len(a)
+    a[0], a[i] = a[i], a[0]
+
+
+def _classify(transform: Callable) -> Optional[Callable]:
+    """Native equivalent of a helper transform, found from its behaviour."""
+    for native in (_reverse, _splice, _swap):
+        try:
+            for n in (3, 7, 45):
+                expected, actual = list('abcdefghijklmnopqrstuvwxyz'), list('abcdefghijklmnopqrstuvwxyz')
+                native(expected, n)
+                transform([actual, n])
+                if actual != expected:
+                    break
+            else:
+                return native
+        except Exception:
+            continue
+    return None
+
+
+def compile_transform_plan(
+    jsi: JSInterpreter, function_name: str, global_var: Tuple = (None, None, None)
+) -> Optional[Callable[[str], str]]:
+    """Compile a ``split / helper transforms / join`` function into native operations.
+
+    :param JSInterpreter jsi:
+        Interpreter of the player.
+    :param str function_name:
+        Name of the signature function.
+    :param tuple global_var:
+        ``(code, name, value)`` of the player's global variable, which the
+        helper transforms may index.
+    :rtype: Optional[Callable[[str], str]]
+    :returns: The compiled function, or None if it doesn't have that shape.
+    """
+    try:
+        argnames, code = jsi.extract_function_code(function_name)
+    except JSInterpreter.Exception:
+        return None
+    if len(argnames) != 1:
+        return None
+
+    statements = [s.strip() for s in code.split(';') if s.strip()]
+    if (
+        len(statements) < 2
+        or not _SPLIT_RE.match(statements[0])
+        or not _JOIN_RE.match(statements[-1])
+    ):
+        return None
+
+    _, global_name, global_value = global_var or (None, None, None)
+    global_stack = []
+    if global_name:
+        try:
+            global_stack.append({global_name: jsi.interpret_expression(global_value, {}, 100)})
+        except Exception:
+            return None
+
+    helpers = {}
+    plan: List[Tuple[Callable, int]] = []
+    for statement in statements[1:-1]:
+        match = _TRANSFORM_RE.match(statement)
+        if match is None or match.group('arg') != argnames[0]:
+            return None
+        obj = match.group('obj')
+        if obj not in helpers:
+            try:
+                helpers[obj] = jsi.extract_object(obj, *global_stack)
+            except JSInterpreter.Exception:
+                return None
+        transform = helpers[obj].get(match.group('attr') or match.group('key'))
+        native = transform and _classify(transform)
+        if native is None:
+            return None
+        plan.append((native, int(match.group('n') or 0)))
+
+    def deciphered(signature: str) -> str:
+        a = list(signature)
+        for native, n in plan:
+            native(a, n)
+        return ''.join(a)
+
+    return deciphered
+
+
+class PythonRunner:
+    """Same interface as :class:`NodeRunner <NodeRunner>`, without a subprocess."""
+
+    def __init__(
+        self,
+        code: str,
+        interpreter: Optional[JSInterpreter] = None,
+        global_var: Tuple = (None, None, None)
+    ):
+        self.code = code
+        self.global_var = global_var
+        self.function_name = None
+        self.closed = False
+        self.compiled = False
+        self._jsi = interpreter or JSInterpreter(code)
+        self._function = None
+
+    @property
+    def alive(self) -> bool:
+        return not self.closed
+
+    def load_function(self, function_name: str, probe_calls: Optional[List[list]] = None):
+        """Build ``function_name``, compiled when it agrees with the interpreter.
+
+        :param str function_name:
+            Name of the function in the player.
+        :param list probe_calls:
+            Argument lists the compiled and interpreted functions are compared
+            on, the probe inputs alone by default.
+        """
+        self.function_name = function_name
+        self.compiled = False
+        interpreted = self._jsi.extract_function(function_name)
+        plan = compile_transform_plan(self._jsi, function_name, self.global_var)
+        if plan is not None:
+            compiled, form = (lambda args: plan(*args)), 'native list operations'
+        else:
+            compiled, form = compile_function(self._jsi, function_name), 'python closures'
+        if compiled is not None:
+            calls = probe_calls or [[s] for s in _probe_inputs]
+            try:
+                self.compiled = all(compiled(list(args)) == interpreted(list(args)) for args in calls)
+            except Exception as e:
+                logger.debug(f'running {function_name} failed while checking its compiled form: {e}')
+            if not self.compiled:
+                logger.debug(f'compiled {function_name} disagrees with the interpreter, interpreting it')
+        if self.compiled:
+            logger.debug(f'compiled {function_name} into {form}')
+            self._function = compiled
+        else:
+            self._function = interpreted
+        return {"loaded": True}
+
+    def call(self, args: list):
+        if self.closed:
+            raise BrokenPipeError("runner is closed")
+        try:
+            return self._function(args or [])
+        except Exception as e:
+            return {"error": str(e)}
+
+    def call_batch(self, calls: list) -> list:
+        return [self.call(args) for args in calls]
+
+    def close(self):
+        self.closed = True
@@ -0,0 +1,123 @@
+"""Cut a function of the player out of base.js, together with what it uses.
+
+Node only needs the decipher function, not the whole multi-megabyte player.
+:func:`slice_function` collects the definition of the function and,
+transitively, of every top-level name it refers to, and wraps them in a small
+script shaped like the player (``...})(_yt_player);``) so
+:class:`NodeRunner <NodeRunner>` can load it the same way.
+
+The dependency search is lexical, it can't be proven right for every player:
+callers must check the slice behaves like the full player before relying on
+it, see :class:`Cipher <Cipher>`.
+"""
+import logging
+import re
+from typing import Optional, Tuple
+
+from pytubefix.jsinterp import JSInterpreter
+
+logger = logging.getLogger(__name__)
+
+# A slice bigger than this share of the player isn't worth it.
+max_slice_ratio = 0.2
+max_definitions = 300
+
+_STRINGS_RE = re.compile(r'"(?:[^"\\\n]|\\.)*"|\'(?:[^\'\\\n]|\\.)*\'')
+_IDENTIFIER_RE = re.compile(r'(?<![\w$.])[a-zA-Z_$][\w$]*')
+_FUNCTION_ARGS_RE = re.compile(r'function\s*[\w$]*\s*\(([^)]*)\)')
+_DECLARATION_RE = re.compile(r'\b(?:var|let|const)\s+([\w$]+)')
+_CATCH_RE = re.compile(r'\bcatch\s*\(\s*([\w$]+)\s*\)')
+
+_BUILTINS = frozenset((
+    'break', 'case', 'catch', 'class', 'const', 'continue', 'debugger', 'default',
+    'delete', 'do', 'else', 'export', 'extends', 'finally', 'for', 'function', 'if',
+    'import', 'in', 'instanceof', 'let', 'new', 'of', 'return', 'super', 'switch',
+    'this', 'throw', 'try', 'typeof', 'var', 'void', 'while', 'with', 'yield',
+    'null', 'true', 'false', 'undefined', 'NaN', 'Infinity', 'arguments',
+    'Math', 'String', 'Number', 'Boolean', 'Array', 'Object', 'Date', 'RegExp',
+    'Error', 'TypeError', 'JSON', 'Symbol', 'Promise', 'Map', 'Set', 'Reflect',
+    'Uint8Array', 'parseInt', 'parseFloat', 'isNaN', 'isFinite',
+    'encodeURIComponent', 'decodeURIComponent', 'encodeURI', 'decodeURI',
+    'escape', 'unescape', 'window', 'document', 'navigator', 'location',
+    'console', 'globalThis', 'self', 'g', '_yt_player',
+))
+
+
+def _references(code: str) -> set:
+    """Free identifiers of ``code``: what it uses minus what it declares."""
+    code = _STRINGS_RE.sub('""', code)
+    local_names = set(_DECLARATION_RE.findall(code)) | set(_CATCH_RE.findall(code))
+    for args in _FUNCTION_ARGS_RE.findall(code):
+        local_names.update(arg.strip() for arg in args.split(',') if arg.strip())
+    return set(_IDENTIFIER_RE.findall(code)) - local_names - _BUILTINS
+
+
+def _definition(jsi: JSInterpreter, name: str) -> Optional[str]:
+    """Top-level definition of ``name`` as a standalone statement, if found."""
+    try:
+        args, body = jsi.extract_function_code(name)
+        return f'var {name}=function({",".join(args)}){{{body}}};'
+    except JSInterpreter.Exception:
+        pass
+
+    match = re.search(
+        r'(?:\bvar\s+|[{;,]\s*)%s\s*=(?!=)\s*' % re.escape(name), jsi.code
+    )
+    if match is None:
+        return None
+    rest = jsi.code[match.end():]
+    # The value ends at the first `,` or `;` outside of brackets and strings.
+    value = min(
+        (next(JSInterpreter._separate(rest, delim, 1), '') for delim in (',', ';')),
+        key=len
+    ).strip()
+    if not value:
+        return None
+    return f'var {name}={value};'
+
+
+def slice_function(js: str, function_name: str, global_var: Tuple = (None, None, None)) -> Optional[str]:
+    """Standalone script defining ``function_name`` and everything it uses.
+
+    :param str js:
+        The contents of the base.js asset file.
+    :param str function_name:
+        Name of the function to slice out.
+    :param tuple global_var:
+        ``(code, name, value)`` of the player's global variable, as
+        returned by ``extract_player_js_global_var``.
+    :rtype: Optional[str]
+    :returns: The script, or None if the function couldn't be sliced.
+    """
+    jsi = JSInterpreter(js)
+    global_code, global_name, _ = global_var or (None, None, None)
+
+    definitions = {}
+    pending = [function_name]
+    while pending:
+        name = pending.pop()
+        if name in definitions or name == global_name:
+            continue
+        definition = _definition(jsi, name)
+        if definition is None:
+            if name == function_name:
+                return None
+            # Most likely a local of an enclosing function, or a browser global.
+            logger.debug(f'no definition found for {name}, leaving it out of the slice')
+            definitions[name] = ''
+            continue
+        definitions[name] = definition
+        if len(definitions) > max_definitions:
+            logger.debug(f'{function_name} depends on too many definitions, not slicing it')
+            return None
+        pending.extend(_references(definition.split('=', 1)[1]))
+
+    body = ''.join(definitions[name] for name in reversed(list(definitions)))
+    if global_code:
+        body = f'{global_code};{body}'
+    script = f"var _yt_player={{}};(function(g){{'use strict';{body}}})(_yt_player);"
+    if len(script) > len(js) * max_slice_ratio:
+        logger.debug(f'slice of {function_name} is too big to be worth it')
+        return None
+    logger.debug(f'sliced {function_name} out of the player: {len(script)} of {len(js)} bytes')
+    return script
@@ -13,12 +13,15 @@ from math import ceil
 import sys
 
 from datetime import datetime, timezone
-from typing import BinaryIO, Dict, Optional, Tuple, Iterator, Callable
+from typing import BinaryIO, Dict, Optional, Tuple, Iterator, Callable, Union
 from urllib.error import HTTPError
 from urllib.parse import parse_qs
 from pathlib import Path
 
-from pytubefix import extract, request
+from pytubefix import bandwidth, extract, request
+from pytubefix.bandwidth import TokenBucket
+from pytubefix.download_journal import DownloadJournal, journal_suffix
+from pytubefix.file_sink import FileSink
 from pytubefix.helpers import target_directory
 from pytubefix.itags import get_format_profile
 from pytubefix.monostate import Monostate
@@ -216,6 +219,10 @@ class Stream:
             Filesize (in bytes) of the stream.
         """
         if self._filesize == 0:
+            if self.is_otf:
+                # OTF streams only answer sequential requests, don't wait for the 404.
+                self._filesize = request.seq_filesize(self.url)
+                return self._filesize
             try:
                 self._filesize = request.filesize(self.url)
             except HTTPError as e:
@@ -294,12 +301,30 @@ class Stream:
         :rtype: int
         :returns: size of video in bytes
         """
+        bits_in_byte = 8
         if self._monostate.duration and self.bitrate:
-            bits_in_byte = 8
             return int(
                 (self._monostate.duration * self.bitrate) / bits_in_byte
             )
 
+        if self.durationMs and self.bitrate:
+            return int(
+                (int(self.durationMs) * self.bitrate) / (bits_in_byte * 1000)
+            )
+
+        return self.filesize
+
+    def _progress_filesize(self) -> int:
+        """Total size used to report download progress.
+
+        OTF streams carry no contentLength and their exact size takes one
+        request per segment, so their approximate size is used instead.
+        Every other stream reports its exact :attr:`filesize`.
+
+        :rtype: int
+        """
+        if self._filesize == 0 and self.is_otf:
+            return self.filesize_approx
         return self.filesize
 
     @property
@@ -307,6 +332,17 @@ class Stream:
         expire = parse_qs(self.url.split("?")[1])["expire"][0]
         return datetime.fromtimestamp(int(expire), timezone.utc)
 
+    @property
+    def is_expired(self) -> bool:
+        """Whether the signed url has expired and must be resolved again.
+
+        :rtype: bool
+        """
+        try:
+            return self.expiration <= datetime.now(timezone.utc)
+        except (KeyError, IndexError, ValueError):
+            return False
+
     @property
     def default_filename(self) -> str:
         """Generate filename based on the video title.
@@ -328,7 +364,12 @@ class Stream:
         skip_existing: bool = True,
         timeout: Optional[int] = None,
         max_retries: int = 0,
-        interrupt_checker: Optional[Callable[[], bool]] = None
+        interrupt_checker: Optional[Callable[[], bool]] = None,
+        connections: int = 1,
+        resume: bool = False,
+        use_mmap: bool = False,
+        buffer_size: Optional[int] = None,
+        rate_limit: Optional[Union[float, TokenBucket]] = None
     ) -> Optional[str]:
         
         """
@@ -342,6 +383,11 @@ class Stream:
             timeout (Optional[int]): Maximum time, in seconds, to wait for the download request. Defaults to None for no timeout.
             max_retries (int): The number of times to retry the download if it fails. Defaults to 0 (no retries).
             interrupt_checker (Optional[Callable[[], bool]]): A callable function that is checked periodically during the download. If it returns True, the download will stop without errors.
+            connections (int): Number of concurrent connections used to fetch the file as separate byte ranges. Defaults to 1 (a single sequential connection).
+            resume (bool): Whether to continue a previously interrupted download from its journal file instead of starting over. Defaults to False.
+            use_mmap (bool): Write ranged downloads through a memory map of the preallocated file instead of positional writes. Only used together with `connections` > 1 or `resume`. Defaults to False.
+            buffer_size (Optional[int]): Read the response into a reusable buffer of this many bytes instead of allocating a new chunk for every read. The chunks passed to `on_progress` are then memoryviews that are only valid during the callback. Ignored for parallel ranged downloads and SABR streams. Defaults to None.
+            rate_limit (Optional[Union[float, TokenBucket]]): Maximum throughput of this download in bytes per second, or a `TokenBucket` shared with other downloads. The process-wide limit set with `bandwidth.set_global_limit` applies on top of it. Not applied to SABR streams. Defaults to None.
 
         Returns:
             Optional[str]: The full file path of the downloaded file, or None if the download was skipped or failed.
@@ -352,6 +398,8 @@ class Stream:
         Note:
             - The `skip_existing` flag avoids redownloading if the file already exists in the target location.
             - The `interrupt_checker` allows for the download to be halted cleanly if certain conditions are met during the download process.
+            - With `connections` > 1 the ranges are written at their offsets as they arrive, but `on_progress` is still fired in byte order. OTF streams fetch up to `connections` segments concurrently instead. SABR streams are always downloaded sequentially.
+            - With `resume` the completed byte ranges (or OTF segments) are recorded in a journal next to the output file, which is removed once the download completes. An expired stream url is re-resolved before resuming. SABR streams can't be resumed.
             - Download progress can be monitored using the `on_progress` callback, and the `on_complete` callback is triggered once the download is finished.
         """
    
@@ -384,21 +432,62 @@ class Stream:
             self.on_complete(file_path)
             return file_path
 
-        bytes_remaining = self.filesize
-        logger.debug(f'downloading ({self.filesize} total bytes) file to {file_path}')
+        file_size = self._progress_filesize()
+        bytes_remaining = file_size
+        logger.debug(f'downloading ({file_size} total bytes) file to {file_path}')
+
+        # Downloads over several connections write out of order (ranged streams
+        # preallocate the file), so they always keep a journal to tell a partial
+        # file from a complete one. So do OTF streams, whose exact size is only
+        # known once they are downloaded and can't tell a partial file either.
+        journal = None
+        if not self.is_sabr and (resume or connections > 1 or self.is_otf):
+            # The approximate size of OTF streams would change with the
+            # duration, the journal only records an exact size.
+            journal_size = self._filesize if self.is_otf else file_size
+            if resume:
+                journal = DownloadJournal.load(file_path, self.itag, journal_size)
+            else:
+                journal = DownloadJournal(file_path, self.itag, journal_size)
 
         def write_chunk(chunk_, bytes_remaining_):
             # send to the on_progress callback.
             self.on_progress(chunk_, fh, bytes_remaining_)
 
+        if journal is not None:
+            resuming = not journal.is_empty
+            if resuming:
+                logger.debug(f'resuming download of {file_path}, {journal.completed_bytes} bytes already on disk')
+                if self.is_expired:
+                    self.refresh_url()
+            # Written before the file, so that it's never taken for complete.
+            journal.save()
+
+            with FileSink(file_path, resume=resuming, use_mmap=use_mmap) as fh:
+                if not self._download_with_journal(
+                    fh,
+                    journal,
+                    connections=connections,
+                    timeout=timeout,
+                    max_retries=max_retries,
+                    interrupt_checker=interrupt_checker,
+                    buffer_size=buffer_size,
+                    rate_limit=rate_limit
+                ):
+                    return
+            self.on_complete(file_path)
+            return file_path
 
-        with open(file_path, "wb") as fh:
+        with FileSink(file_path) as fh:
             try:
                 if not self.is_sabr:
                     for chunk in request.stream(
                         self.url,
                         timeout=timeout,
-                        max_retries=max_retries
+                        max_retries=max_retries,
+                        file_size=self._filesize,
+                        chunk_size=buffer_size,
+                        rate_limit=rate_limit
                     ):
                         if interrupt_checker is not None and interrupt_checker() == True:
                             logger.debug('interrupt_checker returned True, causing to force stop the downloading')
@@ -419,7 +508,9 @@ class Stream:
                     for chunk in request.seq_stream(
                         self.url,
                         timeout=timeout,
-                        max_retries=max_retries
+                        max_retries=max_retries,
+                        chunk_size=buffer_size,
+                        rate_limit=rate_limit
                     ):
                         if interrupt_checker is not None and interrupt_checker() == True:
                             logger.debug('interrupt_checker returned True, causing to force stop the downloading')
@@ -434,6 +525,189 @@ class Stream:
             self.on_complete(file_path)
             return file_path
 
+    def _download_with_journal(
+        self,
+        fh: FileSink,
+        journal: DownloadJournal,
+        connections: int = 1,
+        timeout: Optional[int] = None,
+        max_retries: int = 0,
+        interrupt_checker: Optional[Callable[[], bool]] = None,
+        buffer_size: Optional[int] = None,
+        rate_limit: Optional[Union[float, TokenBucket]] = None
+    ) -> bool:
+        """Download whatever ``journal`` doesn't have yet into ``fh``.
+
+        A stream whose first byte range is not found (404) is requested with
+        sequence numbers instead, like OTF streams. If the stream url is
+        rejected later on with 403 or 404 (it usually expired), it is
+        re-resolved once and the download continues where it stopped.
+
+        :rtype: bool
+        :returns:
+            False if the download was stopped by ``interrupt_checker``.
+        """
+        # One bucket for the whole download, across a refreshed url too.
+        rate_limit = bandwidth.as_bucket(rate_limit)
+        sequential = self.is_otf or journal.next_segment > 0
+        refreshed = False
+        while True:
+            try:
+                if sequential:
+                    completed = self._download_segments(
+                        fh, journal, connections=connections, timeout=timeout,
+                        max_retries=max_retries, interrupt_checker=interrupt_checker,
+                        buffer_size=buffer_size, rate_limit=rate_limit
+                    )
+                else:
+                    completed = self._download_ranges(
+                        fh, journal, connections=connections, timeout=timeout,
+                        max_retries=max_retries, interrupt_checker=interrupt_checker,
+                        rate_limit=rate_limit
+                    )
+            except HTTPError as e:
+                if e.code == 404 and not sequential and journal.is_empty:
+                    # Some adaptive streams need to be requested with sequence numbers
+                    logger.debug('the stream has no byte ranges, requesting its segments')
+                    sequential = True
+                    continue
+                if e.code not in (403, 404) or refreshed:
+                    raise
+                logger.debug('the stream url was rejected, re-resolving it')
+                self.refresh_url()
+                refreshed = True
+            else:
+                if completed:
+                    journal.remove()
+                return completed
+
+    def _download_ranges(
+        self,
+        fh: FileSink,
+        journal: DownloadJournal,
+        connections: int = 1,
+        timeout: Optional[int] = None,
+        max_retries: int = 0,
+        interrupt_checker: Optional[Callable[[], bool]] = None,
+        rate_limit: Optional[TokenBucket] = None
+    ) -> bool:
+        """Fetch the byte ranges missing from ``journal`` into ``fh``.
+
+        The file is preallocated to :attr:`filesize` and every range is written
+        at its own offset by the worker that fetched it, while ``on_progress``
+        is still fired in byte order.
+
+        :rtype: bool
+        :returns:
+            False if the download was stopped by ``interrupt_checker``.
+        """
+        file_size = journal.file_size
+        if journal.is_empty:
+            fh.preallocate(file_size)
+
+        bytes_remaining = file_size - journal.completed_bytes
+        ranges = request.parallel_stream(
+            self.url,
+            file_size,
+            connections=connections,
+            timeout=timeout,
+            max_retries=max_retries,
+            write_at=fh.write_at,
+            ranges=journal.missing_ranges(request.default_range_size),
+            rate_limit=rate_limit
+        )
+        try:
+            for offset, chunk in ranges:
+                journal.add_range(offset, offset + len(chunk))
+                journal.save()
+                if interrupt_checker is not None and interrupt_checker() == True:
+                    logger.debug('interrupt_checker returned True, causing to force stop the downloading')
+                    return False
+                bytes_remaining -= len(chunk)
+                # The chunk is already on disk, only notify the callback.
+                self.on_progress_for_chunks(chunk, bytes_remaining)
+        finally:
+            ranges.close()
+        return True
+
+    def _download_segments(
+        self,
+        fh: FileSink,
+        journal: DownloadJournal,
+        connections: int = 1,
+        timeout: Optional[int] = None,
+        max_retries: int = 0,
+        interrupt_checker: Optional[Callable[[], bool]] = None,
+        buffer_size: Optional[int] = None,
+        rate_limit: Optional[TokenBucket] = None
+    ) -> bool:
+        """Fetch the OTF segments missing from ``journal`` into ``fh``.
+
+        Up to ``connections`` segments are fetched concurrently, they are
+        still written in order. Whatever was written after the last complete
+        segment is discarded. Once all segments are written, their total is
+        kept as the exact :attr:`filesize`.
+
+        :rtype: bool
+        :returns:
+            False if the download was stopped by ``interrupt_checker``.
+        """
+        fh.truncate(journal.segment_offset)
+        fh.seek(journal.segment_offset)
+        # Progress is reported against the approximate size, unless the exact
+        # one is known already.
+        bytes_remaining = max(self._progress_filesize() - journal.segment_offset, 0)
+
+        def on_segment(seq_num: int, segment_count: int):
+            fh.flush()
+            journal.add_segment(seq_num, segment_count, fh.tell())
+            journal.save()
+
+        segments = request.seq_stream(
+            self.url,
+            timeout=timeout,
+            max_retries=max_retries,
+            start_segment=journal.next_segment,
+            segment_count=journal.segment_count,
+            on_segment=on_segment,
+            concurrency=connections,
+            chunk_size=buffer_size,
+            rate_limit=rate_limit
+        )
+        try:
+            for chunk in segments:
+                if interrupt_checker is not None and interrupt_checker() == True:
+                    logger.debug('interrupt_checker returned True, causing to force stop the downloading')
+                    return False
+                bytes_remaining = max(bytes_remaining - len(chunk), 0)
+                self.on_progress(chunk, fh, bytes_remaining)
+        finally:
+            segments.close()
+        fh.flush()
+        self._filesize = fh.tell()
+        return True
+
+    def refresh_url(self) -> None:
+        """Re-resolve :attr:`url`, e.g. after it expired.
+
+        The streams of the parent :class:`YouTube <YouTube>` object are
+        fetched again and the url of the stream with the same itag and audio
+        track is taken over.
+        """
+        youtube = self._monostate.youtube
+        if youtube is None or not hasattr(youtube, 'fmt_streams'):
+            logger.debug('unable to refresh the stream url without a YouTube object')
+            return
+
+        youtube.vid_info = None
+        youtube._fmt_streams = None
+        for stream in youtube.fmt_streams:
+            if stream.itag == self.itag and stream.audio_track_name == self.audio_track_name:
+                self.url = stream.url
+                logger.debug(f'refreshed the url of itag {self.itag}')
+                return
+        logger.debug(f'itag {self.itag} is no longer available, keeping the old url')
+
     def get_file_path(
         self,
         filename: Optional[str] = None,
@@ -458,22 +732,38 @@ class Stream:
         return str(Path(target_directory(output_path)) / filename)
 
     def exists_at_path(self, file_path: str) -> bool:
-        return (
-            os.path.isfile(file_path)
-            and os.path.getsize(file_path) == self.filesize
-        )
-
-    def stream_to_buffer(self, buffer: BinaryIO) -> None:
+        # A journal means the file is only partially downloaded.
+        if not os.path.isfile(file_path) or os.path.isfile(file_path + journal_suffix):
+            return False
+        # The exact size of an OTF stream takes a request per segment, a file
+        # whose size can't be checked is downloaded again rather than trusted.
+        if self.is_otf and self._filesize == 0:
+            return False
+        return os.path.getsize(file_path) == self.filesize
+
+    def stream_to_buffer(
+        self,
+        buffer: Union[BinaryIO, FileSink],
+        buffer_size: Optional[int] = None
+    ) -> None:
         """Write the media stream to buffer
 
+        A :class:`FileSink <FileSink>` is preallocated to the stream size
+        before writing when that size is known from the manifest.
+
+        :param int buffer_size:
+            (Optional) Read the response into a reusable buffer of this many
+            bytes, see :meth:`download`.
         :rtype: io.BytesIO buffer
         """
+        if isinstance(buffer, FileSink) and self._filesize:
+            buffer.preallocate(buffer.tell() + self._filesize)
         bytes_remaining = self.filesize
         logger.info(
             "downloading (%s total bytes) file to buffer", self.filesize,
         )
 
-        for chunk in request.stream(self.url):
+        for chunk in request.stream(self.url, file_size=self._filesize, chunk_size=buffer_size):
             # reduce the (bytes) remainder by the length of the chunk.
             bytes_remaining -= len(chunk)
             # send to the on_progress callback.
@@ -566,7 +856,12 @@ class Stream:
         if self._monostate.on_progress:
             self._monostate.on_progress(self, chunk, bytes_remaining)
 
-    def iter_chunks(self, chunk_size: Optional[int] = None) -> Iterator[bytes]:
+    def iter_chunks(
+        self,
+        chunk_size: Optional[int] = None,
+        connections: int = 1,
+        rate_limit: Optional[Union[float, TokenBucket]] = None
+    ) -> Iterator[bytes]:
         """Get the chunks directly
 
         Example:
@@ -583,27 +878,35 @@ class Stream:
 
         :param int chunk size:
         The size in the bytes
+        :param int connections:
+        Number of OTF segments fetched concurrently, they are still yielded in order.
+        :param rate_limit:
+        Maximum throughput in bytes per second, or a shared :class:`TokenBucket`.
         :rtype: Iterator[bytes]
         """
 
-        bytes_remaining = self.filesize
+        bytes_remaining = self._progress_filesize()
 
         if chunk_size:
             request.default_range_size = chunk_size
 
         logger.info(
             "downloading (%s total bytes) file to buffer",
-            self.filesize,
+            bytes_remaining,
         )
         try:
-            stream = request.stream(self.url)
+            if self.is_otf:
+                stream = request.seq_stream(self.url, concurrency=connections, rate_limit=rate_limit)
+            else:
+                stream = request.stream(self.url, file_size=self._filesize, rate_limit=rate_limit)
         except HTTPError as e:
             if e.code != 404:
                 raise
-            stream = request.seq_stream(self.url)
+            stream = request.seq_stream(self.url, concurrency=connections, rate_limit=rate_limit)
 
         for chunk in stream:
-            bytes_remaining -= len(chunk)
+            # The size of OTF streams is approximate.
+            bytes_remaining = max(bytes_remaining - len(chunk), 0)
             self.on_progress_for_chunks(chunk, bytes_remaining)
             yield chunk
 
@@ -0,0 +1,122 @@
+"""Process-wide pool of visitorData.
+
+Every InnerTube request must carry a visitorData, and any recent one works for
+any video. Fetching one per video costs a watch page or an extra player call.
+:data:`visitor_data_provider` fetches one from the lightweight ``visitor_id``
+endpoint, hands it out for ``ttl`` seconds, and refreshes it on a background
+thread shortly before it expires so callers practically never wait. The
+visitorData found in pages downloaded anyway (playlists, watch pages) is fed
+back into the pool with :meth:`VisitorDataProvider.offer`.
+
+A shared visitorData also lets the poTokens minted for it be reused across
+videos, see :mod:`pytubefix.botGuard.bot_guard`.
+"""
+import logging
+import threading
+import time
+from typing import Optional
+
+from pytubefix.innertube import InnerTube
+
+logger = logging.getLogger(__name__)
+
+
+def visitor_data_from_response(innertube_response: dict) -> str:
+    """visitorData of a raw InnerTube response.
+
+    :rtype: str
+    """
+    response_context = innertube_response['responseContext']
+    try:
+        return response_context['visitorData']
+    except KeyError:
+        p_dicts = response_context['serviceTrackingParams'][0]['params']
+        return next(p for p in p_dicts if p['key'] == 'visitor_data')['value']
+
+
+class VisitorDataProvider:
+    """Hands out a shared visitorData, refreshing it before it expires."""
+
+    def __init__(self, ttl: float = 6 * 60 * 60, refresh_ratio: float = 0.8):
+        """Construct a :class:`VisitorDataProvider <VisitorDataProvider>`.
+
+        :param float ttl:
+            Seconds a visitorData is used for.
+        :param float refresh_ratio:
+            Share of ``ttl`` after which the visitorData is refreshed in the
+            background while the current one is still handed out.
+        """
+        self.ttl = ttl
+        self.refresh_ratio = refresh_ratio
+        self._value: Optional[str] = None
+        self._obtained = 0.0
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._refreshing = False
+
+    def _age(self) -> float:
+        return time.monotonic() - self._obtained
+
+    def cached(self) -> Optional[str]:
+        """The current visitorData if it hasn't expired, without any request.
+
+        A refresh is started in the background once it is getting old.
+        """
+        value = self._value
+        if value is None or self._age() >= self.ttl:
+            return None
+        if self._age() >= self.ttl * self.refresh_ratio:
+            self._refresh_in_background()
+        return value
+
+    def get(self) -> str:
+        """A valid visitorData, fetched only if none is available.
+
+        :rtype: str
+        """
+        value = self.cached()
+        if value is not None:
+            return value
+        with self._lock:
+            # Another thread may have fetched it while this one waited.
+            value = self.cached()
+            if value is None:
+                value = self._fetch()
+            return value
+
+    def _fetch(self) -> str:
+        logger.debug('Requesting a visitorData from the visitor_id endpoint')
+        value = visitor_data_from_response(InnerTube('WEB').visitor_id())
+        self.offer(value)
+        logger.debug('VisitorData obtained successfully')
+        return value
+
+    def _refresh_in_background(self):
+        with self._refresh_lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(target=self._refresh, name='pytubefix-visitor-data', daemon=True).start()
+
+    def _refresh(self):
+        try:
+            with self._lock:
+                self._fetch()
+        except Exception as e:
+            # The current value keeps being used until it expires.
+            logger.debug(f'unable to refresh the visitorData: {e}')
+        finally:
+            self._refreshing = False
+
+    def offer(self, value: Optional[str]):
+        """Use ``value``, a visitorData YouTube just issued, from now on."""
+        if value:
+            self._value = value
+            self._obtained = time.monotonic()
+
+    def invalidate(self):
+        """Forget the current visitorData, e.g. once YouTube rejected it."""
+        self._value = None
+
+
+visitor_data_provider = VisitorDataProvider()
@@ -0,0 +1,56 @@
+import io
+import os
+import tempfile
+
+# The caches of pytubefix take their path when imported, the tests must
+# never write to the real user cache.
+os.environ['PYTUBEFIX_CACHE_DIR'] = tempfile.mkdtemp(prefix='pytubefix-tests-')
+
+import pytest
+
+from pytubefix import Stream, client_stats
+from pytubefix.monostate import Monostate
+
+
+@pytest.fixture(autouse=True)
+def client_statistics(monkeypatch):
+    """Statistics of the clients kept in memory, fresh for every test."""
+    stats = client_stats.ClientStats(path=None)
+    monkeypatch.setattr(client_stats, 'default_stats', stats)
+    return stats
+
+
+class FakeResponse(io.BytesIO):
+    """Stand-in for an ``http.client.HTTPResponse`` with a fixed body.
+
+    ``length`` is what ``http.client`` reports as still unread, a nonzero
+    value once the body ended means the connection dropped.
+    """
+
+    def __init__(self, body: bytes = b'', headers=None, length=None):
+        super().__init__(body)
+        self.headers = headers or {}
+        self.length = length
+
+    def info(self):
+        return self.headers
+
+
+@pytest.fixture
+def make_stream():
+    """Build a :class:`Stream` of ``size`` bytes without a YouTube object."""
+    def make(size=1000, itag=18, is_otf=False, **fields):
+        data = {
+            'url': 'https://example.com/videoplayback?id=1',
+            'itag': itag,
+            'mimeType': 'video/mp4; codecs="avc1.42001E, mp4a.40.2"',
+            'is_otf': is_otf,
+            'bitrate': 1,
+            'contentLength': str(size),
+            'approxDurationMs': '1000',
+            'lastModified': '1',
+        }
+        data.update(fields)
+        monostate = Monostate(on_progress=None, on_complete=None, title='video', duration=1)
+        return Stream(data, monostate, po_token=None, video_playback_ustreamer_config=None)
+    return make
@@ -0,0 +1,98 @@
+import asyncio
+
+import pytest
+
+from pytubefix import bandwidth, request
+from pytubefix.bandwidth import TokenBucket
+
+from .conftest import FakeResponse
+
+
+class FakeClock:
+    """Stand-in for the ``time`` module of :mod:`pytubefix.bandwidth`, sleeping advances it."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(bandwidth, 'time', fake)
+    monkeypatch.setattr(bandwidth, 'global_bucket', None)
+    return fake
+
+
+def test_bucket_goes_into_debt_and_refills(clock):
+    bucket = TokenBucket(100, burst=100)
+    assert bucket.reserve(100) == 0
+    assert bucket.reserve(50) == pytest.approx(0.5)
+    clock.now += 1
+    assert bucket.reserve(50) == 0
+    # An idle bucket refills up to its burst only.
+    clock.now += 10
+    assert bucket.reserve(150) == pytest.approx(0.5)
+
+
+def test_rate_must_be_positive():
+    with pytest.raises(ValueError):
+        TokenBucket(0)
+
+
+def test_throttle_waits_for_the_slowest_bucket(clock):
+    bandwidth.set_global_limit(50, burst=50)
+    own = TokenBucket(100, burst=100)
+    bandwidth.throttle(100, own)
+    # 1s for the global bucket, not 1s plus the 0s of the own bucket.
+    assert clock.sleeps == [pytest.approx(1.0)]
+    bandwidth.throttle(100, own)
+    # The own bucket refilled meanwhile, the global one is 2s behind.
+    assert clock.sleeps[-1] == pytest.approx(2.0)
+
+
+def test_global_bucket_is_shared_by_all_downloads(clock):
+    bandwidth.set_global_limit(100, burst=100)
+    assert bandwidth.is_limited(None)
+    bandwidth.throttle(100, bandwidth.as_bucket(None))
+    bandwidth.throttle(100, bandwidth.as_bucket(1000))
+    assert clock.sleeps == [pytest.approx(1.0)]
+    bandwidth.set_global_limit(None)
+    assert not bandwidth.is_limited(None)
+
+
+def test_shared_bucket_is_used_as_is(clock):
+    shared = TokenBucket(100, burst=100)
+    assert bandwidth.as_bucket(shared) is shared
+    bandwidth.throttle(100, shared)
+    bandwidth.throttle(100, bandwidth.as_bucket(shared))
+    assert clock.sleeps == [pytest.approx(1.0)]
+
+
+def test_throttle_async_does_not_block(clock, monkeypatch):
+    slept = []
+
+    async def sleep(seconds):
+        slept.append(seconds)
+
+    monkeypatch.setattr(bandwidth.asyncio, 'sleep', sleep)
+    bucket = TokenBucket(100, burst=100)
+    asyncio.run(bandwidth.throttle_async(150, bucket))
+    assert slept == [pytest.approx(0.5)]
+    assert clock.sleeps == []
+
+
+def test_limited_body_is_read_in_throttled_pieces(clock, monkeypatch):
+    monkeypatch.setattr(bandwidth, 'throttled_read_size', 100)
+    body = bytes(range(250))
+    bucket = TokenBucket(100, burst=100)
+    chunks = list(request._read_chunks(FakeResponse(body), bucket))
+    assert [len(chunk) for chunk in chunks] == [100, 100, 50]
+    assert sum(clock.sleeps) == pytest.approx(1.5)
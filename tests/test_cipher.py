@@ -0,0 +1,343 @@
+import contextlib
+import threading
+import time
+from unittest import mock
+
+import pytest
+
+from pytubefix import cipher, extract
+from pytubefix.cipher import Cipher, CipherRegistry
+from pytubefix.exceptions import InterpretationError
+from pytubefix.sig_nsig.node_runner import NodeRunner, node_available
+from pytubefix.sig_nsig.slicer import slice_function
+
+
+class FakeCipher:
+    """Records what a registry does with its ciphers instead of starting node."""
+
+    built = []
+    gates = {}
+
+    def __init__(self, js, js_url, backend=None):
+        gate = self.gates.get(js_url)
+        if gate is not None:
+            gate.wait(5)
+        if js == 'broken':
+            raise RuntimeError('cannot build')
+        self.js_url = js_url
+        self.closed = False
+        self.built.append(self)
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture(autouse=True)
+def fake_cipher():
+    FakeCipher.built = []
+    FakeCipher.gates = {}
+    with mock.patch.object(cipher, 'Cipher', FakeCipher):
+        yield
+
+
+def test_lease_reuses_the_cipher_of_a_player():
+    registry = CipherRegistry()
+    with registry.lease('js', 'https://p/a.js', 'python') as first:
+        pass
+    with registry.lease('js', 'https://p/a.js', 'python') as second:
+        pass
+    assert first is second
+    assert len(FakeCipher.built) == 1
+
+
+def test_concurrent_leases_of_a_player_build_it_once():
+    registry = CipherRegistry()
+    gate = FakeCipher.gates['https://p/a.js'] = threading.Event()
+    results = []
+
+    def lease():
+        with registry.lease('js', 'https://p/a.js', 'python') as c:
+            results.append(c)
+
+    threads = [threading.Thread(target=lease) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    gate.set()
+    for thread in threads:
+        thread.join()
+    assert len(FakeCipher.built) == 1
+    assert len(results) == 4 and all(c is results[0] for c in results)
+
+
+def test_a_cold_build_does_not_block_other_players():
+    registry = CipherRegistry()
+    gate = FakeCipher.gates['https://p/slow.js'] = threading.Event()
+
+    def lease_slow():
+        with registry.lease('js', 'https://p/slow.js', 'python'):
+            pass
+
+    slow = threading.Thread(target=lease_slow)
+    slow.start()
+    time.sleep(0.1)
+    try:
+        with registry.lease('js', 'https://p/fast.js', 'python') as fast:
+            assert fast.js_url == 'https://p/fast.js'
+        assert slow.is_alive()
+    finally:
+        gate.set()
+        slow.join()
+
+
+def test_failed_build_is_not_cached():
+    registry = CipherRegistry()
+    with pytest.raises(RuntimeError):
+        with registry.lease('broken', 'https://p/a.js', 'python'):
+            pass
+    with registry.lease('js', 'https://p/a.js', 'python') as c:
+        assert not c.closed
+
+
+def test_idle_eviction_spares_leased_ciphers():
+    registry = CipherRegistry(idle_timeout=0)
+    with registry.lease('js', 'https://p/a.js', 'python') as c:
+        registry.evict_idle()
+        assert not c.closed
+    registry.evict_idle()
+    assert c.closed
+
+
+def test_lru_eviction_closes_a_leased_cipher_only_once_returned():
+    registry = CipherRegistry(max_size=1)
+    with registry.lease('js', 'https://p/a.js', 'python') as old:
+        with registry.lease('js', 'https://p/b.js', 'python') as new:
+            assert not old.closed
+        assert not new.closed
+    assert old.closed
+    with registry.lease('js', 'https://p/b.js', 'python') as again:
+        assert again is new
+    assert len(FakeCipher.built) == 2
+
+
+def test_clear_waits_for_leases():
+    registry = CipherRegistry()
+    with registry.lease('js', 'https://p/a.js', 'python') as c:
+        registry.clear()
+        assert not c.closed
+    assert c.closed
+
+
+PLAYER = (
+    'var h={r:function(a){a.reverse()},s:function(a,b){a.splice(0,b)}};'
+    'function sig(a){a=a.split("");h.r(a,1);h.s(a,2);return a.join("")}'
+    'function nsig(a){return a+"x"}'
+)
+
+
+class FakeNodeRunner:
+    def __init__(self, code):
+        self.code = code
+
+    def load_function(self, function_name):
+        self.function_name = function_name
+
+    def close(self):
+        pass
+
+
+def bare_cipher(backend):
+    """A :class:`Cipher` of ``PLAYER`` without its function name extraction."""
+    bare = Cipher.__new__(Cipher)
+    bare.js = PLAYER
+    bare.js_interpreter = cipher.JSInterpreter(PLAYER)
+    bare.global_var = (None, None, None)
+    bare._sig_param_val = bare._nsig_param_val = None
+    bare._slices = {}
+    bare.backend = cipher.resolve_backend(backend)
+    bare._prefer_compiled_sig = backend == 'auto'
+    return bare
+
+
+@pytest.mark.parametrize('backend, sig_runner, nsig_runner', [
+    ('auto', cipher.PythonRunner, FakeNodeRunner),
+    ('node', FakeNodeRunner, FakeNodeRunner),
+    ('python', cipher.PythonRunner, cipher.PythonRunner),
+])
+def test_backend_of_each_function(backend, sig_runner, nsig_runner):
+    with mock.patch.object(cipher, 'NodeRunner', FakeNodeRunner), \
+            mock.patch.object(cipher, 'node_available', return_value=True), \
+            mock.patch.object(cipher, 'use_code_slices', False):
+        bare = bare_cipher(backend)
+        assert type(bare._start_runner('sig', 'sig')) is sig_runner
+        assert type(bare._start_runner('nsig', 'nsig')) is nsig_runner
+
+
+def test_python_backend_runs_the_compiled_functions():
+    with mock.patch.object(cipher, 'use_code_slices', False):
+        bare = bare_cipher('python')
+        sig_runner = bare._start_runner('sig', 'sig')
+        nsig_runner = bare._start_runner('nsig', 'nsig')
+    assert sig_runner.compiled and nsig_runner.compiled
+    assert sig_runner.call_batch([['abcdef']]) == ['dcba']
+    assert nsig_runner.call_batch([['ab'], ['c']]) == ['abx', 'cx']
+
+
+@pytest.mark.skipif(not node_available(), reason='node is not installed')
+def test_node_batch_is_one_round_trip():
+    player = (
+        'var _yt_player={};(function(g){'
+        'var nsig=function(a){if(a=="bad")throw new Error("boom");return a+"x"};'
+        '})(_yt_player);'
+    )
+    runner = NodeRunner(player)
+    try:
+        runner.load_function('nsig')
+        with mock.patch.object(runner, '_exchange', wraps=runner._exchange) as exchange:
+            # A throwing call only fails its own slot.
+            assert runner.call_batch([['ab'], ['bad'], ['c']]) == ['abx', {'error': 'boom'}, 'cx']
+            assert runner.call_batch([]) == []
+        assert exchange.call_count == 1
+    finally:
+        runner.close()
+
+
+def batching_cipher(sig_results, nsig_results):
+    """A :class:`Cipher` whose runners answer batches from the given functions."""
+    bare = bare_cipher('python')
+    bare.js_url = 'https://p/a.js'
+    bare.runner_sig = mock.Mock()
+    bare.runner_sig.call_batch.side_effect = lambda calls: [sig_results(*args) for args in calls]
+    bare.runner_nsig = mock.Mock()
+    bare.runner_nsig.call_batch.side_effect = lambda calls: [nsig_results(*args) for args in calls]
+    return bare
+
+
+@pytest.fixture
+def no_signature_cache():
+    with mock.patch.object(cipher, 'use_signature_cache', False):
+        yield
+
+
+def test_batch_deciphers_each_value_once(no_signature_cache):
+    bare = batching_cipher(lambda s: s[::-1], lambda n: n + 'x')
+    assert bare.get_sig_batch(['ab', 'cd', 'ab']) == {'ab': 'ba', 'cd': 'dc'}
+    assert bare.get_nsig_batch(['n1', 'n2', 'n1']) == {'n1': 'n1x', 'n2': 'n2x'}
+    bare.runner_sig.call_batch.assert_called_once_with([['ab'], ['cd']])
+    bare.runner_nsig.call_batch.assert_called_once_with([['n1'], ['n2']])
+
+
+def test_nsig_batch_tries_the_next_control_parameter_for_the_rest(no_signature_cache):
+    # The first parameter only suits the values starting with "a".
+    bare = batching_cipher(None, lambda param, n: n + str(param) if param == 2 or n[0] == 'a' else None)
+    bare._nsig_param_val = [1, 2]
+    assert bare.get_nsig_batch(['a', 'b']) == {'a': 'a1', 'b': 'b2'}
+    assert [c.args[0] for c in bare.runner_nsig.call_batch.call_args_list] == [[[1, 'a'], [1, 'b']], [[2, 'b']]]
+
+
+def test_failed_call_of_a_batch_raises(no_signature_cache):
+    bare = batching_cipher(lambda s: {'error': 'boom'} if s == 'bad' else s, lambda n: n)
+    with pytest.raises(InterpretationError):
+        bare.get_sig_batch(['ok', 'bad'])
+
+
+def test_apply_signature_deciphers_the_manifest_in_one_batch_each(no_signature_cache):
+    bare = batching_cipher(lambda s: s[::-1], lambda n: n + 'x')
+    manifest = [
+        {'itag': itag, 's': s, 'url': f'https://example.com/videoplayback?itag={itag}&n={n}'}
+        for itag, s, n in [(18, 'ab', 'n1'), (22, 'cd', 'n1'), (140, 'ab', 'n2')]
+    ]
+
+    @contextlib.contextmanager
+    def lease(js, js_url):
+        yield bare
+
+    with mock.patch.object(extract.cipher_registry, 'lease', lease):
+        extract.apply_signature(manifest, {}, PLAYER, 'https://p/a.js')
+    assert [stream['url'].split('?')[1] for stream in manifest] == [
+        'itag=18&n=n1x&sig=ba', 'itag=22&n=n1x&sig=dc', 'itag=140&n=n2x&sig=ba'
+    ]
+    assert bare.runner_sig.call_batch.call_count == bare.runner_nsig.call_batch.call_count == 1
+
+
+class ProbedNodeRunner(FakeNodeRunner):
+    """Node runner whose answers depend on the code it was given."""
+
+    outputs = {}
+    started = []
+
+    def __init__(self, code):
+        super().__init__(code)
+        self.closed = False
+        self.started.append(self)
+
+    def load_function(self, function_name):
+        if self.outputs[self.code] is None:
+            raise BrokenPipeError('node exited')
+        super().load_function(function_name)
+
+    def call_batch(self, calls):
+        return [self.outputs[self.code](args[-1]) for args in calls]
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.mark.parametrize('slice_output, sliced', [
+    (lambda n: n + 'x', True),
+    (lambda n: n + 'y', False),
+    (lambda n: {'error': 'g is not defined'}, False),
+    (None, False),
+])
+def test_slice_only_replaces_the_player_when_it_agrees(slice_output, sliced):
+    ProbedNodeRunner.outputs = {PLAYER: lambda n: n + 'x', 'SLICE': slice_output}
+    ProbedNodeRunner.started = []
+    with mock.patch.object(cipher, 'NodeRunner', ProbedNodeRunner), \
+            mock.patch.object(cipher, 'node_available', return_value=True), \
+            mock.patch.object(cipher, 'slice_function', return_value='SLICE') as slicer:
+        bare = bare_cipher('node')
+        runner = bare._start_runner('nsig', 'nsig')
+        full, candidate = ProbedNodeRunner.started
+        assert runner is (candidate if sliced else full)
+        assert (full.closed, candidate.closed) == (sliced, not sliced)
+        assert bare._slices == {'nsig': 'SLICE' if sliced else None}
+
+        # The outcome is remembered, the slice isn't tried again.
+        ProbedNodeRunner.started = []
+        again = bare._start_runner('nsig', 'nsig')
+        assert [r.code for r in ProbedNodeRunner.started] == ['SLICE' if sliced else PLAYER]
+        assert again.code == ('SLICE' if sliced else PLAYER)
+    slicer.assert_called_once()
+
+
+def test_slice_keeps_what_the_function_uses():
+    player = (
+        "var _yt_player={};(function(g){var window=this;"
+        + 'var unused=function(a){return a};' * 200 + PLAYER
+        + "})(_yt_player);"
+    )
+    code = slice_function(player, 'sig')
+    assert 'unused' not in code and 'var h=' in code
+    assert cipher.JSInterpreter(code).extract_function('sig')(['abcdef']) == 'dcba'
+    assert slice_function(player, 'missing') is None
+
+
+def test_slice_is_not_trusted_against_a_failing_player():
+    ProbedNodeRunner.outputs = {PLAYER: lambda n: {'error': 'boom'}, 'SLICE': lambda n: {'error': 'boom'}}
+    ProbedNodeRunner.started = []
+    with mock.patch.object(cipher, 'NodeRunner', ProbedNodeRunner), \
+            mock.patch.object(cipher, 'node_available', return_value=True), \
+            mock.patch.object(cipher, 'slice_function', return_value='SLICE'):
+        runner = bare_cipher('node')._start_runner('nsig', 'nsig')
+    assert runner.code == PLAYER and not runner.closed
+
+
+def test_evict_closes_every_backend_of_a_player():
+    registry = CipherRegistry()
+    with registry.lease('js', 'https://p/a.js', 'python') as failed:
+        with registry.lease('js', 'https://p/b.js', 'python') as other:
+            registry.evict('https://p/a.js')
+            assert not failed.closed
+    assert failed.closed and not other.closed
+    with registry.lease('js', 'https://p/a.js', 'python') as rebuilt:
+        assert rebuilt is not failed
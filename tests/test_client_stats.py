@@ -0,0 +1,39 @@
+import pytest
+
+from pytubefix.client_stats import ClientStats, url_traits
+
+
+def test_url_traits():
+    assert url_traits('https://music.youtube.com/watch?v=abc') == {'any', 'music'}
+    assert url_traits('https://www.youtube.com/shorts/abc') == {'any', 'shorts'}
+    assert url_traits('https://youtu.be/abc') == {'any'}
+
+
+def test_rank_prefers_the_client_that_served_such_videos():
+    stats = ClientStats(path=None)
+    for _ in range(3):
+        stats.record({'any', 'music'}, 'ANDROID_VR', False)
+        stats.record({'any', 'music'}, 'IOS', True)
+    assert stats.rank({'any', 'music'}, ['ANDROID_VR', 'TV', 'IOS']) == ['IOS', 'TV', 'ANDROID_VR']
+
+
+def test_rank_keeps_the_order_without_history():
+    stats = ClientStats(path=None)
+    assert stats.rank({'any'}, ['ANDROID_VR', 'TV', 'IOS']) == ['ANDROID_VR', 'TV', 'IOS']
+
+
+def test_counts_decay(monkeypatch):
+    stats = ClientStats(path=None, half_life=10)
+    now = [1000.0]
+    monkeypatch.setattr('pytubefix.client_stats.time.time', lambda: now[0])
+    stats.record({'any'}, 'IOS', True)
+    fresh = stats.score({'any'}, 'IOS')
+    now[0] += 100
+    assert 0.5 < stats.score({'any'}, 'IOS') < fresh
+
+
+def test_statistics_survive_a_restart(tmp_path):
+    path = str(tmp_path / 'client_stats.json')
+    stats = ClientStats(path=path, save_interval=0)
+    stats.record({'any'}, 'IOS', True)
+    assert ClientStats(path=path).score({'any'}, 'IOS') == pytest.approx(stats.score({'any'}, 'IOS'))
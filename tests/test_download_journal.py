@@ -0,0 +1,84 @@
+import json
+from unittest import mock
+
+from pytubefix import request
+from pytubefix.download_journal import DownloadJournal, journal_suffix
+
+from .conftest import FakeResponse
+
+
+def test_missing_ranges_are_the_gaps_split_in_pieces(tmp_path):
+    journal = DownloadJournal(str(tmp_path / 'video.mp4'), 18, 1000)
+    journal.add_range(0, 250)
+    journal.add_range(500, 750)
+    journal.add_range(250, 300)
+    assert journal.ranges == [[0, 300], [500, 750]]
+    assert journal.completed_bytes == 550
+    assert journal.missing_ranges(150) == [(300, 449), (450, 499), (750, 899), (900, 999)]
+
+
+def test_journal_round_trip(tmp_path):
+    file_path = tmp_path / 'video.mp4'
+    file_path.write_bytes(bytes(1000))
+    journal = DownloadJournal(str(file_path), 18, 1000)
+    journal.add_range(0, 250)
+    journal.save()
+
+    loaded = DownloadJournal.load(str(file_path), 18, 1000)
+    assert loaded.ranges == [[0, 250]]
+    # Another format, or a partial file that doesn't match, starts over.
+    assert DownloadJournal.load(str(file_path), 22, 1000).is_empty
+    assert DownloadJournal.load(str(file_path), 18, 2000).is_empty
+    file_path.write_bytes(bytes(10))
+    assert DownloadJournal.load(str(file_path), 18, 1000).is_empty
+
+
+def test_resume_fetches_only_the_missing_ranges(make_stream, tmp_path):
+    body = bytes(range(250)) * 4
+    file_path = tmp_path / 'video.mp4'
+    # The first and the third range were written before the interruption.
+    file_path.write_bytes(body[:250] + bytes(250) + body[500:750] + bytes(250))
+    journal = DownloadJournal(str(file_path), 18, 1000)
+    journal.add_range(0, 250)
+    journal.add_range(500, 750)
+    journal.save()
+
+    requested = []
+
+    def execute(url, start, stop, **kwargs):
+        requested.append((start, stop))
+        return FakeResponse(body[start:stop + 1])
+
+    stream = make_stream(size=1000)
+    with mock.patch.object(request, 'default_range_size', 250), \
+            mock.patch.object(request, '_execute_range_request', side_effect=execute):
+        stream.download(output_path=str(tmp_path), filename='video.mp4', resume=True)
+
+    assert sorted(requested) == [(250, 499), (750, 999)]
+    assert file_path.read_bytes() == body
+    assert not (tmp_path / ('video.mp4' + journal_suffix)).exists()
+
+
+def test_resume_continues_otf_segments(make_stream, tmp_path):
+    segments = [b'a' * 100, b'b' * 100, b'c' * 100]
+    file_path = tmp_path / 'video.mp4'
+    # The second segment was cut off halfway.
+    file_path.write_bytes(segments[0] + segments[1][:50])
+    with open(str(file_path) + journal_suffix, 'w') as f:
+        json.dump({'itag': 18, 'file_size': 0, 'ranges': [], 'next_segment': 1,
+                   'segment_count': 2, 'segment_offset': 100}, f)
+
+    started = []
+
+    def seq_stream(url, start_segment=0, segment_count=None, on_segment=None, **kwargs):
+        started.append(start_segment)
+        for seq_num in range(start_segment, len(segments)):
+            yield segments[seq_num]
+            on_segment(seq_num, len(segments) - 1)
+
+    stream = make_stream(size=0, is_otf=True)
+    with mock.patch.object(request, 'seq_stream', side_effect=seq_stream):
+        stream.download(output_path=str(tmp_path), filename='video.mp4', resume=True)
+
+    assert started == [1]
+    assert file_path.read_bytes() == b''.join(segments)
@@ -0,0 +1,74 @@
+import errno
+import os
+
+import pytest
+
+from pytubefix.file_sink import FileSink
+
+BLOCKS = [(8, b'ijkl'), (0, b'abcd'), (4, b'efgh')]
+
+
+@pytest.mark.parametrize('use_mmap', [False, True])
+@pytest.mark.parametrize('has_pwrite', [True, False])
+def test_write_at_fills_the_file_out_of_order(tmp_path, monkeypatch, use_mmap, has_pwrite):
+    if not has_pwrite:
+        monkeypatch.delattr(os, 'pwrite', raising=False)
+    path = tmp_path / 'video.mp4'
+    with FileSink(str(path), use_mmap=use_mmap) as sink:
+        sink.preallocate(12)
+        assert (sink._mmap is not None) == use_mmap
+        for offset, data in BLOCKS:
+            assert sink.write_at(offset, data) == len(data)
+        # Positional writes leave the file position alone.
+        assert sink.tell() == 0
+    assert path.read_bytes() == b'abcdefghijkl'
+
+
+def test_mmap_sink_writes_past_the_map_to_the_file(tmp_path):
+    path = tmp_path / 'video.mp4'
+    with FileSink(str(path), use_mmap=True) as sink:
+        sink.preallocate(4)
+        sink.write_at(0, b'abcd')
+        sink.write_at(4, b'efgh')
+    assert path.read_bytes() == b'abcdefgh'
+
+
+@pytest.mark.parametrize('fallocate', ['fails', 'missing'])
+def test_preallocate_extends_the_file_without_fallocate(tmp_path, monkeypatch, fallocate):
+    if fallocate == 'fails':
+        def unsupported(fd, offset, size):
+            raise OSError(errno.EOPNOTSUPP, 'Operation not supported')
+        monkeypatch.setattr(os, 'posix_fallocate', unsupported, raising=False)
+    else:
+        monkeypatch.delattr(os, 'posix_fallocate', raising=False)
+    path = tmp_path / 'video.mp4'
+    with FileSink(str(path)) as sink:
+        sink.preallocate(1000)
+        sink.write_at(996, b'tail')
+    assert os.path.getsize(path) == 1000
+    assert path.read_bytes().endswith(b'\0tail')
+
+
+def test_sink_behaves_like_a_file_handle(tmp_path):
+    path = tmp_path / 'video.mp4'
+    with FileSink(str(path)) as sink:
+        sink.write(b'abcdef')
+        assert sink.seek(-2, os.SEEK_CUR) == 4
+        sink.write(b'EF')
+        assert sink.seek(0, os.SEEK_END) == 6
+        sink.seek(3)
+        assert sink.truncate() == 3
+    assert sink.closed
+    assert path.read_bytes() == b'abc'
+
+
+def test_resumed_sink_keeps_the_content(tmp_path):
+    path = tmp_path / 'video.mp4'
+    path.write_bytes(b'abcd')
+    with FileSink(str(path), resume=True) as sink:
+        sink.write_at(4, b'efgh')
+    assert path.read_bytes() == b'abcdefgh'
+    # Without resume the file starts over.
+    with FileSink(str(path)) as sink:
+        sink.write(b'new')
+    assert path.read_bytes() == b'new'
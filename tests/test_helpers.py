@@ -0,0 +1,59 @@
+import os
+from unittest import mock
+
+from pytubefix import helpers
+from pytubefix.sig_cache import SignatureCache
+
+
+def test_user_cache_dir_can_be_overridden(tmp_path):
+    with mock.patch.dict(os.environ, {'PYTUBEFIX_CACHE_DIR': str(tmp_path)}):
+        assert helpers.user_cache_dir() == str(tmp_path)
+        assert SignatureCache().path == os.path.join(str(tmp_path), 'signatures.sqlite3')
+
+
+def test_user_cache_dir_is_outside_the_package(tmp_path):
+    env = {'PYTUBEFIX_CACHE_DIR': '', 'ANDROID_PRIVATE': '', 'XDG_CACHE_HOME': str(tmp_path)}
+    with mock.patch.dict(os.environ, env), \
+            mock.patch.object(helpers.os, 'name', 'posix'), \
+            mock.patch.object(helpers.sys, 'platform', 'linux'):
+        assert helpers.user_cache_dir() == os.path.join(str(tmp_path), 'pytubefix')
+
+
+def test_user_cache_dir_uses_the_private_directory_on_android(tmp_path):
+    env = {'PYTUBEFIX_CACHE_DIR': '', 'ANDROID_PRIVATE': str(tmp_path)}
+    with mock.patch.dict(os.environ, env):
+        assert helpers.user_cache_dir() == os.path.join(str(tmp_path), 'cache', 'pytubefix')
+
+
+def test_reset_cache_leaves_the_user_cache_alone(tmp_path):
+    with mock.patch.dict(os.environ, {'PYTUBEFIX_CACHE_DIR': str(tmp_path)}), \
+            mock.patch.object(helpers.shutil, 'rmtree') as rmtree:
+        helpers.reset_cache()
+    assert all(str(tmp_path) not in str(call.args[0]) for call in rmtree.call_args_list)
+
+
+def test_clear_user_cache_removes_only_its_own_entries(tmp_path):
+    from pytubefix import client_stats, player_store
+    from pytubefix.botGuard import bot_guard
+
+    (tmp_path / 'notes.txt').write_text('mine')
+    store = player_store.PlayerStore(directory=str(tmp_path / 'players'))
+    store.save('https://youtube.com/s/player/abc/player_ias.vflset/en_US/base.js', 'js')
+    signatures = SignatureCache(path=str(tmp_path / 'signatures.sqlite3'))
+    signatures.put_many('https://youtube.com/s/player/abc/player_ias.vflset/en_US/base.js', 'sig', {'a': 'b'})
+    tokens = bot_guard.PoTokenService(worker=mock.Mock(), path=str(tmp_path / 'po_tokens.json'))
+    (tmp_path / 'po_tokens.json').write_text('{}')
+    stats = client_stats.ClientStats(path=str(tmp_path / 'client_stats.json'))
+    stats.record(['live'], 'WEB', True)
+    stats.flush()
+
+    with mock.patch.object(player_store, 'default_store', store), \
+            mock.patch('pytubefix.sig_cache.signature_cache', signatures), \
+            mock.patch.object(bot_guard, 'po_token_service', tokens), \
+            mock.patch.object(client_stats, 'default_stats', stats):
+        helpers.clear_user_cache()
+
+    assert sorted(os.listdir(tmp_path)) == ['notes.txt', 'signatures.sqlite3']
+    assert signatures.get_many('https://youtube.com/s/player/abc/player_ias.vflset/en_US/base.js', 'sig', ['a']) == {}
+    assert stats.score(['live'], 'WEB') == client_stats.ClientStats(path=None).score(['live'], 'WEB')
+    signatures.close()
@@ -0,0 +1,70 @@
+import http.client
+import os
+from unittest import mock
+from urllib.error import URLError
+
+import pytest
+
+from pytubefix import http_pool, request
+
+
+class FakeConnection:
+    def __init__(self, error=None):
+        self.error = error
+        self.closed = False
+
+    def request(self, method, path, body=None, headers=None):
+        if self.error is not None:
+            raise self.error
+
+    def getresponse(self):
+        return 'response'
+
+    def close(self):
+        self.closed = True
+
+
+def pool_with(*connections):
+    """Pool handing out ``connections`` in order, the first one as reused."""
+    pool = http_pool.HTTPConnectionPool()
+    queue = list(connections)
+    pool._get = lambda key, timeout: (queue.pop(0), len(queue) + 1 == len(connections))
+    return pool
+
+
+def test_stale_connection_is_retried_for_get():
+    fresh = FakeConnection()
+    pool = pool_with(FakeConnection(http.client.RemoteDisconnected()), fresh)
+    assert pool._send(('https', 'example.com', 443), '/', 'GET', {}, None, None) == (fresh, 'response')
+
+
+def test_stale_connection_is_not_retried_for_post():
+    pool = pool_with(FakeConnection(http.client.RemoteDisconnected()), FakeConnection())
+    with pytest.raises(URLError):
+        pool._send(('https', 'example.com', 443), '/', 'POST', {}, b'{}', None)
+
+
+def test_environment_proxy_bypasses_the_pool():
+    with mock.patch.dict(os.environ, {'https_proxy': 'http://proxy:3128', 'HTTPS_PROXY': 'http://proxy:3128'}), \
+            mock.patch.object(request, 'urlopen') as urlopen, \
+            mock.patch.object(http_pool.default_pool, 'urlopen') as pooled:
+        request._execute_request('https://example.com/watch')
+    assert urlopen.called and not pooled.called
+
+
+def test_installed_opener_bypasses_the_pool():
+    with mock.patch.object(request.urllib_request, '_opener', object()), \
+            mock.patch.object(request, 'getproxies', return_value={}), \
+            mock.patch.object(request, 'urlopen') as urlopen, \
+            mock.patch.object(http_pool.default_pool, 'urlopen') as pooled:
+        request._execute_request('https://example.com/watch')
+    assert urlopen.called and not pooled.called
+
+
+def test_direct_requests_use_the_pool():
+    with mock.patch.object(request.urllib_request, '_opener', None), \
+            mock.patch.object(request, 'getproxies', return_value={}), \
+            mock.patch.object(request, 'urlopen') as urlopen, \
+            mock.patch.object(http_pool.default_pool, 'urlopen') as pooled:
+        request._execute_request('https://example.com/watch')
+    assert pooled.called and not urlopen.called
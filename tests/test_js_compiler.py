@@ -0,0 +1,158 @@
+import time
+from unittest import mock
+
+import pytest
+
+from pytubefix.jsinterp import JS_Undefined, JSInterpreter
+from pytubefix.sig_nsig import py_runner
+from pytubefix.sig_nsig.js_compiler import Compiler, JSError, Unsupported, compile_function
+from pytubefix.sig_nsig.node_runner import NodeRunner, node_available
+from pytubefix.sig_nsig.py_runner import PythonRunner
+
+# Shaped like a current player: a global lookup table the nsig function
+# indexes for its method names, guarded by a typeof check, and an array of
+# helpers mixing data and functions, including the array itself.
+PLAYER = '''var _yt_player={};(function(g){var window=this;'use strict';
+var XY="split,join,length,push,splice,reverse,unshift,pop,charCodeAt,indexOf".split(",");
+var H={a:function(a,b){a.splice(0,b)},b:function(a){a.reverse()},
+c:function(a,b){var c=a[0];a[0]=a[b%a.length];a[b%a.length]=c}};
+var sig=function(a){a=a.split("");H.c(a,41);H.b(a,49);H.a(a,2);H.c(a,7);return a.join("")};
+var nsig=function(a){var b=a[XY[0]](""),c=[-1234,"abc",null,b,function(d,e){d[XY[3]](e)},XY,8,
+function(d,e){for(e=(e%d[XY[2]]+d[XY[2]])%d[XY[2]];e--;)d[XY[6]](d[XY[7]]())},
+function(d,e){var k=d[0],l=e%d[XY[2]];d[0]=d[l];d[l]=k},
+function(d){for(var e=d[XY[2]];e;)d[XY[3]](d[XY[4]](--e,1)[0])}];
+if(typeof XY==="undefined")return a;
+c[2]=c;
+try{for(var f=0;f<b[XY[2]];f++){var g=b[f][XY[8]](0);if(g%4==0){c[4](b,String.fromCharCode(97+g%26))}
+if(g%4==1){c[7](b,g)}if(g%4==2){c[8](b,g+f)}if(g%4==3){b[f]=b[(f+c[6])%b[XY[2]]]}}
+c[9](b);b[XY[4]](0,3);c[4](c[5],c[0]);}catch(h){return"enhanced_except_"+a}
+return b[XY[1]]("")};
+})(_yt_player);'''
+
+INPUTS = [
+    'aBcDeFgHiJkLmNoP',
+    'AOq0QJ8wRAIgN3mr5QWRs1vwqsV5sYnC',
+    '0123456789-_zyxwvutsrq',
+]
+
+
+def run(code, *args):
+    """Result of the function body ``code``."""
+    return Compiler(JSInterpreter('')).compile_source(['a', 'b'], code)(JS_Undefined, list(args))
+
+
+@pytest.mark.parametrize('function_name', ['sig', 'nsig'])
+def test_compiled_function_agrees_with_the_interpreter(function_name):
+    jsi = JSInterpreter(PLAYER)
+    compiled = compile_function(jsi, function_name)
+    interpreted = jsi.extract_function(function_name)
+    assert [compiled([s]) for s in INPUTS] == [interpreted([s]) for s in INPUTS]
+
+
+@pytest.mark.parametrize('code, expected', [
+    ('return -7 % 3', -1),
+    ('return 7 / 2', 3.5),
+    ('return -5 >>> 0', 4294967291),
+    ('return (1 << 31) | 0', -2147483648),
+    ('return "3" * "4" + "1"', '121'),
+    ('return [1, [2, [3]]] + ""', '1,2,3'),
+    ('return 1e21 + "," + 0.1 * 3 + "," + 1 / 0', '1e+21,0.30000000000000004,Infinity'),
+    ('return [typeof null, typeof [], typeof undeclared, typeof function(){}].join()', 'object,object,undefined,function'),
+    ('return [] ? "truthy" : "falsy"', 'truthy'),
+    ('return null == undefined && "1" == 1 && NaN != NaN', True),
+    ('var o = {b: 1, 2: 0, a: 1, 1: 0}, k = []; for (var p in o) k.push(p); return k.join()', '1,2,b,a'),
+    ('var c = [1, 2]; c[4] = 5; return c.length + ":" + c.join("-")', '5:1-2---5'),
+    ('for (var d = 64, e = []; ++d - e.length - 32;) { switch (d) { case 58: d -= 14; case 91: case 92: '
+     'case 93: continue; case 123: d = 47; case 94: case 95: case 96: continue; case 46: d = 95; '
+     'default: e.push(String.fromCharCode(d)) } } return e.join("")',
+     'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_'),
+    ('var out = []; [1, 2].forEach(function(x, i) { this.push(x * 10 + i) }, out); return out', [10, 21]),
+    ('var f = function fact(n) { return n <= 1 ? 1 : n * fact(n - 1) }; return f(a)', 120),
+])
+def test_javascript_semantics(code, expected):
+    assert run(code, 5) == expected
+
+
+def test_javascript_exceptions_are_caught_by_the_code():
+    assert run('try { a.b.c } catch (e) { return e.name }') == 'TypeError'
+    assert run('try { throw "boom" } catch (e) { return e } finally { a = 1 }') == 'boom'
+    with pytest.raises(JSError):
+        run('throw a', 1)
+
+
+def test_unsupported_feature_is_not_caught_by_the_code():
+    # The code would take its catch branch where JavaScript doesn't.
+    with pytest.raises(Unsupported):
+        run('try { return Math.random() } catch (e) { return 0 }')
+
+
+@pytest.mark.parametrize('code', [
+    'var f=function(a){class B{} return a};',
+    'var f=function(a){x: for(;;) break x; return a};',
+    'var f=function(a){var {b} = a; return b};',
+])
+def test_unsupported_syntax_is_not_compiled(code):
+    assert compile_function(JSInterpreter(code), 'f') is None
+
+
+def test_runner_uses_the_compiled_nsig_function():
+    runner = PythonRunner(PLAYER)
+    runner.load_function('nsig')
+    assert runner.compiled
+    interpreted = JSInterpreter(PLAYER).extract_function('nsig')
+    assert runner.call_batch([[s] for s in INPUTS]) == [interpreted([s]) for s in INPUTS]
+
+
+def test_runner_interprets_a_compiled_function_disagreeing_with_the_interpreter():
+    with mock.patch.object(py_runner, 'compile_function', return_value=lambda args: 'wrong'):
+        runner = PythonRunner(PLAYER)
+        runner.load_function('nsig')
+    assert not runner.compiled
+    assert runner.call([INPUTS[0]]) == JSInterpreter(PLAYER).extract_function('nsig')([INPUTS[0]])
+
+
+def test_runner_checks_the_compiled_function_on_the_probe_calls():
+    player = 'var nsig=function(a,p){return p==1?a.split("").reverse().join(""):a};'
+    agreeing = compile_function(JSInterpreter(player), 'nsig')
+    # Agrees with the interpreter unless the function is called with its parameter.
+    compiled = mock.Mock(side_effect=lambda args: 'wrong' if args[1:] == [1] else agreeing(args))
+    with mock.patch.object(py_runner, 'compile_function', return_value=compiled):
+        runner = PythonRunner(player)
+        runner.load_function('nsig', [[s] for s in INPUTS])
+        assert runner.compiled
+        runner.load_function('nsig', [[s, 1] for s in INPUTS])
+        assert not runner.compiled
+
+
+@pytest.mark.skipif(not node_available(), reason='node is not installed')
+def test_benchmark_against_node():
+    inputs = [f'{s}{i}' for i in range(3) for s in INPUTS]
+    jsi = JSInterpreter(PLAYER)
+    compiled = compile_function(jsi, 'nsig')
+    interpreted = jsi.extract_function('nsig')
+    started = time.perf_counter()
+    node = NodeRunner(PLAYER)
+    try:
+        node.load_function('nsig')
+        node_start = time.perf_counter() - started
+
+        timings = {}
+        results = {}
+        for name, call_all in (
+            ('compiled', lambda: [compiled([s]) for s in inputs]),
+            ('interpreted', lambda: [interpreted([s]) for s in inputs]),
+            ('node', lambda: node.call_batch([[s] for s in inputs])),
+        ):
+            started = time.perf_counter()
+            results[name] = call_all()
+            timings[name] = (time.perf_counter() - started) / len(inputs)
+    finally:
+        node.close()
+
+    print(
+        f'\nnsig per call: compiled {timings["compiled"] * 1e6:.0f}us, '
+        f'interpreted {timings["interpreted"] * 1e6:.0f}us, node {timings["node"] * 1e6:.0f}us '
+        f'(node started in {node_start * 1e3:.0f}ms)'
+    )
+    assert results['compiled'] == results['interpreted'] == results['node']
+    assert timings['compiled'] * 5 < timings['interpreted']
@@ -0,0 +1,56 @@
+from unittest import mock
+
+import pytest
+
+from pytubefix import jsinterp
+from pytubefix.jsinterp import JSInterpreter
+
+# Shaped like the sig and nsig functions of a player: a lookup table,
+# helper objects, loops over the array, modular index arithmetic and an
+# exception handler.
+PLAYER = '''
+var H={a:function(a,b){a.splice(0,b)},b:function(a){a.reverse()},
+c:function(a,b){var c=a[0];a[0]=a[b%a.length];a[b%a.length]=c}};
+var sig=function(a){a=a.split("");H.c(a,41);H.b(a,49);H.a(a,2);H.c(a,7);return a.join("")};
+var nsig=function(a){
+    var T="split,join,length,push,splice,reverse".split(",");
+    var b=a[T[0]](""),c=[-1234,"abc",null,b,function(d,e){d.push(e)},T,8,
+        function(d,e){for(e=(e%d.length+d.length)%d.length;e--;)d.unshift(d.pop())}];
+    c[2]=c;
+    try{
+        for(var f=0;f<b[T[2]];f++){
+            var g=b[f].charCodeAt(0);
+            if(g%3==0){c[4](b,String.fromCharCode(97+g%26))}
+            if(g%3==1){c[7](b,g)}
+            if(g%3==2){b[f]=b[(f+c[6])%b[T[2]]]}
+        }
+        b[T[4]](0,3);
+    }catch(h){return"enhanced_except_"+a}
+    return b[T[1]]("")
+};
+'''
+
+INPUTS = ['aBcDeFgHiJkLmNoP', 'AOq0QJ8wRAIgN3mr', '0123456789-_zyxw']
+
+
+@pytest.mark.parametrize('function_name', ['sig', 'nsig'])
+def test_cached_and_uncached_interpretation_agree(function_name):
+    jsinterp.clear_parse_cache()
+    with mock.patch.object(jsinterp, '_cacheable', return_value=False):
+        uncached = [JSInterpreter(PLAYER).extract_function(function_name)([s]) for s in INPUTS]
+    assert jsinterp._cached_separate.currsize == 0
+
+    function = JSInterpreter(PLAYER).extract_function(function_name)
+    # The second round is served from the caches.
+    for _ in range(2):
+        assert [function([s]) for s in INPUTS] == uncached
+    assert jsinterp._cached_separate.currsize > 0
+
+
+def test_parse_cache_is_bounded_by_bytes():
+    cache = jsinterp._ParseCache(lambda expr: tuple(expr), max_bytes=64 * 1024)
+    for i in range(1000):
+        cache(f'{i:04d}' * 100)
+    assert 0 < cache.currsize <= 64 * 1024
+    # The most recent entries are kept.
+    assert ('0999' * 100,) in cache._entries
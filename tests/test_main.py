@@ -0,0 +1,284 @@
+import time
+from unittest import mock
+from urllib.error import HTTPError
+
+import pytest
+
+from pytubefix import YouTube
+from pytubefix.innertube import InnerTube
+
+STREAMS = {'playabilityStatus': {'status': 'OK'}, 'streamingData': {'formats': [{'itag': 18}]}}
+NO_STREAMS = {'playabilityStatus': {'status': 'OK'}}
+
+
+@pytest.fixture
+def youtube():
+    yt = YouTube('https://www.youtube.com/watch?v=2lAe1cqCOXo')
+    # Nothing needs to be fetched before the player requests.
+    yt._visitor_data = 'visitor'
+    yt._signature_timestamp = {'playbackContext': {'contentPlaybackContext': {'signatureTimestamp': 1}}}
+    yt.hedge_delay = 0.05
+    return yt
+
+
+def fake_player(answers):
+    """``InnerTube.player`` answering by client: ``(delay, response or exception)``."""
+    asked = []
+
+    def player(self, video_id):
+        asked.append(self.client_name)
+        delay, answer = answers[self.client_name]
+        time.sleep(delay)
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+    return player, asked
+
+
+def test_clients_are_not_raced_by_default():
+    assert YouTube('https://www.youtube.com/watch?v=2lAe1cqCOXo').hedge_delay is None
+
+
+def test_race_stops_at_the_first_client_with_streams(youtube):
+    player, asked = fake_player({'ANDROID_VR': (0, STREAMS), 'TV': (0, STREAMS)})
+    with mock.patch.object(InnerTube, 'player', player):
+        winner, outcomes = youtube._race_clients(['ANDROID_VR', 'TV'])
+    assert winner == 'ANDROID_VR'
+    assert asked == ['ANDROID_VR']
+    assert list(outcomes) == ['ANDROID_VR']
+
+
+def test_slow_client_is_hedged(youtube):
+    player, asked = fake_player({'ANDROID_VR': (0.5, STREAMS), 'IOS': (0, STREAMS)})
+    with mock.patch.object(InnerTube, 'player', player):
+        start = time.monotonic()
+        winner, outcomes = youtube._race_clients(['ANDROID_VR', 'IOS'])
+    assert winner == 'IOS'
+    assert time.monotonic() - start < 0.4
+    assert asked == ['ANDROID_VR', 'IOS']
+    assert list(outcomes) == ['IOS']
+
+
+def test_failed_client_hands_over_at_once(youtube):
+    youtube.hedge_delay = 10
+    error = HTTPError('https://youtubei', 400, 'Bad Request', {}, None)
+    player, asked = fake_player({'ANDROID_VR': (0, error), 'IOS': (0, NO_STREAMS), 'TV': (0, STREAMS)})
+    with mock.patch.object(InnerTube, 'player', player):
+        start = time.monotonic()
+        winner, outcomes = youtube._race_clients(['ANDROID_VR', 'IOS', 'TV'])
+    assert winner == 'TV'
+    assert time.monotonic() - start < 1
+    assert outcomes['ANDROID_VR'] is error
+    assert outcomes['IOS'][0] is NO_STREAMS
+
+
+def test_race_without_streams_reports_every_client(youtube):
+    player, asked = fake_player({'ANDROID_VR': (0, NO_STREAMS), 'IOS': (0, NO_STREAMS)})
+    with mock.patch.object(InnerTube, 'player', player):
+        winner, outcomes = youtube._race_clients(['ANDROID_VR', 'IOS'])
+    assert winner is None
+    assert set(outcomes) == {'ANDROID_VR', 'IOS'}
+
+
+def test_abandoned_client_neither_sends_nor_writes_state(youtube):
+    player, asked = fake_player({'ANDROID_VR': (0.1, STREAMS), 'WEB': (0, STREAMS)})
+
+    def slow_botguard(visitor_data):
+        time.sleep(0.3)
+        return 'po_token'
+
+    with mock.patch.object(InnerTube, 'player', player), \
+            mock.patch.object(YouTube, '_mint_pot', staticmethod(slow_botguard)):
+        winner, _ = youtube._race_clients(['ANDROID_VR', 'WEB'])
+        assert winner == 'ANDROID_VR'
+        # Let the abandoned WEB client finish its poToken.
+        time.sleep(0.4)
+    assert asked == ['ANDROID_VR']
+    assert youtube._pot is None
+
+
+def sent_visitor_data(youtube, client):
+    contexts = []
+
+    def player(self, video_id):
+        contexts.append(self.innertube_context['context']['client'].get('visitorData'))
+        return STREAMS
+
+    with mock.patch.object(InnerTube, 'player', player):
+        youtube._player_request(client)
+    return contexts[0]
+
+
+def test_client_without_po_token_sends_the_shared_visitor_data():
+    yt = YouTube('https://www.youtube.com/watch?v=2lAe1cqCOXo')
+    with mock.patch('pytubefix.__main__.visitor_data_provider') as provider:
+        provider.get.return_value = 'shared'
+        assert sent_visitor_data(yt, 'ANDROID_VR') == 'shared'
+        # Nothing is written to the object, the provider keeps it for its TTL.
+        assert yt._visitor_data is None
+
+
+def test_client_without_po_token_is_sent_without_visitor_data_it_cannot_get():
+    yt = YouTube('https://www.youtube.com/watch?v=2lAe1cqCOXo')
+    with mock.patch('pytubefix.__main__.visitor_data_provider') as provider:
+        provider.get.side_effect = OSError('offline')
+        assert sent_visitor_data(yt, 'ANDROID_VR') is None
+
+
+def test_client_with_po_token_fetches_visitor_data():
+    yt = YouTube('https://www.youtube.com/watch?v=2lAe1cqCOXo')
+    with mock.patch('pytubefix.__main__.visitor_data_provider') as provider, \
+            mock.patch.object(YouTube, '_mint_pot', staticmethod(lambda visitor_data: 'po_token')):
+        provider.get.return_value = 'fetched'
+        assert sent_visitor_data(yt, 'ANDROID') == 'fetched'
+
+
+WATCH_HTML = '<script src="/s/player/new/player_ias.vflset/en_US/base.js"></script>'
+NEW_JS_URL = 'https://youtube.com/s/player/new/player_ias.vflset/en_US/base.js'
+
+
+@pytest.fixture
+def prefetch_downloads(monkeypatch):
+    """Fake watch page, players and innertube player for ``prefetch``."""
+    import pytubefix
+    from pytubefix import player_store, request
+
+    monkeypatch.setattr(pytubefix, '__js_url__', 'https://youtube.com/s/player/old/player_ias.vflset/en_US/base.js')
+    monkeypatch.setattr(pytubefix, '__js__', 'signatureTimestamp:1')
+    monkeypatch.setattr(request, 'get', lambda url, *args, **kwargs: WATCH_HTML)
+    monkeypatch.setattr(player_store, 'get_player_js', lambda url: 'signatureTimestamp:2')
+    monkeypatch.setattr(InnerTube, 'next', lambda self, video_id: {})
+    monkeypatch.setattr(YouTube, '_mint_pot', staticmethod(lambda visitor_data: 'pot'))
+    player, asked = fake_player({'WEB': (0, STREAMS), 'TV': (0, STREAMS)})
+    monkeypatch.setattr(InnerTube, 'player', player)
+    return asked
+
+
+def test_prefetch_ignores_a_player_the_watch_page_does_not_name(prefetch_downloads):
+    yt = YouTube('https://www.youtube.com/watch?v=2lAe1cqCOXo', 'TV', prefetch=True)
+    assert yt.js_url == NEW_JS_URL
+    assert yt.js == 'signatureTimestamp:2'
+
+
+def test_prefetch_threads_do_not_write_to_the_object(prefetch_downloads):
+    with mock.patch('pytubefix.__main__.visitor_data_provider') as provider:
+        provider.get.return_value = 'visitor'
+        provider.cached.return_value = None
+        yt = YouTube('https://www.youtube.com/watch?v=2lAe1cqCOXo', 'WEB', prefetch=True)
+        for future in yt._prefetch.values():
+            future.result()
+        assert yt._js_url is None and yt._js is None
+        assert not yt._visitor_data and not yt._signature_timestamp and not yt._pot
+
+        assert yt.vid_info is STREAMS
+    assert prefetch_downloads == ['WEB']
+    assert yt.po_token == 'pot'
+
+
+@pytest.mark.parametrize('accessor', ['streaming_data', 'server_abr_streaming_url', 'video_playback_ustreamer_config'])
+def test_streams_accessors_leave_metadata_only(accessor, monkeypatch):
+    yt = YouTube('https://www.youtube.com/watch?v=2lAe1cqCOXo', 'WEB', metadata_only=True)
+    yt._visitor_data = 'visitor'
+    yt._signature_timestamp = {'playbackContext': {'contentPlaybackContext': {'signatureTimestamp': 1}}}
+    monkeypatch.setattr(YouTube, '_mint_pot', staticmethod(lambda visitor_data: 'pot'))
+    monkeypatch.setattr(YouTube, 'js', 'signatureTimestamp:1')
+    monkeypatch.setattr(YouTube, 'js_url', NEW_JS_URL)
+    sent = []
+
+    def player(self, video_id):
+        sent.append('serviceIntegrityDimensions' in self.innertube_context)
+        return {
+            **STREAMS,
+            'videoDetails': {'title': 'title'},
+            'playerConfig': {'mediaCommonConfig': {'mediaUstreamerRequestConfig': {'videoPlaybackUstreamerConfig': ''}}},
+        }
+
+    monkeypatch.setattr(InnerTube, 'player', player)
+    assert yt.title == 'title'
+    getattr(yt, accessor)
+    assert sent == [False, True]
+
+
+def test_fallback_order_is_kept_while_the_clients_are_tried(youtube, client_statistics):
+    answers = {'ANDROID_VR': (0, NO_STREAMS), 'TV': (0, NO_STREAMS), 'IOS': (0, STREAMS)}
+    player, asked = fake_player(answers)
+    rankings = iter([['ANDROID_VR', 'TV', 'IOS'], ['IOS', 'ANDROID_VR', 'TV']])
+    youtube.hedge_delay = None
+    with mock.patch.object(InnerTube, 'player', player), \
+            mock.patch.object(client_statistics, 'rank', side_effect=lambda traits, clients: next(rankings)):
+        assert youtube.streaming_data is STREAMS['streamingData']
+    assert asked == ['ANDROID_VR', 'TV', 'IOS']
+    assert youtube.fallback_clients == ['TV', 'IOS']
+
+
+def test_explicit_client_is_recorded_as_itself(youtube, client_statistics, monkeypatch):
+    monkeypatch.setattr(YouTube, '_mint_pot', staticmethod(lambda visitor_data: 'pot'))
+    player, asked = fake_player({'WEB': (0, STREAMS)})
+    with mock.patch.object(InnerTube, 'player', player):
+        youtube.vid_info_client('WEB')
+    assert client_statistics.score(youtube._traits, 'WEB') > client_statistics.score(youtube._traits, 'TV')
+    assert youtube.client == 'ANDROID_VR'
+
+
+def test_prefetched_player_is_kept_for_its_own_client(youtube):
+    from concurrent.futures import Future
+
+    future = Future()
+    future.set_result((STREAMS, None))
+    youtube._prefetch['player'] = future
+    youtube._prefetched_player = ('TV', True)
+    assert youtube._take_prefetched_player('WEB', for_streams=True) is None
+    assert youtube._take_prefetched_player('TV', for_streams=True) == (STREAMS, None)
+    assert 'player' not in youtube._prefetch
+
+
+def test_failed_decipher_retries_with_a_new_cipher(youtube, monkeypatch):
+    from pytubefix import extract, player_store
+    from pytubefix.exceptions import ExtractError
+
+    response = {
+        'playabilityStatus': {'status': 'OK'},
+        'videoDetails': {'title': 'title', 'lengthSeconds': '1'},
+        'streamingData': {'formats': [{
+            'itag': 18, 'url': 'https://example.com/videoplayback?id=1', 'bitrate': 1,
+            'mimeType': 'video/mp4; codecs="avc1.42001E, mp4a.40.2"', 'contentLength': '10',
+            'approxDurationMs': '1000', 'lastModified': '1',
+        }]},
+        'playerConfig': {'mediaCommonConfig': {'mediaUstreamerRequestConfig': {'videoPlaybackUstreamerConfig': ''}}},
+    }
+    youtube.client = 'TV'
+    youtube._vid_info = response
+    monkeypatch.setattr(YouTube, 'js', 'js')
+    monkeypatch.setattr(YouTube, 'js_url', NEW_JS_URL)
+    monkeypatch.setattr(player_store.default_store, 'invalidate', lambda js_url: None)
+    monkeypatch.setattr(extract, 'apply_signature', mock.Mock(side_effect=[ExtractError('stale'), None]))
+    with mock.patch('pytubefix.__main__.cipher_registry') as registry:
+        assert len(youtube.fmt_streams) == 1
+    registry.evict.assert_called_once_with(NEW_JS_URL)
+
+
+def test_resolve_many_reports_each_video(monkeypatch):
+    from pytubefix.exceptions import VideoUnavailable
+
+    js_fetches = []
+
+    def fmt_streams(self):
+        if self.video_id == 'unavailabl3':
+            raise VideoUnavailable(self.video_id)
+        return [self._js]
+
+    monkeypatch.setattr(YouTube, 'js', property(lambda self: js_fetches.append(self.video_id) or 'js'))
+    monkeypatch.setattr(YouTube, 'js_url', property(lambda self: NEW_JS_URL))
+    monkeypatch.setattr(YouTube, 'fmt_streams', property(fmt_streams))
+    urls = [f'https://www.youtube.com/watch?v={video_id}' for video_id in ('2lAe1cqCOXo', 'unavailabl3', '9bZkp7q19f0')]
+
+    results = dict(YouTube.resolve_many(iter(urls), workers=2, client='WEB'))
+    assert sorted(results) == sorted(urls)
+    assert isinstance(results[urls[1]], VideoUnavailable)
+    for url in (urls[0], urls[2]):
+        assert isinstance(results[url], YouTube)
+        assert url.endswith(results[url].video_id)
+        assert results[url].fmt_streams == ['js']
+    # The player js is shared, only the first video fetches it.
+    assert len(js_fetches) == 1
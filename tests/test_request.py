@@ -0,0 +1,180 @@
+import http.client
+import json
+import threading
+import time
+from urllib.parse import parse_qs, urlsplit
+from unittest import mock
+
+import pytest
+
+from pytubefix import request
+from pytubefix.download_journal import journal_suffix
+
+from .conftest import FakeResponse
+
+
+def test_fetch_range_requests_the_rest_of_a_dropped_range():
+    responses = [FakeResponse(b'abcd', length=6), FakeResponse(b'efghij')]
+    with mock.patch.object(request, '_execute_range_request', side_effect=responses) as execute:
+        assert request.fetch_range('https://example.com/v?id=1', 10, 19) == b'abcdefghij'
+    assert execute.call_args_list[1].args[1:] == (14, 19)
+
+
+def test_fetch_range_raises_on_a_truncated_range():
+    responses = [FakeResponse(b'abcd', length=6), FakeResponse(b'')]
+    with mock.patch.object(request, '_execute_range_request', side_effect=responses):
+        with pytest.raises(http.client.IncompleteRead) as exc_info:
+            request.fetch_range('https://example.com/v?id=1', 0, 9)
+    assert exc_info.value.partial == b'abcd'
+    assert exc_info.value.expected == 6
+
+
+def test_parallel_stream_yields_ranges_in_order():
+    body = bytes(range(256)) * 4
+
+    def execute(url, start, stop, **kwargs):
+        return FakeResponse(body[start:stop + 1])
+
+    written = {}
+    with mock.patch.object(request, '_execute_range_request', side_effect=execute):
+        chunks = list(request.parallel_stream(
+            'https://example.com/v?id=1', len(body), connections=3, range_size=100,
+            write_at=written.__setitem__
+        ))
+    assert [offset for offset, _ in chunks] == list(range(0, len(body), 100))
+    assert b''.join(chunk for _, chunk in chunks) == body
+    assert b''.join(written[offset] for offset in sorted(written)) == body
+
+
+def fake_segments(segment_count, wait_for=None):
+    """Stand-in for :func:`request.stream` serving the OTF segments of a stream.
+
+    Segment ``sq`` only finishes once the segments listed in
+    ``wait_for[sq]`` did, ``started`` and ``finished`` record the order.
+    """
+    wait_for = wait_for or {}
+    done = {sq: threading.Event() for sq in range(segment_count + 1)}
+    started, finished = [], []
+
+    def stream(url, **kwargs):
+        sq = int(parse_qs(urlsplit(url).query)['sq'][0])
+        if sq == 0:
+            yield f'Segment-Count: {segment_count}\r\n'.encode()
+            return
+        started.append(sq)
+        for other in wait_for.get(sq, ()):
+            assert done[other].wait(5)
+        if sq in wait_for:
+            # Leave the other segments the time to be marked as done.
+            time.sleep(0.05)
+        finished.append(sq)
+        done[sq].set()
+        yield f'<{sq}>'.encode()
+
+    return stream, started, finished
+
+
+def test_seq_stream_reassembles_concurrent_segments_in_order():
+    fake, started, finished = fake_segments(6, wait_for={1: [3], 2: [3], 4: [6]})
+    progress = []
+    with mock.patch.object(request, 'stream', side_effect=fake):
+        chunks = list(request.seq_stream(
+            'https://example.com/v?id=1', concurrency=3,
+            on_segment=lambda seq_num, count: progress.append((seq_num, count))
+        ))
+    assert finished.index(3) < finished.index(1)
+    assert chunks[1:] == [f'<{sq}>'.encode() for sq in range(1, 7)]
+    assert progress == [(sq, 6) for sq in range(7)]
+
+
+@pytest.mark.parametrize('max_buffered_bytes, started_before_2', [(4, [1, 2, 3]), (None, [1, 2, 3, 4])])
+def test_seq_stream_stops_requesting_while_the_buffer_is_full(max_buffered_bytes, started_before_2):
+    # Segments 2 and 3 finish first and wait in the buffer for segment 1,
+    # 6 bytes against a limit of 4.
+    fake, started, _ = fake_segments(6, wait_for={1: [2, 3]})
+    with mock.patch.object(request, 'stream', side_effect=fake):
+        segments = request.seq_stream(
+            'https://example.com/v?id=1', concurrency=3, max_buffered_bytes=max_buffered_bytes
+        )
+        assert next(segments) == b'Segment-Count: 6\r\n'
+        assert next(segments) == b'<1>'
+        assert next(segments) == b'<2>'
+        # Leave a requested segment the time to start.
+        time.sleep(0.1)
+        assert sorted(started) == started_before_2
+        assert list(segments) == [b'<3>', b'<4>', b'<5>', b'<6>']
+
+
+def test_truncated_range_is_not_journaled(make_stream, tmp_path):
+    body = bytes(range(200)) * 5
+    stream = make_stream(size=len(body))
+
+    def execute(url, start, stop, **kwargs):
+        if start == 500:
+            # The server closes the connection without sending the range.
+            return FakeResponse(b'')
+        return FakeResponse(body[start:stop + 1])
+
+    with mock.patch.object(request, 'default_range_size', 250), \
+            mock.patch.object(request, '_execute_range_request', side_effect=execute):
+        with pytest.raises(http.client.IncompleteRead):
+            stream.download(output_path=str(tmp_path), filename='video.mp4', connections=2)
+
+    with open(tmp_path / ('video.mp4' + journal_suffix)) as f:
+        ranges = json.load(f)['ranges']
+    assert not any(start <= 500 < end for start, end in ranges)
+
+
+def test_stream_with_a_known_size_does_not_probe_it():
+    body = bytes(range(250))
+
+    def execute(url, start, stop, **kwargs):
+        return FakeResponse(body[start:stop + 1])
+
+    with mock.patch.object(request, 'default_range_size', 100), \
+            mock.patch.object(request, '_probe_filesize', side_effect=AssertionError('size probed')), \
+            mock.patch.object(request, '_execute_range_request', side_effect=execute) as requested:
+        assert b''.join(request.stream('https://example.com/v?id=1', file_size=len(body))) == body
+    assert [c.args[1:] for c in requested.call_args_list] == [(0, 99), (100, 199), (200, 249)]
+
+
+@pytest.mark.parametrize('headers, probed', [
+    ({'Content-Range': 'bytes 0-99/250'}, False),
+    ({}, True),
+])
+def test_stream_only_probes_a_size_no_response_told(headers, probed):
+    body = bytes(range(250))
+
+    def execute(url, start, stop, **kwargs):
+        return FakeResponse(body[start:stop + 1], headers=headers)
+
+    with mock.patch.object(request, 'default_range_size', 100), \
+            mock.patch.object(request, '_probe_filesize', return_value=len(body)) as probe, \
+            mock.patch.object(request, '_execute_range_request', side_effect=execute):
+        assert b''.join(request.stream('https://example.com/v?id=1')) == body
+    assert probe.called == probed
+
+
+def test_stream_of_an_empty_response_ends_without_probing():
+    with mock.patch.object(request, '_probe_filesize', side_effect=AssertionError('size probed')), \
+            mock.patch.object(request, '_execute_range_request', return_value=FakeResponse(b'')) as requested:
+        assert list(request.stream('https://example.com/v?id=1', file_size=0)) == []
+    assert requested.call_count == 1
+
+
+@pytest.mark.parametrize('chunk_size', [None, 64])
+def test_stream_learns_the_size_from_a_short_range(chunk_size):
+    body = bytes(range(256)) * 2
+
+    def execute(url, start, stop, **kwargs):
+        return FakeResponse(body[start:stop + 1])
+
+    pool = request.BufferPool()
+    with mock.patch.object(request, 'default_range_size', 1000), \
+            mock.patch.object(request, 'buffer_pool', pool), \
+            mock.patch.object(request, '_execute_range_request', side_effect=execute) as requested:
+        received = b''.join(bytes(chunk) for chunk in request.stream('https://example.com/v?id=1', chunk_size=chunk_size))
+    assert received == body
+    assert requested.call_count == 1
+    # The buffer of the zero-copy mode is back in the pool.
+    assert sum(map(len, pool._free.values())) == (1 if chunk_size else 0)
@@ -0,0 +1,90 @@
+import os
+from unittest import mock
+from urllib.error import HTTPError
+
+from pytubefix import request
+from pytubefix.download_journal import journal_suffix
+
+from .conftest import FakeResponse
+
+SEGMENTS = [b'a' * 400, b'b' * 400, b'c' * 400]
+
+
+def fake_seq_stream(url, start_segment=0, segment_count=None, on_segment=None, **kwargs):
+    for seq_num in range(start_segment, len(SEGMENTS)):
+        yield SEGMENTS[seq_num]
+        on_segment(seq_num, len(SEGMENTS) - 1)
+
+
+def test_otf_download_learns_its_exact_size(make_stream, tmp_path):
+    # About 1000 bytes according to the bitrate, 1200 once downloaded.
+    stream = make_stream(size=0, is_otf=True, bitrate=8000)
+    remaining = []
+    stream._monostate.on_progress = lambda stream_, chunk, bytes_remaining: remaining.append(bytes_remaining)
+
+    with mock.patch.object(request, 'seq_stream', side_effect=fake_seq_stream), \
+            mock.patch.object(request, 'seq_filesize', side_effect=AssertionError('no HEAD sweep')):
+        file_path = stream.download(output_path=str(tmp_path), filename='video.mp4')
+        assert min(remaining) == 0
+        assert stream.filesize == 1200
+        assert not os.path.exists(file_path + journal_suffix)
+
+        assert stream.exists_at_path(file_path)
+        # A new object doesn't know the exact size, the file can't be trusted.
+        again = make_stream(size=0, is_otf=True, bitrate=8000)
+        assert not again.exists_at_path(file_path)
+
+
+def test_otf_file_without_journal_is_only_trusted_with_its_exact_size(make_stream, tmp_path):
+    file_path = tmp_path / 'video.mp4'
+    # Left by a download that crashed before writing its journal.
+    file_path.write_bytes(b'a' * 700)
+    with mock.patch.object(request, 'seq_filesize', side_effect=AssertionError('no HEAD sweep')):
+        assert not make_stream(size=0, is_otf=True).exists_at_path(str(file_path))
+        assert not make_stream(size=1200, is_otf=True).exists_at_path(str(file_path))
+        assert make_stream(size=700, is_otf=True).exists_at_path(str(file_path))
+
+
+def test_interrupted_otf_download_is_not_complete(make_stream, tmp_path):
+    stream = make_stream(size=0, is_otf=True, bitrate=8000)
+    with mock.patch.object(request, 'seq_stream', side_effect=fake_seq_stream):
+        stream.download(output_path=str(tmp_path), filename='video.mp4', interrupt_checker=lambda: True)
+    file_path = str(tmp_path / 'video.mp4')
+    assert os.path.exists(file_path + journal_suffix)
+    assert not stream.exists_at_path(file_path)
+
+
+def test_stream_without_byte_ranges_is_downloaded_by_segments(make_stream, tmp_path):
+    stream = make_stream(size=1200)
+
+    def not_found(url, *args, **kwargs):
+        raise HTTPError(url, 404, 'Not Found', {}, None)
+
+    with mock.patch.object(request, '_execute_range_request', side_effect=not_found), \
+            mock.patch.object(request, 'seq_stream', side_effect=fake_seq_stream):
+        file_path = stream.download(output_path=str(tmp_path), filename='video.mp4', connections=2)
+    with open(file_path, 'rb') as f:
+        assert f.read() == b''.join(SEGMENTS)
+    assert not os.path.exists(file_path + journal_suffix)
+
+
+def test_expired_url_is_refreshed_once(make_stream, tmp_path):
+    stream = make_stream(size=1000)
+    body = bytes(range(250)) * 4
+    rejected = []
+
+    def execute(url, start, stop, **kwargs):
+        if not rejected:
+            rejected.append(url)
+            raise HTTPError(url, 403, 'Forbidden', {}, None)
+        return FakeResponse(body[start:stop + 1])
+
+    def refresh_url():
+        stream.url = 'https://example.com/videoplayback?id=2'
+
+    with mock.patch.object(request, '_execute_range_request', side_effect=execute), \
+            mock.patch.object(stream, 'refresh_url', side_effect=refresh_url) as refresh:
+        file_path = stream.download(output_path=str(tmp_path), filename='video.mp4', connections=2)
+    assert refresh.call_count == 1
+    with open(file_path, 'rb') as f:
+        assert f.read() == body